@@ -0,0 +1,49 @@
+"""
+Analysis functions for the merged healthcare dataset.
+
+Importing the package (or any single module) runs no analysis and does not load
+matplotlib, scipy or scikit-learn; those are imported inside the functions that
+plot or fit models. Public functions are resolved lazily on first attribute
+access, so `from analysis_scripts import summary_report` only imports summary.py.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'data_type_checks': 'basic_eda',
+    'identical_rows_analysis': 'basic_eda',
+    'missing_value_analysis': 'basic_eda',
+    'univariate_analysis': 'univariate',
+    'bivariate_analysis': 'bivariate',
+    'cost_rating_correlation': 'cost_vs_rating',
+    'state_cost_rating_analysis': 'cost_vs_rating_states',
+    'geographic_analysis': 'geographical',
+    'outlier_anomaly_detection': 'outlier',
+    'multivariate_dimensionality_reduction': 'multivariate_dim_red',
+    'summary_report': 'summary',
+    'case_mix_normalization': 'case_mix',
+    'build_value_index': 'value_index',
+    'lookup_value_index': 'value_index',
+    'accumulate': 'streaming',
+    'accumulate_partitions': 'streaming',
+    'run_sharded': 'sharded',
+    'fixed_effects_regression': 'fixed_effects',
+    'stratified_sample': 'sampling',
+    'build_peer_index': 'peers',
+    'find_peers': 'peers',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
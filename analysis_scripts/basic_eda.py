@@ -1,5 +1,6 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from utils.schema import COLUMN_TYPES, apply_schema, schema_report
 
 def missing_value_analysis(df: pd.DataFrame) -> pd.Series:
     """
@@ -7,6 +8,8 @@ def missing_value_analysis(df: pd.DataFrame) -> pd.Series:
     prints a summary plus a heatmap visualization.
     """
 
+    import matplotlib.pyplot as plt
+
     # 1. Compute % missing per column
     missing_pct = df.isnull().mean() * 100
     missing_pct = missing_pct.sort_values(ascending=False)
@@ -29,9 +32,6 @@ def missing_value_analysis(df: pd.DataFrame) -> pd.Series:
 
     return missing_pct
 
-import pandas as pd
-import matplotlib.pyplot as plt
-
 def identical_rows_analysis(df: pd.DataFrame) -> None:
     """
     1. Reports fully identical rows in the dataset.
@@ -39,6 +39,8 @@ def identical_rows_analysis(df: pd.DataFrame) -> None:
     3. Plots the top-20 DRG_Cd frequencies as a sanity check.
     """
 
+    import matplotlib.pyplot as plt
+
     # ——— 1. Fully identical row detection ———
     # Mark all rows that have at least one identical counterpart
     dup_mask = df.duplicated(keep=False)
@@ -78,52 +80,29 @@ def identical_rows_analysis(df: pd.DataFrame) -> None:
     plt.tight_layout()
     plt.show()
 
-import pandas as pd
-
 def data_type_checks(df: pd.DataFrame) -> pd.DataFrame:
     """
-    1. Prints dtypes before conversion.
-    2. Converts key numeric columns to numeric (coercing errors to NaN).
-    3. Parses 'start_date' and 'end_date' as datetime.
-    4. Prints dtypes after conversion and reports how many values were coerced.
+    Validation report against the declared schema in utils.schema.
+    1. Applies the schema to any declared column that isn't typed yet
+       (frames from load_merged_dataset already are).
+    2. Prints expected vs. actual dtype, missing values, values coerced to NaN
+       and memory per column.
+    3. Lists columns that have no declared type.
     """
-    print("=== Data Types Before Conversion ===")
-    print(df.dtypes, end="\n\n")
-
-    # Define columns to convert
-    num_cols = [
-        'Tot_Dschrgs', 'Avg_Submtd_Cvrd_Chrg', 'Avg_Tot_Pymt_Amt',
-        'Avg_Mdcr_Pymt_Amt', 'payment', 'denominator',
-        'lower_estimate', 'higher_estimate',
-        'value_of_care_display_id', 'rating'
-    ]
-    date_cols = ['start_date', 'end_date']
-
-    # Convert numeric columns
-    for col in num_cols:
-        if col in df.columns:
-            before_na = df[col].isna().sum()
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            after_na = df[col].isna().sum()
-            coerced = after_na - before_na
-            print(f"Column '{col}': coerced {coerced} values to NaN")
-
-    # Parse datetime columns
-    for col in date_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            n_failed = df[col].isna().sum()
-            print(f"Column '{col}': {n_failed} rows could not be parsed as dates")
-
-    print("\n=== Data Types After Conversion ===")
-    print(df.dtypes)
+    before_na = df.isna().sum()
+    df = apply_schema(df)
+    coerced = df.isna().sum() - before_na
+
+    report = schema_report(df)
+    report['coerced'] = report['column'].map(coerced).astype(int)
+    print("=== Schema Validation ===")
+    print(report.to_string(index=False, formatters={'memory_kb': "{:,.0f}".format}))
+
+    mismatched = report.loc[~report['ok'], 'column'].tolist()
+    if mismatched:
+        print(f"\nColumns not matching their declared type: {mismatched}")
+    untyped = [c for c in df.columns if c not in COLUMN_TYPES]
+    if untyped:
+        print(f"\nColumns without a declared type: {untyped}")
 
     return df
-
-
-
-df = data_type_checks(filtered_df)
-
-identical_rows_analysis(filtered_df)
-
-missing_value_analysis(filtered_df)
\ No newline at end of file
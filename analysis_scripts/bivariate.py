@@ -1,36 +1,43 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from analysis_scripts.cache import cached
+from analysis_scripts.plotting import boxplot, density_scatter, grouped_box_stats
 
 def bivariate_analysis(
     df: pd.DataFrame,
     numeric_cols: list[str] | None = None,
     scatter_pairs: list[tuple[str, str]] | None = None,
-    cat_group_cols: list[str] | None = None
+    cat_group_cols: list[str] | None = None,
+    weight_col: str | None = None
 ) -> pd.DataFrame:
     """
     1. Prints and plots the correlation matrix for numeric columns.
-    2. Generates scatter plots for specified column pairs.
-    3. Creates boxplots of Avg_Tot_Pymt_Amt and rating grouped by categorical columns.
+    2. Generates scatter plots for specified column pairs (2-D histograms for large data).
+    3. Creates boxplots (from precomputed quantiles) of Avg_Tot_Pymt_Amt and rating grouped by categorical columns.
     
     Parameters:
         df: pandas DataFrame
         numeric_cols: list of numeric column names (defaults to all numeric columns)
         scatter_pairs: list of (x, y) column pairs for scatter plots
         cat_group_cols: list of categorical columns for boxplots
+        weight_col: optional sampling-weight column (see analysis_scripts.sampling);
+                    the correlations, binned scatter plots and boxplots are then weighted
     Returns:
         corr: the correlation DataFrame
     """
+    import matplotlib.pyplot as plt
+
     # 1. Determine numeric columns
     if numeric_cols is None:
-        numeric_cols = df.select_dtypes(include='number').columns.tolist()
+        numeric_cols = [c for c in df.select_dtypes(include='number').columns if c != weight_col]
     
     # 2. Correlation matrix
-    corr = df[numeric_cols].corr()
+    corr = correlation_matrix(df[numeric_cols], df[weight_col] if weight_col else None)
     print("\n=== Correlation Matrix ===")
     print(corr, end="\n\n")
     
     # 3. Plot heatmap of correlations
-    plt.figure(figsize=(10, 8))
+    fig = plt.figure(figsize=(10, 8))
     plt.imshow(corr, aspect='auto')
     plt.colorbar()
     plt.xticks(range(len(corr)), corr.columns, rotation=90)
@@ -38,6 +45,7 @@ def bivariate_analysis(
     plt.title("Correlation Matrix Heatmap")
     plt.tight_layout()
     plt.show()
+    plt.close(fig)
     
     # 4. Scatter plots
     if scatter_pairs is None:
@@ -47,13 +55,14 @@ def bivariate_analysis(
         ]
     for x_col, y_col in scatter_pairs:
         if x_col in df.columns and y_col in df.columns:
-            plt.figure(figsize=(6, 4))
-            plt.scatter(df[x_col], df[y_col], alpha=0.5)
+            fig, ax = plt.subplots(figsize=(6, 4))
+            density_scatter(ax, df[x_col], df[y_col], weights=df[weight_col] if weight_col else None)
             plt.xlabel(x_col)
             plt.ylabel(y_col)
             plt.title(f"Scatter: {x_col} vs. {y_col}")
             plt.tight_layout()
             plt.show()
+            plt.close(fig)
     
     # 5. Boxplots by categorical group
     if cat_group_cols is None:
@@ -61,26 +70,33 @@ def bivariate_analysis(
     for cat in cat_group_cols:
         if cat in df.columns:
             if "Avg_Tot_Pymt_Amt" in df.columns:
-                plt.figure(figsize=(8, 6))
-                df.boxplot(column="Avg_Tot_Pymt_Amt", by=cat, rot=45)
-                plt.suptitle("")
+                fig, ax = plt.subplots(figsize=(8, 6))
+                boxplot(ax, grouped_box_stats(df, "Avg_Tot_Pymt_Amt", cat, weight_col))
+                plt.xticks(rotation=45, ha="right")
                 plt.title(f"Avg_Tot_Pymt_Amt by {cat}")
                 plt.xlabel(cat)
                 plt.ylabel("Avg_Tot_Pymt_Amt")
                 plt.tight_layout()
                 plt.show()
+                plt.close(fig)
             if "rating" in df.columns:
-                plt.figure(figsize=(8, 6))
-                df.boxplot(column="rating", by=cat, rot=45)
-                plt.suptitle("")
+                fig, ax = plt.subplots(figsize=(8, 6))
+                boxplot(ax, grouped_box_stats(df, "rating", cat, weight_col))
+                plt.xticks(rotation=45, ha="right")
                 plt.title(f"rating by {cat}")
                 plt.xlabel(cat)
                 plt.ylabel("rating")
                 plt.tight_layout()
                 plt.show()
+                plt.close(fig)
     
     return corr
 
-# Run the bivariate analysis
-corr_matrix = bivariate_analysis(df)
-print(corr_matrix)
\ No newline at end of file
+
+@cached(depends=["analysis_scripts.sampling.weighted_correlation"])
+def correlation_matrix(numeric: pd.DataFrame, weights: pd.Series | None = None) -> pd.DataFrame:
+    """Pearson correlation matrix of the given numeric columns (cached on their content), optionally weighted."""
+    if weights is not None:
+        from analysis_scripts.sampling import weighted_correlation
+        return weighted_correlation(numeric, weights)[0]
+    return numeric.corr()
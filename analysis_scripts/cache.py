@@ -0,0 +1,294 @@
+"""
+Result cache for the compute steps of the analysis functions.
+
+    @cached
+    def _correlation_matrix(numeric: pd.DataFrame) -> pd.DataFrame: ...
+
+A call is keyed on a content fingerprint of its DataFrame/Series/array
+arguments (pandas' vectorized row hashes folded with blake2b), the repr of its
+other arguments and a hash of the function's bytecode, so editing the function
+invalidates its entries. The hash covers the functions of the same module it
+calls, transitively; helpers from other modules (typically imported inside the
+function) are declared with `depends`:
+
+    @cached(depends=["analysis_scripts.sampling.weighted_cost_rating_stats"])
+ Results live in a memory LRU tier and a pickled disk
+LRU tier, each bounded in bytes. DataFrames and Series come back as shallow
+copies under copy-on-write (pandas >= 3, or 2.x with mode.copy_on_write), so
+nothing is copied unless the caller modifies them, and as deep copies otherwise.
+Arrays come back as read-only views.
+
+    from analysis_scripts.cache import RESULT_CACHE
+    RESULT_CACHE.info()    # hits/misses per tier, sizes
+"""
+
+import copy
+import functools
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = "data/processed/cache"
+DEFAULT_MEMORY_BYTES = 512 * 2**20
+DEFAULT_DISK_BYTES = 2 * 2**30
+
+
+# ——— Fingerprints ———
+
+def frame_fingerprint(obj) -> str:
+    """Content hash of a DataFrame or Series: index, column names, dtypes and values."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(obj, pd.Series):
+        obj = obj.to_frame()
+    h.update(pd.util.hash_pandas_object(obj.index).to_numpy().tobytes())
+    for name, col in obj.items():
+        h.update(repr((name, str(col.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(col, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _array_fingerprint(arr: np.ndarray) -> str:
+    h = hashlib.blake2b(repr((arr.shape, str(arr.dtype))).encode(), digest_size=16)
+    h.update(np.ascontiguousarray(arr).tobytes() if arr.dtype != object else repr(arr.tolist()).encode())
+    return h.hexdigest()
+
+
+def _key_part(value) -> str:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return f"frame:{frame_fingerprint(value)}"
+    if isinstance(value, np.ndarray):
+        return f"array:{_array_fingerprint(value)}"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{k!r}:{_key_part(v)}" for k, v in sorted(value.items(), key=repr)) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_key_part(v) for v in value) + "]"
+    return repr(value)
+
+
+def _resolve(path: str):
+    """The object at a dotted path such as "analysis_scripts.sampling.weighted_correlation"."""
+    module, _, name = path.rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+def code_version(func, depends=()) -> str:
+    """
+    Hash of the function's bytecode and constants (nested code objects included) and,
+    transitively, of the functions of its own module it refers to, of the `depends` of
+    the cached functions among them and of `depends` (functions or dotted paths).
+    """
+    h = hashlib.blake2b(digest_size=8)
+    seen = set()
+
+    def visit_function(f):
+        if isinstance(f, str):
+            f = _resolve(f)
+        target = inspect.unwrap(f)
+        if not inspect.isfunction(target) or target in seen:
+            return
+        seen.add(target)
+        visit(target.__code__, target.__globals__, target.__module__)
+        for dep in getattr(f, 'cache_depends', ()):
+            visit_function(dep)
+
+    def visit(code, namespace, module):
+        h.update(code.co_code)
+        for const in code.co_consts:
+            if inspect.iscode(const):
+                visit(const, namespace, module)
+            else:
+                h.update(repr(const).encode())
+        h.update(repr(code.co_names).encode())
+        for name in code.co_names:
+            value = namespace.get(name)
+            if callable(value) and getattr(inspect.unwrap(value), '__module__', None) == module:
+                visit_function(value)
+
+    for f in [func, *depends]:
+        visit_function(f)
+    return h.hexdigest()
+
+
+# ——— Results ———
+
+def _nbytes(obj) -> int:
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_nbytes(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+
+def _copy_on_write() -> bool:
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+def _shared(obj):
+    """A view of a cached result that callers can't use to modify the cache."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        # Without copy-on-write, in-place edits to a shallow copy reach the cached frame.
+        return obj.copy(deep=not _copy_on_write())
+    if isinstance(obj, np.ndarray):
+        view = obj.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(obj, tuple):
+        return tuple(_shared(v) for v in obj)
+    if isinstance(obj, (int, float, complex, str, bytes, bool, type(None), np.generic)):
+        return obj
+    return copy.deepcopy(obj)
+
+
+class ResultCache:
+    """Two-tier (memory, then disk) LRU cache of analysis results, bounded in bytes."""
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, disk_dir=DEFAULT_CACHE_DIR,
+                 disk_bytes=DEFAULT_DISK_BYTES, enabled=True):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.enabled = enabled
+        self._memory = OrderedDict()   # key -> (result, nbytes)
+        self._memory_used = 0
+        self.stats = dict.fromkeys(
+            ['memory_hits', 'disk_hits', 'misses', 'memory_evictions', 'disk_evictions'], 0)
+
+    def key(self, func, args, kwargs, version: str | None = None) -> str:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        parts = [f"{func.__module__}.{func.__qualname__}", version or code_version(func)]
+        parts += [f"{name}={_key_part(value)}" for name, value in bound.arguments.items()]
+        return hashlib.blake2b("\n".join(parts).encode(), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """Returns (found, result)."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return True, self._memory[key][0]
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    result = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                os.remove(path)
+            else:
+                os.utime(path)
+                self.stats['disk_hits'] += 1
+                self._remember(key, result)
+                return True, result
+        self.stats['misses'] += 1
+        return False, None
+
+    def put(self, key, result):
+        self._remember(key, result)
+        path = self._disk_path(key)
+        if path:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self._evict_disk()
+
+    def _remember(self, key, result):
+        size = _nbytes(result)
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = (result, size)
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_used -= evicted
+            self.stats['memory_evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl") if self.disk_dir else None
+
+    def _disk_entries(self):
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".pkl"):
+                st = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((st.st_mtime, st.st_size, name))
+        return sorted(entries)
+
+    def _evict_disk(self):
+        entries = self._disk_entries()
+        used = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if used <= self.disk_bytes:
+                break
+            os.remove(os.path.join(self.disk_dir, name))
+            used -= size
+            self.stats['disk_evictions'] += 1
+
+    def clear(self, disk=True):
+        self._memory.clear()
+        self._memory_used = 0
+        if disk:
+            for _, _, name in self._disk_entries():
+                os.remove(os.path.join(self.disk_dir, name))
+
+    def info(self) -> dict:
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hits = lookups - self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_used,
+            'disk_entries': len(self._disk_entries()),
+            'disk_bytes': sum(size for _, size, _ in self._disk_entries()),
+        }
+
+
+RESULT_CACHE = ResultCache(disk_dir=os.environ.get("ANALYSIS_CACHE_DIR", DEFAULT_CACHE_DIR),
+                           enabled=os.environ.get("ANALYSIS_CACHE", "1") != "0")
+
+
+def cached(func=None, *, cache: ResultCache | None = None, depends=()):
+    """
+    Caches `func`'s results in `cache` (default: RESULT_CACHE). Usable as @cached or
+    @cached(cache=..., depends=[...]); `depends` names the functions of other modules
+    that `func` calls (dotted paths, imported on the first call), so that editing them
+    invalidates its entries too.
+    """
+    if func is None:
+        return functools.partial(cached, cache=cache, depends=depends)
+    version = []
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = cache or RESULT_CACHE
+        if not store.enabled:
+            return func(*args, **kwargs)
+        if not version:
+            version.append(code_version(func, depends))
+        key = store.key(func, args, kwargs, version[0])
+        found, result = store.get(key)
+        if not found:
+            result = func(*args, **kwargs)
+            store.put(key, result)
+        return _shared(result)
+
+    wrapper.cache_depends = tuple(depends)
+    return wrapper
@@ -0,0 +1,197 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.cache import code_version, frame_fingerprint
+
+DEFAULT_REFERENCE_PATH = "data/processed/drg_reference.csv"
+TIER_QUANTILES = (1 / 3, 2 / 3)
+TIER_LABELS = ["low", "medium", "high"]
+
+
+def _provider_drg_rows(df: pd.DataFrame, weight_col: str | None = None) -> pd.DataFrame:
+    # The merged dataset repeats each provider × DRG row per payment measure.
+    cols = ['Rndrng_Prvdr_CCN', 'DRG_Cd', 'Tot_Dschrgs', 'Avg_Tot_Pymt_Amt']
+    rows = df[cols + ([weight_col] if weight_col else [])]
+    rows = rows.dropna(subset=['DRG_Cd', 'Tot_Dschrgs', 'Avg_Tot_Pymt_Amt'])
+    rows = rows.drop_duplicates(['Rndrng_Prvdr_CCN', 'DRG_Cd'], keep='last').copy()
+    rows['DRG_Cd'] = rows['DRG_Cd'].astype(str)
+    return rows
+
+
+def _weighted_quantiles(rows: pd.DataFrame, value: str, weight: str, quantiles) -> pd.DataFrame:
+    """Per-DRG quantiles of `value` where each row counts `weight` times (lower value at ties)."""
+    rows = rows.sort_values(['DRG_Cd', value])
+    share = rows.groupby('DRG_Cd')[weight].cumsum() / rows.groupby('DRG_Cd')[weight].transform('sum')
+    return pd.DataFrame({q: rows[value][share >= q].groupby(rows['DRG_Cd']).first() for q in quantiles})
+
+
+def build_drg_reference(df: pd.DataFrame, weight_col: str | None = None) -> pd.DataFrame:
+    """
+    National per-DRG baselines over distinct provider × DRG rows:
+      - expected_payment: discharge-weighted mean Avg_Tot_Pymt_Amt
+      - tier_low_max / tier_medium_max: tercile cutoffs of Avg_Tot_Pymt_Amt
+      - total_discharges, n_providers
+    With `weight_col` (a stratified sample), discharges and cutoffs are weighted
+    by it, so the table estimates the full data's; n_providers counts sampled rows.
+    """
+    rows = _provider_drg_rows(df, weight_col)
+    if weight_col:
+        rows['Tot_Dschrgs'] = rows['Tot_Dschrgs'] * rows[weight_col]
+    rows['weighted_payment'] = rows['Avg_Tot_Pymt_Amt'] * rows['Tot_Dschrgs']
+
+    grouped = rows.groupby('DRG_Cd')
+    reference = grouped.agg(
+        total_discharges=('Tot_Dschrgs', 'sum'),
+        weighted_payment=('weighted_payment', 'sum'),
+        n_providers=('Rndrng_Prvdr_CCN', 'nunique'),
+    )
+    reference['expected_payment'] = reference['weighted_payment'] / reference['total_discharges']
+
+    if weight_col:
+        cutoffs = _weighted_quantiles(rows, 'Avg_Tot_Pymt_Amt', weight_col, TIER_QUANTILES)
+    else:
+        cutoffs = grouped['Avg_Tot_Pymt_Amt'].quantile(list(TIER_QUANTILES)).unstack()
+    reference['tier_low_max'] = cutoffs[TIER_QUANTILES[0]]
+    reference['tier_medium_max'] = cutoffs[TIER_QUANTILES[1]]
+
+    return reference.drop(columns='weighted_payment')
+
+
+def _meta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".meta.json"
+
+
+def reference_source(df: pd.DataFrame) -> dict:
+    """What a stored reference was built from: a fingerprint of the provider × DRG rows and their count."""
+    rows = _provider_drg_rows(df)
+    return {
+        'fingerprint': frame_fingerprint(rows.reset_index(drop=True)),
+        'n_rows': len(rows),
+        'code': code_version(build_drg_reference),
+    }
+
+
+def save_drg_reference(df: pd.DataFrame, path: str = DEFAULT_REFERENCE_PATH) -> pd.DataFrame:
+    """
+    Builds the national reference from the full dataset `df` and stores it at `path`,
+    replacing any stored one. The data it was built from is recorded next to it.
+    """
+    reference = build_drg_reference(df)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    reference.to_csv(path)
+    with open(_meta_path(path), "w") as f:
+        json.dump(reference_source(df), f)
+    print(f"[SUCCESS] DRG reference ({len(reference)} DRGs) saved to {path}")
+    return reference
+
+
+def load_drg_reference(path: str = DEFAULT_REFERENCE_PATH) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={'DRG_Cd': str}).set_index('DRG_Cd')
+
+
+def load_or_build_drg_reference(df: pd.DataFrame | None = None,
+                                path: str | None = DEFAULT_REFERENCE_PATH,
+                                rebuild: bool = False,
+                                weight_col: str | None = None) -> pd.DataFrame:
+    """
+    The stored national per-DRG reference, so that new batches, partial releases and
+    snapshots are scored against the same baselines. It is written only by an explicit
+    build on the full dataset (`integrate_data.py --drg-reference`, or `rebuild=True`
+    here, which replaces it with one built from `df`). Without a stored reference, or
+    with `path=None`, one is built from `df` for this call only (weighted by
+    `weight_col` if given) and nothing is written.
+    """
+    if rebuild:
+        if df is None or weight_col or path is None:
+            raise ValueError("rebuild=True needs the full, unweighted dataset and a path to store the reference")
+        return save_drg_reference(df, path)
+    if path is not None and os.path.exists(path):
+        return load_drg_reference(path)
+    if df is None:
+        raise ValueError(f"No DRG reference at {path} and no data to build one from")
+    if path is not None:
+        print(f"⚠️ No DRG reference at {path}; using baselines from the data being scored. "
+              "Run integrate_data.py --drg-reference to store national ones.")
+    return build_drg_reference(df, weight_col)
+
+
+def score_payments(df: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds expected_payment, payment_ratio (observed / expected) and payment_tier
+    (low/medium/high within the row's DRG) to a copy of `df`. Rows whose DRG is not
+    in the reference get NaN.
+    """
+    df = df.copy()
+    drg = df['DRG_Cd'].astype(str)
+    expected = drg.map(reference['expected_payment'])
+    low_max = drg.map(reference['tier_low_max'])
+    medium_max = drg.map(reference['tier_medium_max'])
+    payment = df['Avg_Tot_Pymt_Amt']
+
+    df['expected_payment'] = expected
+    df['payment_ratio'] = payment / expected
+
+    tier = np.select(
+        [payment <= low_max, payment <= medium_max, payment > medium_max],
+        TIER_LABELS,
+        default=None,
+    )
+    df['payment_tier'] = pd.Categorical(tier, categories=TIER_LABELS, ordered=True)
+    return df
+
+
+def hospital_cost_index(df: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Case-mix adjusted cost index per hospital:
+        sum(observed payment × discharges) / sum(expected payment × discharges)
+    over the hospital's DRGs. 1.0 means national prices for its own DRG mix.
+    """
+    rows = _provider_drg_rows(df)
+    rows['expected_payment'] = rows['DRG_Cd'].map(reference['expected_payment'])
+    rows = rows.dropna(subset=['expected_payment'])
+    rows['observed_total'] = rows['Avg_Tot_Pymt_Amt'] * rows['Tot_Dschrgs']
+    rows['expected_total'] = rows['expected_payment'] * rows['Tot_Dschrgs']
+
+    index = rows.groupby('Rndrng_Prvdr_CCN').agg(
+        observed_total=('observed_total', 'sum'),
+        expected_total=('expected_total', 'sum'),
+        total_discharges=('Tot_Dschrgs', 'sum'),
+        n_drgs=('DRG_Cd', 'size'),
+    )
+    index['cost_index'] = index['observed_total'] / index['expected_total']
+    return index.sort_values('cost_index')
+
+
+def case_mix_normalization(df: pd.DataFrame,
+                           reference_path: str | None = DEFAULT_REFERENCE_PATH,
+                           rebuild: bool = False,
+                           weight_col: str | None = None):
+    """
+    1. Loads the stored national per-DRG reference table (see load_or_build_drg_reference);
+       without one, baselines are built from `df`, weighted by `weight_col` if given.
+    2. Scores every row against its DRG's expected payment and payment tiers.
+    3. Computes the per-hospital cost index and prints the extremes.
+    Returns:
+        scored_df: `df` with expected_payment, payment_ratio and payment_tier
+        cost_index: DataFrame of per-hospital cost indexes
+    """
+    reference = load_or_build_drg_reference(df, reference_path, rebuild=rebuild, weight_col=weight_col)
+
+    scored_df = score_payments(df, reference)
+    unscored = scored_df['expected_payment'].isna().sum()
+    if unscored:
+        print(f"⚠️ {unscored} rows have a DRG missing from the reference; rebuild it to include them.")
+
+    print("\n=== Payment Tier Counts (within DRG) ===")
+    print(scored_df['payment_tier'].value_counts(sort=False).to_string())
+
+    cost_index = hospital_cost_index(df, reference)
+    print("\n=== Lowest Case-Mix Adjusted Cost Index ===")
+    print(cost_index.head(10))
+    print("\n=== Highest Case-Mix Adjusted Cost Index ===")
+    print(cost_index.tail(10))
+
+    return scored_df, cost_index
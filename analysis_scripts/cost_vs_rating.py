@@ -0,0 +1,64 @@
+import pandas as pd
+import numpy as np
+
+from analysis_scripts.cache import cached
+from analysis_scripts.plotting import density_scatter, plot_binned_means
+
+def cost_rating_correlation(df: pd.DataFrame,
+                            cost_col: str = "Avg_Tot_Pymt_Amt",
+                            rating_col: str = "rating",
+                            weight_col: str | None = None):
+    """
+    1. Computes Pearson and Spearman correlations between cost and rating.
+    2. Prints correlation coefficients and p-values.
+    3. Plots a scatter of cost vs. rating with a linear fit line; above
+       SCATTER_MAX_POINTS pairs, a 2-D histogram with the mean rating per cost bin.
+    With `weight_col` (a stratified sample) the correlations, the fit line and the
+    binned plot are weighted, and p-values use the effective sample size (see analysis_scripts.sampling).
+    """
+    import matplotlib.pyplot as plt
+
+    # 1. Drop rows with missing cost or rating    
+    sub = df[[cost_col, rating_col] + ([weight_col] if weight_col else [])].dropna()
+    cost = sub[cost_col].values
+    rating = sub[rating_col].values
+    weights = sub[weight_col].values if weight_col else None
+
+    # 2. Compute correlations
+    pearson_r, pearson_p, spearman_rho, spearman_p, m, b = _cost_rating_stats(sub, cost_col, rating_col, weight_col)
+
+    weighted = " (weighted)" if weight_col else ""
+    print(f"Pearson r = {pearson_r:.3f}, p-value = {pearson_p:.3e}{weighted}")
+    print(f"Spearman ρ = {spearman_rho:.3f}, p-value = {spearman_p:.3e}{weighted}")
+
+    # 3. Scatter (or 2-D histogram with mean rating per cost bin) + regression line
+    fig, ax = plt.subplots(figsize=(6, 6))
+    if density_scatter(ax, cost, rating, weights=weights, edgecolor='k', linewidth=0.3):
+        plot_binned_means(ax, cost, rating, label=f"mean {rating_col} per cost bin", weights=weights)
+    # Least-squares line (m, b) from step 2
+    x_line = np.linspace(cost.min(), cost.max(), 100)
+    plt.plot(x_line, m * x_line + b, linestyle='--', linewidth=2,
+             label=f"fit: y = {m:.2e}x + {b:.2f}")
+    plt.xlabel(cost_col)
+    plt.ylabel(rating_col)
+    plt.title(f"{cost_col} vs. {rating_col}")
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+    plt.close(fig)
+
+
+@cached(depends=["analysis_scripts.sampling.weighted_cost_rating_stats"])
+def _cost_rating_stats(sub: pd.DataFrame, cost_col: str, rating_col: str, weight_col: str | None = None) -> tuple:
+    """Pearson r & p, Spearman rho & p, and the least-squares slope & intercept."""
+    from scipy import stats
+
+    cost = sub[cost_col].values
+    rating = sub[rating_col].values
+    if weight_col:
+        from analysis_scripts.sampling import weighted_cost_rating_stats
+        return weighted_cost_rating_stats(cost, rating, sub[weight_col].values)
+    pearson_r, pearson_p = stats.pearsonr(cost, rating)
+    spearman_rho, spearman_p = stats.spearmanr(cost, rating)
+    m, b = np.polyfit(cost, rating, 1)
+    return (float(pearson_r), float(pearson_p), float(spearman_rho), float(spearman_p), float(m), float(b))
@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+
+from analysis_scripts.cache import cached
+from analysis_scripts.plotting import density_scatter, plot_binned_means
+
+def state_cost_rating_analysis(
+    df: pd.DataFrame,
+    cost_col: str = "Avg_Tot_Pymt_Amt",
+    rating_col: str = "rating",
+    min_count: int = 20,
+    weight_col: str | None = None
+) -> pd.DataFrame:
+    """
+    For each state with at least `min_count` valid cost–rating pairs:
+      1. Computes Pearson and Spearman correlations.
+      2. Fits a least-squares regression line.
+      3. Plots cost vs. rating scatter (2-D histogram for large states) with the
+         regression line and annotates r & p.
+    Returns a DataFrame of state‐level metrics:
+      state, n, pearson_r, pearson_p, spearman_rho, spearman_p, slope, intercept
+    With `weight_col` (a stratified sample) the metrics and plots are weighted and p-values
+    use the effective sample size; `n` stays the number of sampled pairs.
+    """
+    import matplotlib.pyplot as plt
+
+    cols = ["facility_state", cost_col, rating_col] + ([weight_col] if weight_col else [])
+    results = _state_correlations(df[cols], cost_col, rating_col, min_count, weight_col)
+
+    groups = df.groupby("facility_state", observed=True)
+    for row in results.sort_values("state").itertuples(index=False):
+        sub = groups.get_group(row.state)[cols[1:]].dropna()
+        cost = sub[cost_col].values
+        rating = sub[rating_col].values
+        weights = sub[weight_col].values if weight_col else None
+        x_line = np.linspace(cost.min(), cost.max(), 100)
+
+        # Plot
+        fig, ax = plt.subplots(figsize=(6, 6))
+        if density_scatter(ax, cost, rating, weights=weights, edgecolor="k", linewidth=0.3):
+            plot_binned_means(ax, cost, rating, label=f"mean {rating_col} per cost bin", weights=weights)
+        plt.plot(x_line, row.slope * x_line + row.intercept,
+                 linestyle="--", linewidth=2,
+                 label=f"y = {row.slope:.2e}x + {row.intercept:.2f}")
+        plt.xlabel(cost_col)
+        plt.ylabel(rating_col)
+        plt.title(f"{row.state} (n={row.n})\nPearson r={row.pearson_r:.2f}, p={row.pearson_p:.2e}")
+        plt.legend()
+        plt.tight_layout()
+        plt.show()
+        plt.close(fig)
+
+    print(f"\n=== State‐Level Correlation Metrics{' (weighted)' if weight_col else ''} ===")
+    print(results[["state","n","pearson_r","pearson_p","spearman_rho","spearman_p"]]
+          .to_string(index=False,
+                     formatters={
+                         "pearson_r":"{:.3f}".format,
+                         "pearson_p":"{:.2e}".format,
+                         "spearman_rho":"{:.3f}".format,
+                         "spearman_p":"{:.2e}".format
+                     }))
+    
+    
+    return results
+
+
+@cached(depends=["analysis_scripts.sampling.weighted_cost_rating_stats"])
+def _state_correlations(pairs: pd.DataFrame, cost_col: str, rating_col: str, min_count: int,
+                        weight_col: str | None = None) -> pd.DataFrame:
+    """Per-state correlation and regression metrics, sorted by Pearson r."""
+    from scipy import stats
+
+    from analysis_scripts.sampling import weighted_cost_rating_stats
+
+    records = []
+    for state, group in pairs.groupby("facility_state", observed=True):
+        sub = group[[cost_col, rating_col] + ([weight_col] if weight_col else [])].dropna()
+        n = len(sub)
+        if n < min_count:
+            continue
+
+        cost = sub[cost_col].values
+        rating = sub[rating_col].values
+
+        if weight_col:
+            pearson_r, pearson_p, spearman_rho, spearman_p, slope, intercept = \
+                weighted_cost_rating_stats(cost, rating, sub[weight_col].values)
+        else:
+            # Correlations
+            pearson_r, pearson_p = stats.pearsonr(cost, rating)
+            spearman_rho, spearman_p = stats.spearmanr(cost, rating)
+
+            # Regression fit
+            slope, intercept = np.polyfit(cost, rating, 1)
+
+        records.append({
+            "state": state,
+            "n": n,
+            "pearson_r": pearson_r,
+            "pearson_p": pearson_p,
+            "spearman_rho": spearman_rho,
+            "spearman_p": spearman_p,
+            "slope": slope,
+            "intercept": intercept
+        })
+
+    return pd.DataFrame(records).sort_values("pearson_r", ascending=False)
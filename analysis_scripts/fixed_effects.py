@@ -0,0 +1,218 @@
+"""
+Linear regression with absorbed high-dimensional fixed effects.
+
+Instead of adding one dummy column per state, DRG (or DRG × hospital) level,
+the outcome and regressors are demeaned within every fixed-effect group by
+alternating projections (Gauss–Seidel sweeps of group-mean subtraction,
+with group sums from np.bincount) until they stop changing. OLS on the
+demeaned data gives the same slopes as the dummy-variable model
+(Frisch–Waugh–Lovell), using memory proportional to rows × regressors only.
+Standard errors can be clustered, e.g. by CCN.
+
+Degrees of freedom follow the dummy-variable model's rank: singleton groups are
+dropped first (their rows are fit exactly and say nothing about the slopes),
+levels made redundant by disconnected groups of two fixed effects are not
+counted, and fixed effects nested within the clusters are left out of the
+clustered small-sample correction.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ABSORB = ['facility_state', 'DRG_Cd']
+
+
+def group_codes(df: pd.DataFrame, spec) -> np.ndarray:
+    """Integer codes 0..G-1 for a column, or for the combinations of a list/tuple of columns."""
+    if isinstance(spec, (list, tuple)):
+        return df.groupby(list(spec), observed=True, sort=False).ngroup().to_numpy()
+    return pd.factorize(df[spec], sort=False)[0]
+
+
+def drop_singletons(data: pd.DataFrame, absorb) -> tuple[pd.DataFrame, list]:
+    """
+    Repeatedly drops rows that are alone in a group of any fixed effect (dropping
+    one can leave another group with a single row). Returns the rows kept and
+    their group codes per fixed effect.
+    """
+    while True:
+        codes = [group_codes(data, spec) for spec in absorb]
+        single = np.zeros(len(data), dtype=bool)
+        for c in codes:
+            single |= np.bincount(c)[c] == 1
+        if not single.any():
+            return data, codes
+        data = data[~single]
+
+
+def fixed_effect_rank(codes: list) -> int:
+    """
+    Columns of the dummy-variable design (intercept included) that aren't redundant.
+    One fixed effect: its levels. Two: levels of both minus the number of connected
+    components of the bipartite graph of their groups. Further fixed effects add
+    their levels minus one each, an upper bound if they are redundant too.
+    """
+    if not codes:
+        return 1
+    levels = [int(c.max()) + 1 for c in codes]
+    rank = levels[0]
+    if len(codes) > 1:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        a, b = codes[0], codes[1] + levels[0]
+        size = levels[0] + levels[1]
+        graph = coo_matrix((np.ones(len(a)), (a, b)), shape=(size, size))
+        n_components = connected_components(graph, directed=False)[0]
+        rank += levels[1] - n_components
+    return rank + sum(n - 1 for n in levels[2:])
+
+
+def _nested(codes: np.ndarray, clusters: np.ndarray) -> bool:
+    """Whether every group of a fixed effect lies within a single cluster."""
+    pairs = pd.DataFrame({'group': codes, 'cluster': clusters}).drop_duplicates()
+    return len(pairs) == int(codes.max()) + 1
+
+
+def demean(matrix: np.ndarray, codes: list, weights=None, tol: float = 1e-10, max_iter: int = 1000):
+    """
+    Removes the fixed effects in `codes` from each column of `matrix` (modified in place).
+    Each sweep subtracts the (weighted) group means of one fixed effect after another;
+    the sweeps stop once the largest mean removed is below `tol` times the column scale.
+    Returns (matrix, number of sweeps).
+    """
+    w = np.ones(len(matrix)) if weights is None else np.asarray(weights, dtype='float64')
+    group_weights = [np.bincount(c, weights=w) for c in codes]
+    scale = np.maximum(np.abs(matrix).max(axis=0), 1.0)
+
+    for sweep in range(1, max_iter + 1):
+        largest = np.zeros(matrix.shape[1])
+        for c, gw in zip(codes, group_weights):
+            for j in range(matrix.shape[1]):
+                means = np.bincount(c, weights=w * matrix[:, j], minlength=len(gw)) / gw
+                matrix[:, j] -= means[c]
+                largest[j] = max(largest[j], np.abs(means).max())
+        # A single fixed effect is removed exactly by one sweep.
+        if len(codes) <= 1 or (largest / scale).max() < tol:
+            return matrix, sweep
+    print(f"⚠️ Demeaning did not converge in {max_iter} sweeps (last change {(largest / scale).max():.2e})")
+    return matrix, max_iter
+
+
+def _cluster_sums(scores: np.ndarray, clusters: np.ndarray) -> np.ndarray:
+    n_clusters = clusters.max() + 1
+    return np.column_stack([np.bincount(clusters, weights=scores[:, j], minlength=n_clusters)
+                            for j in range(scores.shape[1])])
+
+
+def absorb_ols(df: pd.DataFrame, y: str, x: list, absorb=DEFAULT_ABSORB, cluster=None,
+               weights=None, tol: float = 1e-10):
+    """
+    OLS of `y` on `x` with the fixed effects in `absorb` (column names, or tuples of
+    columns for interacted effects) projected out. Rows with a missing value in any
+    used column are dropped.
+
+    Singleton groups are dropped, and K counts the regressors plus the rank of the
+    absorbed dummies (see fixed_effect_rank). Standard errors are clustered on `cluster`
+    (CR1, with the small-sample factor G/(G-1) · (N-1)/(N-K) of statsmodels, except that
+    fixed effects nested within the clusters don't count towards K), or classical when
+    `cluster` is None. `weights` names an optional analytic-weight column (WLS).
+    Raises ValueError if no residual degrees of freedom are left.
+    Returns:
+        table: coef, std_err, t, p_value per regressor
+        info: n_obs, n_singletons, n_clusters, fixed-effect levels, df_resid, sweeps, r2_within
+    """
+    from scipy import stats
+
+    absorb = list(absorb)
+    used = [y, *x] + [c for spec in absorb for c in (spec if isinstance(spec, (list, tuple)) else [spec])]
+    used += [c for c in [cluster, weights] if c]
+    data = df[list(dict.fromkeys(used))].dropna()
+    n_singletons = len(data)
+    data, codes = drop_singletons(data, absorb)
+    n_singletons -= len(data)
+
+    n = len(data)
+    levels = [int(c.max()) + 1 for c in codes] if n else [0] * len(codes)
+    k = len(x) + (fixed_effect_rank(codes) if n else 1)
+    df_resid = n - k
+    if df_resid <= 0:
+        raise ValueError(f"No residual degrees of freedom: {n} observations after dropping "
+                         f"{n_singletons} singletons, {k} parameters including the absorbed levels")
+
+    w = data[weights].to_numpy(dtype='float64') if weights else None
+    matrix = data[[y, *x]].to_numpy(dtype='float64', copy=True)
+    matrix -= np.average(matrix, axis=0, weights=w)
+    matrix, sweeps = demean(matrix, codes, w, tol=tol)
+    yd, Xd = matrix[:, 0], matrix[:, 1:]
+
+    sw = np.ones(len(yd)) if w is None else w
+    xtwx = Xd.T @ (Xd * sw[:, None])
+    beta = np.linalg.solve(xtwx, Xd.T @ (sw * yd))
+    resid = yd - Xd @ beta
+    bread = np.linalg.inv(xtwx)
+
+    if cluster:
+        clusters = pd.factorize(data[cluster])[0]
+        n_clusters = int(clusters.max()) + 1
+        if n_clusters < 2:
+            raise ValueError(f"Clustered standard errors need at least 2 clusters of {cluster}")
+        sums = _cluster_sums(Xd * (sw * resid)[:, None], clusters)
+        k_cluster = len(x) + fixed_effect_rank([c for c in codes if not _nested(c, clusters)])
+        factor = n_clusters / (n_clusters - 1) * (n - 1) / (n - k_cluster)
+        cov = factor * bread @ (sums.T @ sums) @ bread
+        dof = n_clusters - 1
+    else:
+        n_clusters = None
+        cov = bread * (sw * resid ** 2).sum() / df_resid
+        dof = df_resid
+
+    std_err = np.sqrt(np.diag(cov))
+    t = beta / std_err
+    table = pd.DataFrame({
+        'coef': beta,
+        'std_err': std_err,
+        't': t,
+        'p_value': 2 * stats.t.sf(np.abs(t), dof),
+    }, index=x)
+
+    info = {
+        'n_obs': n,
+        'n_singletons': n_singletons,
+        'n_clusters': n_clusters,
+        'levels': dict(zip([str(s) for s in absorb], levels)),
+        'df_resid': df_resid,
+        'sweeps': sweeps,
+        'r2_within': 1 - (sw * resid ** 2).sum() / (sw * yd ** 2).sum(),
+    }
+    return table, info
+
+
+def provider_drg_rows(df: pd.DataFrame) -> pd.DataFrame:
+    # The merged dataset repeats each provider × DRG row per payment measure.
+    return df.drop_duplicates(['Rndrng_Prvdr_CCN', 'DRG_Cd'], keep='last')
+
+
+def fixed_effects_regression(df: pd.DataFrame,
+                             y: str = "Avg_Tot_Pymt_Amt",
+                             x: list | None = None,
+                             absorb=DEFAULT_ABSORB,
+                             cluster: str | None = "Rndrng_Prvdr_CCN",
+                             weights: str | None = None):
+    """
+    1. Keeps one row per provider × DRG.
+    2. Regresses `y` on `x` (default: rating), absorbing state and DRG fixed effects.
+    3. Prints the coefficients with CCN-clustered standard errors.
+    Returns (table, info) as absorb_ols.
+    """
+    x = x or ["rating"]
+    table, info = absorb_ols(provider_drg_rows(df), y, x, absorb=absorb, cluster=cluster, weights=weights)
+
+    effects = " + ".join(f"{k} ({v} levels)" for k, v in info['levels'].items())
+    print(f"\n=== {y} ~ {' + '.join(x)} | {effects} ===")
+    print(table.to_string(formatters={'coef': "{:.4f}".format, 'std_err': "{:.4f}".format,
+                                      't': "{:.2f}".format, 'p_value': "{:.2e}".format}))
+    clustered = f", {info['n_clusters']} clusters by {cluster}" if cluster else ""
+    singletons = f" ({info['n_singletons']} singletons dropped)" if info['n_singletons'] else ""
+    print(f"n = {info['n_obs']}{singletons}{clustered}, within R² = {info['r2_within']:.4f}")
+    return table, info
@@ -1,11 +1,23 @@
+from contextlib import closing
+
 import pandas as pd
-import matplotlib.pyplot as plt
 
-def geographic_analysis(df: pd.DataFrame):
+from utils.sqlite_store import city_extremes_sql, connect, ruca_stats_sql, state_stats_sql
+
+def geographic_analysis(df: pd.DataFrame | None, db_path: str | None = None, weight_col: str | None = None):
     """
     1. State-level aggregation: mean payment & rating; bar chart.
     2. City-level: top-10 highest & lowest cost cities; bar charts.
     3. RUCA category (rural vs. urban) comparison; bar chart.
+
+    If `db_path` points at the SQLite store written by integrate_data, the three
+    groupings are computed inside SQLite and `df` is not read (it may be None).
+    The SQL path weights each provider × DRG row once, whereas the merged CSV
+    repeats a row per payment measure and Healthgrades match.
+
+    With `weight_col` (e.g. the `sample_weight` of a stratified sample) the means
+    are weighted and each table gains `mean_payment_ci` / `mean_rating_ci` columns, the
+    half-widths of approximate 95% confidence intervals.
     
     Returns:
         state_stats: DataFrame with mean_payment & mean_rating per state
@@ -13,22 +25,24 @@ def geographic_analysis(df: pd.DataFrame):
         top10_low_cities: DataFrame of top-10 lowest-cost cities
         ruca_stats: DataFrame with mean_payment & mean_rating per RUCA category
     """
+    import matplotlib.pyplot as plt
+
+    if db_path is not None:
+        with closing(connect(db_path)) as conn:
+            state_stats = state_stats_sql(conn)
+            top10_high_cities, top10_low_cities = city_extremes_sql(conn, n=10)
+            ruca_stats = ruca_stats_sql(conn)
+    else:
+        state_stats, top10_high_cities, top10_low_cities, ruca_stats = _geographic_stats(df, weight_col)
+
     # ——— 1. State-level aggregation ———
-    state_stats = (
-        df
-        .groupby('facility_state')
-        .agg(
-            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
-            mean_rating=('rating', 'mean')
-        )
-        .sort_values('mean_payment', ascending=False)
-    )
     print("\n=== State-Level Mean Payment & Rating ===")
     print(state_stats.head(10))
     
     # Bar chart: top 10 states by mean payment
     state_stats['mean_payment'].head(10).plot(
-        kind='bar', figsize=(10, 6), title='Top 10 States by Mean Payment'
+        kind='bar', figsize=(10, 6), title='Top 10 States by Mean Payment',
+        yerr=_payment_ci(state_stats.head(10))
     )
     plt.ylabel('Mean Avg_Tot_Pymt_Amt')
     plt.xlabel('State')
@@ -36,18 +50,6 @@ def geographic_analysis(df: pd.DataFrame):
     plt.show()
     
     # ——— 2. City-level high/low cost ———
-    city_stats = (
-        df
-        .groupby('facility_city')
-        .agg(
-            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
-            mean_rating=('rating', 'mean')
-        )
-        .dropna()
-    )
-    top10_high_cities = city_stats.nlargest(10, 'mean_payment')
-    top10_low_cities  = city_stats.nsmallest(10, 'mean_payment')
-    
     print("\n=== Top 10 Highest-Cost Cities ===")
     print(top10_high_cities)
     print("\n=== Top 10 Lowest-Cost Cities ===")
@@ -55,7 +57,8 @@ def geographic_analysis(df: pd.DataFrame):
     
     # Bar charts: top/high and low cost cities
     top10_high_cities['mean_payment'].plot(
-        kind='bar', figsize=(10, 6), title='Top 10 Highest-Cost Cities'
+        kind='bar', figsize=(10, 6), title='Top 10 Highest-Cost Cities',
+        yerr=_payment_ci(top10_high_cities)
     )
     plt.ylabel('Mean Avg_Tot_Pymt_Amt')
     plt.xlabel('City')
@@ -64,7 +67,8 @@ def geographic_analysis(df: pd.DataFrame):
     plt.show()
     
     top10_low_cities['mean_payment'].plot(
-        kind='bar', figsize=(10, 6), title='Top 10 Lowest-Cost Cities'
+        kind='bar', figsize=(10, 6), title='Top 10 Lowest-Cost Cities',
+        yerr=_payment_ci(top10_low_cities)
     )
     plt.ylabel('Mean Avg_Tot_Pymt_Amt')
     plt.xlabel('City')
@@ -73,21 +77,13 @@ def geographic_analysis(df: pd.DataFrame):
     plt.show()
     
     # ——— 3. RUCA category comparison ———
-    ruca_stats = (
-        df
-        .groupby('Rndrng_Prvdr_RUCA_Desc')
-        .agg(
-            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
-            mean_rating=('rating', 'mean')
-        )
-        .sort_values('mean_payment', ascending=False)
-    )
     print("\n=== Mean Payment & Rating by RUCA Category ===")
     print(ruca_stats)
     
     # Bar chart: RUCA mean payment
     ruca_stats['mean_payment'].plot(
-        kind='bar', figsize=(8, 6), title='Mean Payment by RUCA Category'
+        kind='bar', figsize=(8, 6), title='Mean Payment by RUCA Category',
+        yerr=_payment_ci(ruca_stats)
     )
     plt.ylabel('Mean Avg_Tot_Pymt_Amt')
     plt.xlabel('RUCA Category')
@@ -101,3 +97,66 @@ def geographic_analysis(df: pd.DataFrame):
     print(ruca_stats.head())
     
     return state_stats, top10_high_cities, top10_low_cities, ruca_stats
+
+
+def _payment_ci(stats: pd.DataFrame):
+    # Error bars only for weighted (sampled) estimates.
+    return stats['mean_payment_ci'] if 'mean_payment_ci' in stats else None
+
+
+def _geographic_stats(df: pd.DataFrame, weight_col: str | None = None):
+    """In-memory counterpart of the SQL aggregates in utils.sqlite_store."""
+    if weight_col is not None:
+        return _weighted_geographic_stats(df, weight_col)
+
+    state_stats = (
+        df
+        .groupby('facility_state', observed=True)
+        .agg(
+            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
+            mean_rating=('rating', 'mean')
+        )
+        .sort_values('mean_payment', ascending=False)
+    )
+
+    city_stats = (
+        df
+        .groupby('facility_city', observed=True)
+        .agg(
+            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
+            mean_rating=('rating', 'mean')
+        )
+        .dropna()
+    )
+    top10_high_cities = city_stats.nlargest(10, 'mean_payment')
+    top10_low_cities  = city_stats.nsmallest(10, 'mean_payment')
+
+    ruca_stats = (
+        df
+        .groupby('Rndrng_Prvdr_RUCA_Desc', observed=True)
+        .agg(
+            mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
+            mean_rating=('rating', 'mean')
+        )
+        .sort_values('mean_payment', ascending=False)
+    )
+
+    return state_stats, top10_high_cities, top10_low_cities, ruca_stats
+
+
+def _weighted_geographic_stats(df: pd.DataFrame, weight_col: str):
+    from analysis_scripts.sampling import weighted_group_means
+
+    columns = {'mean_payment': 'Avg_Tot_Pymt_Amt', 'mean_rating': 'rating'}
+    state_stats = (
+        weighted_group_means(df, 'facility_state', columns, weight_col)
+        .sort_values('mean_payment', ascending=False)
+    )
+    city_stats = weighted_group_means(df, 'facility_city', columns, weight_col).dropna(subset=list(columns))
+    top10_high_cities = city_stats.nlargest(10, 'mean_payment')
+    top10_low_cities = city_stats.nsmallest(10, 'mean_payment')
+    ruca_stats = (
+        weighted_group_means(df, 'Rndrng_Prvdr_RUCA_Desc', columns, weight_col)
+        .sort_values('mean_payment', ascending=False)
+    )
+    return state_stats, top10_high_cities, top10_low_cities, ruca_stats
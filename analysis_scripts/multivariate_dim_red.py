@@ -1,9 +1,8 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-from sklearn.impute import SimpleImputer
+
+from analysis_scripts.cache import cached
+from analysis_scripts.plotting import density_scatter
 
 def multivariate_dimensionality_reduction(
     df: pd.DataFrame,
@@ -13,9 +12,11 @@ def multivariate_dimensionality_reduction(
     """
     1. Imputes missing numeric values via median.
     2. Performs PCA on all numeric columns (with guards for zero rows).
-    3. Plots explained variance, 2-D projection, and KMeans clusters.
+    3. Plots explained variance, 2-D projection, and KMeans clusters (2-D histograms for large data).
     Returns a DataFrame with PC coordinates and cluster labels (empty if skipped).
     """
+    import matplotlib.pyplot as plt
+
     # 1. Select numeric columns
     numeric_cols = df.select_dtypes(include='number').columns.tolist()
     X_raw = df[numeric_cols]
@@ -25,57 +26,73 @@ def multivariate_dimensionality_reduction(
         print("⚠️ No rows in the dataset—skipping PCA and clustering.")
         return pd.DataFrame()
 
-    # 3. Impute missing values
-    imputer = SimpleImputer(strategy='median')
-    X = imputer.fit_transform(X_raw)
-
-    # 4. Adjust components if too many samples
-    n_samples = X.shape[0]
+    # 3. Adjust components if too many samples
+    n_samples = X_raw.shape[0]
     if n_samples < n_components:
         print(f"⚠️ Only {n_samples} samples available; reducing n_components→{n_samples}")
         n_components = n_samples
 
-    # 5. PCA
-    pca = PCA(n_components=n_components, random_state=42)
-    pcs = pca.fit_transform(X)
-    pc_cols = [f"PC{i+1}" for i in range(n_components)]
-    df_pca = pd.DataFrame(pcs, columns=pc_cols, index=df.index)
+    # 4. Impute, PCA and KMeans (cached on the numeric data and parameters)
+    df_pca, explained_variance_ratio = _pca_clusters(X_raw, n_components, n_clusters)
 
-    # 6. Explained variance plot
-    plt.figure(figsize=(6, 4))
-    plt.bar(range(1, n_components + 1), pca.explained_variance_ratio_)
+    # 5. Explained variance plot
+    fig = plt.figure(figsize=(6, 4))
+    plt.bar(range(1, n_components + 1), explained_variance_ratio)
     plt.xlabel("Principal Component")
     plt.ylabel("Explained Variance Ratio")
     plt.title("PCA Explained Variance")
     plt.xticks(range(1, n_components + 1))
     plt.tight_layout()
     plt.show()
+    plt.close(fig)
 
-    # 7. 2-D scatter if possible
+    # 6. 2-D scatter if possible (a 2-D histogram for large data)
     if n_components >= 2:
-        plt.figure(figsize=(6, 6))
-        plt.scatter(df_pca["PC1"], df_pca["PC2"], alpha=0.5)
+        fig, ax = plt.subplots(figsize=(6, 6))
+        density_scatter(ax, df_pca["PC1"], df_pca["PC2"])
         plt.xlabel("PC1")
         plt.ylabel("PC2")
         plt.title("Projection onto First Two Principal Components")
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
 
-    # 8. KMeans clustering
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df_pca["cluster"] = kmeans.fit_predict(df_pca[pc_cols])
-
-    # 9. Cluster plot
+    # 7. Cluster plot; once binned, the clusters are marked at their centroids
     if n_components >= 2:
-        plt.figure(figsize=(6, 6))
-        plt.scatter(df_pca["PC1"], df_pca["PC2"], c=df_pca["cluster"], alpha=0.5)
+        fig, ax = plt.subplots(figsize=(6, 6))
+        if density_scatter(ax, df_pca["PC1"], df_pca["PC2"], c=df_pca["cluster"]):
+            centroids = df_pca.groupby("cluster")[["PC1", "PC2"]].mean()
+            ax.scatter(centroids["PC1"], centroids["PC2"], c=centroids.index, cmap='tab10',
+                       marker='X', s=120, edgecolors='white')
+            for cluster, (x, y) in centroids.iterrows():
+                ax.annotate(str(cluster), (x, y), xytext=(6, 6), textcoords='offset points')
         plt.xlabel("PC1")
         plt.ylabel("PC2")
         plt.title(f"KMeans Clusters (k={n_clusters}) in PCA Space")
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
 
     print(df_pca.head())
 
     return df_pca
 
+
+@cached
+def _pca_clusters(X_raw: pd.DataFrame, n_components: int, n_clusters: int):
+    """Median imputation, PCA and KMeans; returns (PC coordinates + cluster, explained variance ratios)."""
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    from sklearn.impute import SimpleImputer
+
+    imputer = SimpleImputer(strategy='median')
+    X = imputer.fit_transform(X_raw)
+
+    pca = PCA(n_components=n_components, random_state=42)
+    pcs = pca.fit_transform(X)
+    pc_cols = [f"PC{i+1}" for i in range(n_components)]
+    df_pca = pd.DataFrame(pcs, columns=pc_cols, index=X_raw.index)
+
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    df_pca["cluster"] = kmeans.fit_predict(df_pca[pc_cols])
+    return df_pca, pca.explained_variance_ratio_
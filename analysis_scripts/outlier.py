@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import IsolationForest
+
+from analysis_scripts.cache import cached
 
 def outlier_anomaly_detection(
     df: pd.DataFrame,
@@ -22,6 +23,22 @@ def outlier_anomaly_detection(
     # Ensure no NaNs for the methods below
     df_numeric = df[numeric_cols].fillna(df[numeric_cols].median())
 
+    flags = _outlier_flags(df_numeric, contamination)
+    df["outlier_iqr"] = flags["outlier_iqr"]
+    df["anomaly_iforest"] = flags["anomaly_iforest"]
+    print(f"Univariate IQR outliers detected: {flags['outlier_iqr'].sum()} rows")
+    print(f"IsolationForest anomalies detected (contamination={contamination}): {flags['anomaly_iforest'].sum()} rows")
+
+    print(df[['outlier_iqr', 'anomaly_iforest']].sum())
+    
+    return df
+
+
+@cached
+def _outlier_flags(df_numeric: pd.DataFrame, contamination: float) -> pd.DataFrame:
+    """IQR and IsolationForest flags for an already-imputed numeric frame."""
+    from sklearn.ensemble import IsolationForest
+
     # 1. Univariate IQR outlier detection
     Q1 = df_numeric.quantile(0.25)
     Q3 = df_numeric.quantile(0.75)
@@ -31,18 +48,12 @@ def outlier_anomaly_detection(
 
     # Flag rows where any col is outside the [lower, upper] range
     outlier_mask = ((df_numeric < lower) | (df_numeric > upper)).any(axis=1)
-    df["outlier_iqr"] = outlier_mask
-    print(f"Univariate IQR outliers detected: {outlier_mask.sum()} rows")
 
     # 2. Multivariate anomaly detection via Isolation Forest
     iso = IsolationForest(contamination=contamination, random_state=42)
     preds = iso.fit_predict(df_numeric)
     # In sklearn IF, -1 = anomaly, 1 = normal
     anomaly_mask = (preds == -1)
-    df["anomaly_iforest"] = anomaly_mask
-    print(f"IsolationForest anomalies detected (contamination={contamination}): {anomaly_mask.sum()} rows")
-
-    print(df[['outlier_iqr', 'anomaly_iforest']].sum())
-    
-    return df
 
+    return pd.DataFrame({"outlier_iqr": outlier_mask, "anomaly_iforest": anomaly_mask},
+                        index=df_numeric.index)
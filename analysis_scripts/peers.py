@@ -0,0 +1,308 @@
+"""
+Nearest-neighbor search for hospitals with a similar cost/quality profile.
+
+Each hospital (CCN) is summarized by a feature vector: its rating, case-mix
+adjusted cost index, mean payment, Medicare share of payments, charge-to-payment
+ratio, volume, DRG breadth and RUCA code. The features are median-imputed,
+standardized and projected with PCA; a KD-tree over the projection answers
+batched k-nearest-neighbor queries. The fitted pipeline, the feature matrix and
+the tree are persisted together, so later queries and newly scored hospitals
+use the same projection.
+
+    index = build_peer_index(df)
+    index.save()
+    find_peers(load_peer_index(), "010001", k=20)
+
+    python -m analysis_scripts.peers 010001 050454 --k 20
+
+Inserted hospitals go into a pending buffer that queries scan directly; once it
+exceeds REBUILD_FRACTION of the tree, the tree is rebuilt. A re-inserted CCN
+leaves a dead entry in the tree until then; queries fetch QUERY_SLACK extra
+neighbors and re-query only the hospitals whose neighborhood was mostly dead.
+CCNs are normalized to their 6-character form (see utils.sqlite_store.normalize_ccn).
+"""
+
+import argparse
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.case_mix import build_drg_reference, hospital_cost_index
+from utils.sqlite_store import normalize_ccn
+
+DEFAULT_PEER_INDEX_PATH = "data/processed/peer_index.pkl"
+FEATURES = ['rating', 'cost_index', 'mean_payment', 'medicare_share', 'charge_ratio',
+            'log_discharges', 'n_drgs', 'ruca']
+INFO_COLS = ['name', 'facility_state', 'facility_city']
+N_COMPONENTS = 5
+LEAF_SIZE = 40
+REBUILD_FRACTION = 0.1
+QUERY_SLACK = 8
+
+
+def _normalized(ccns) -> list:
+    return normalize_ccn(pd.Series(list(ccns), dtype=object)).tolist()
+
+
+def hospital_features(df: pd.DataFrame, reference: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    One row per CCN with the FEATURES used for peer search, plus name/state/city.
+    `reference` is the per-DRG baseline for the cost index (built from `df` if omitted).
+    """
+    if reference is None:
+        reference = build_drg_reference(df)
+
+    # The merged dataset repeats each provider × DRG row per payment measure.
+    rows = df.drop_duplicates(['Rndrng_Prvdr_CCN', 'DRG_Cd'], keep='last')
+    rows = rows.dropna(subset=['Rndrng_Prvdr_CCN', 'Avg_Tot_Pymt_Amt', 'Tot_Dschrgs'])
+    discharges = rows['Tot_Dschrgs'].astype('float64')
+    rows = rows.assign(
+        Rndrng_Prvdr_CCN=normalize_ccn(rows['Rndrng_Prvdr_CCN']),
+        weighted_payment=rows['Avg_Tot_Pymt_Amt'] * discharges,
+        weighted_medicare=rows['Avg_Mdcr_Pymt_Amt'] * discharges,
+        weighted_charges=rows['Avg_Submtd_Cvrd_Chrg'] * discharges,
+    )
+
+    grouped = rows.groupby('Rndrng_Prvdr_CCN', sort=True)
+    features = grouped.agg(
+        rating=('rating', 'mean'),
+        mean_payment=('Avg_Tot_Pymt_Amt', 'mean'),
+        weighted_payment=('weighted_payment', 'sum'),
+        weighted_medicare=('weighted_medicare', 'sum'),
+        weighted_charges=('weighted_charges', 'sum'),
+        total_discharges=('Tot_Dschrgs', 'sum'),
+        n_drgs=('DRG_Cd', 'nunique'),
+        ruca=('Rndrng_Prvdr_RUCA', 'first'),
+        name=('Rndrng_Prvdr_Org_Name', 'first'),
+        facility_state=('facility_state', 'first'),
+        facility_city=('facility_city', 'first'),
+    )
+    features['medicare_share'] = features['weighted_medicare'] / features['weighted_payment']
+    features['charge_ratio'] = features['weighted_charges'] / features['weighted_payment']
+    features['log_discharges'] = np.log1p(features['total_discharges'].astype('float64'))
+
+    cost_index = hospital_cost_index(rows, reference)['cost_index']
+    features['cost_index'] = cost_index.reindex(features.index)
+
+    features[FEATURES] = features[FEATURES].astype('float64')
+    return features[FEATURES + INFO_COLS]
+
+
+def brute_force_knn(points: np.ndarray, queries: np.ndarray, k: int, block: int = 2**24):
+    """
+    Exact k-NN by scanning every point, for as many queries at a time as keep the
+    distance block under `block` entries. Returns (distances, positions).
+    """
+    k = min(k, len(points))
+    batch = max(1, block // max(len(points), 1))
+    norms = (points ** 2).sum(axis=1)
+    distances = np.empty((len(queries), k))
+    positions = np.empty((len(queries), k), dtype='int64')
+    for start in range(0, len(queries), batch):
+        q = queries[start:start + batch]
+        d2 = np.maximum((q ** 2).sum(axis=1)[:, None] - 2 * q @ points.T + norms[None, :], 0)
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(d2, part, axis=1).argsort(axis=1)
+        positions[start:start + batch] = np.take_along_axis(part, order, axis=1)
+        distances[start:start + batch] = np.sqrt(np.take_along_axis(d2, positions[start:start + batch], axis=1))
+    return distances, positions
+
+
+class PeerIndex:
+    """KD-tree over the PCA embedding of hospital features, with a brute-force pending buffer."""
+
+    def __init__(self, features: pd.DataFrame, reference: pd.DataFrame | None = None,
+                 n_components: int = N_COMPONENTS, leaf_size: int = LEAF_SIZE,
+                 rebuild_fraction: float = REBUILD_FRACTION):
+        from sklearn.decomposition import PCA
+        from sklearn.impute import SimpleImputer
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        self.reference = reference
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.model = make_pipeline(SimpleImputer(strategy='median'), StandardScaler(),
+                                   PCA(n_components=min(n_components, len(FEATURES)), random_state=42))
+        self.model.fit(features[FEATURES])
+        features = features.set_axis(_normalized(features.index))
+        self.features = features.copy()
+        self.ccns = features.index.to_numpy(dtype=object)
+        self.points = self.embed(features)
+        self.alive = np.ones(len(self.ccns), dtype=bool)
+        self._build()
+
+    @property
+    def explained_variance_ratio(self) -> np.ndarray:
+        return self.model[-1].explained_variance_ratio_
+
+    @property
+    def n_pending(self) -> int:
+        return len(self.ccns) - self.n_indexed
+
+    def embed(self, features: pd.DataFrame) -> np.ndarray:
+        return self.model.transform(features[FEATURES])
+
+    def _build(self):
+        from sklearn.neighbors import KDTree
+
+        self.ccns, self.points = self.ccns[self.alive], self.points[self.alive]
+        self.alive = np.ones(len(self.ccns), dtype=bool)
+        self.position = {ccn: i for i, ccn in enumerate(self.ccns)}
+        self.tree = KDTree(self.points, leaf_size=self.leaf_size)
+        self.n_indexed = len(self.ccns)
+
+    def rebuild(self):
+        """Rebuilds the tree over every live hospital, emptying the pending buffer."""
+        self._build()
+
+    # ——— Updates ———
+
+    def insert(self, features: pd.DataFrame):
+        """
+        Adds newly scored hospitals (rows of hospital_features, projected with the fitted
+        pipeline). A CCN already in the index replaces its old entry.
+        """
+        features = features.set_axis(_normalized(features.index))
+        for ccn in features.index:
+            if ccn in self.position:
+                self.alive[self.position[ccn]] = False
+        start = len(self.ccns)
+        self.ccns = np.concatenate([self.ccns, features.index.to_numpy(dtype=object)])
+        self.points = np.vstack([self.points, self.embed(features)])
+        self.alive = np.concatenate([self.alive, np.ones(len(features), dtype=bool)])
+        self.position.update({ccn: start + i for i, ccn in enumerate(features.index)})
+        self.features = pd.concat([self.features.drop(features.index, errors='ignore'), features])
+        if self.n_pending > self.rebuild_fraction * max(self.n_indexed, 1):
+            self._build()
+
+    def insert_rows(self, df: pd.DataFrame):
+        """Scores the hospitals in merged-dataset rows `df` and inserts them."""
+        self.insert(hospital_features(df, self.reference))
+
+    # ——— Queries ———
+
+    def _query_tree(self, points: np.ndarray, k: int, exclude: np.ndarray):
+        """
+        k nearest live, non-excluded tree entries per query (padded with inf). Each query
+        fetches k + 1 + QUERY_SLACK neighbors; the few that come back with fewer than k
+        usable ones are queried again with four times as many, until the tree runs out.
+        """
+        distances = np.full((len(points), k), np.inf)
+        positions = np.zeros((len(points), k), dtype='int64')
+        rows = np.arange(len(points))
+        fetch = k + 1 + QUERY_SLACK
+        while len(rows) and self.n_indexed:
+            m = min(fetch, self.n_indexed)
+            d, p = self.tree.query(points[rows], k=m)
+            usable = self.alive[p] & (p != exclude[rows, None])
+            # Usable neighbors first, each part still in order of distance.
+            order = np.argsort(~usable, axis=1, kind='stable')[:, :k]
+            width = order.shape[1]
+            distances[rows, :width] = np.where(np.take_along_axis(usable, order, axis=1),
+                                               np.take_along_axis(d, order, axis=1), np.inf)
+            positions[rows, :width] = np.take_along_axis(p, order, axis=1)
+            done = (usable.sum(axis=1) >= k) | (m == self.n_indexed)
+            rows, fetch = rows[~done], 4 * fetch
+        return distances, positions
+
+    def query_points(self, points: np.ndarray, k: int, exclude: np.ndarray | None = None):
+        """
+        k nearest live hospitals to each row of `points` (in embedding space), skipping
+        position `exclude[i]` for query i (-1 for none). Returns (distances, positions);
+        queries with fewer than k live hospitals get inf distances in the remaining columns.
+        """
+        points = np.atleast_2d(points)
+        exclude = np.full(len(points), -1) if exclude is None else np.asarray(exclude)
+        distances, positions = self._query_tree(points, k, exclude)
+        pending = np.arange(self.n_indexed, len(self.ccns))
+        pending = pending[self.alive[pending]]
+        if len(pending):
+            # One extra neighbor covers the excluded hospital.
+            pending_distances, pending_positions = brute_force_knn(self.points[pending], points, k + 1)
+            distances = np.hstack([distances, pending_distances])
+            positions = np.hstack([positions, pending[pending_positions]])
+
+        skip = ~self.alive[positions] | (positions == exclude[:, None])
+        distances = np.where(skip, np.inf, distances)
+        order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        positions = np.take_along_axis(positions, order, axis=1)
+        return distances, positions
+
+    def query(self, ccns, k: int = 20) -> pd.DataFrame:
+        """
+        The k most similar hospitals to each CCN in `ccns`, in one batched query.
+        Returns one row per (ccn, rank) with the peer's CCN, distance and descriptive columns.
+        """
+        ccns = _normalized([ccns] if isinstance(ccns, (str, int)) else ccns)
+        unknown = [c for c in ccns if c not in self.position]
+        if unknown:
+            print(f"⚠️ {len(unknown)} CCN(s) not in the peer index: {', '.join(unknown[:10])}")
+        ccns = [c for c in ccns if c in self.position]
+        if not ccns:
+            return pd.DataFrame(columns=['ccn', 'rank', 'peer_ccn', 'distance', *FEATURES, *INFO_COLS])
+
+        own = np.array([self.position[c] for c in ccns])
+        distances, positions = self.query_points(self.points[own], k, exclude=own)
+        found = np.isfinite(distances)
+        peers = pd.DataFrame({
+            'ccn': np.repeat(ccns, positions.shape[1])[found.ravel()],
+            'rank': np.tile(np.arange(1, positions.shape[1] + 1), len(ccns))[found.ravel()],
+            'peer_ccn': self.ccns[positions[found]],
+            'distance': distances[found],
+        })
+        return peers.join(self.features, on='peer_ccn')
+
+    # ——— Persistence ———
+
+    def save(self, path: str = DEFAULT_PEER_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"[SUCCESS] Peer index ({int(self.alive.sum())} hospitals) saved to {path}")
+
+
+def load_peer_index(path: str = DEFAULT_PEER_INDEX_PATH) -> PeerIndex:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def build_peer_index(df: pd.DataFrame, reference: pd.DataFrame | None = None, **kwargs) -> PeerIndex:
+    """
+    1. Aggregates the merged rows into one feature vector per hospital.
+    2. Fits median imputation, standardization and PCA on them.
+    3. Builds a KD-tree over the projected hospitals.
+    """
+    if reference is None:
+        reference = build_drg_reference(df)
+    index = PeerIndex(hospital_features(df, reference), reference, **kwargs)
+    ratios = ", ".join(f"{r:.2f}" for r in index.explained_variance_ratio)
+    print(f"[INFO] Peer index over {index.n_indexed} hospitals; PCA explained variance: {ratios}")
+    return index
+
+
+def find_peers(index: PeerIndex, ccn, k: int = 20) -> pd.DataFrame:
+    """Prints and returns the k hospitals most similar to `ccn` (e.g. "010001" or 10001)."""
+    ccn = _normalized([ccn])[0]
+    peers = index.query([ccn], k)
+    if ccn in index.position:
+        own = index.features.loc[ccn]
+        print(f"\n=== {k} Peers of {ccn} ({own['name']}, {own['facility_city']}, {own['facility_state']}) ===")
+        print(peers[['rank', 'peer_ccn', 'distance', *INFO_COLS, 'rating', 'cost_index', 'mean_payment']]
+              .to_string(index=False, formatters={'distance': "{:.3f}".format, 'rating': "{:.1f}".format,
+                                                  'cost_index': "{:.3f}".format, 'mean_payment': "{:,.0f}".format}))
+    return peers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find hospitals with a similar cost/quality profile.")
+    parser.add_argument("ccn", nargs="+")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--index", default=DEFAULT_PEER_INDEX_PATH, help="peer index written by integrate_data.py --peer-index")
+    args = parser.parse_args()
+    peer_index = load_peer_index(args.index)
+    for ccn in args.ccn:
+        find_peers(peer_index, ccn, args.k)
@@ -0,0 +1,161 @@
+"""
+Plot helpers that draw summaries of the data rather than every row.
+
+Scatter plots with more than SCATTER_MAX_POINTS points become a 2-D histogram
+(np.histogram2d, log-scaled counts per bin), optionally overlaid with the mean
+of y per x bin; both take sampling weights. Boxplots are drawn with Axes.bxp from quantiles computed once
+per column or group (weighted, given sampling weights), with only the most extreme fliers shown, and
+histograms from np.histogram. The work per figure is a vectorized pass over the data plus
+a drawing step whose size depends on the number of bins, not rows.
+
+All functions take a matplotlib Axes; matplotlib itself is imported lazily.
+"""
+
+import numpy as np
+import pandas as pd
+
+SCATTER_MAX_POINTS = 20_000
+SCATTER_BINS = 200
+MEAN_BINS = 40
+MAX_FLIERS = 100
+
+
+def _as_float(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(values, dtype='float64')
+
+
+def _finite_pairs(x, y, weights=None):
+    """x and y where both (and the weight, if given) are finite; weights is None or the matching weights."""
+    x, y = _as_float(x), _as_float(y)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if weights is None:
+        return x[keep], y[keep], None
+    weights = _as_float(weights)
+    keep &= np.isfinite(weights)
+    return x[keep], y[keep], weights[keep]
+
+
+def density_scatter(ax, x, y, bins: int = SCATTER_BINS, max_points: int = SCATTER_MAX_POINTS,
+                    weights=None, **scatter_kwargs):
+    """
+    Scatter of x vs. y; above `max_points` pairs, a log-scaled 2-D histogram of counts instead.
+    With `weights` (e.g. sampling weights) the histogram sums the weights per bin.
+    Returns True if the data was binned.
+    """
+    from matplotlib.colors import LogNorm
+
+    x, y, weights = _finite_pairs(x, y, weights)
+    if len(x) <= max_points:
+        ax.scatter(x, y, **{'alpha': 0.5, **scatter_kwargs})
+        return False
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, weights=weights)
+    counts = np.ma.masked_less_equal(counts, 0)
+    mesh = ax.pcolormesh(x_edges, y_edges, counts.T, norm=LogNorm(vmin=counts.min(), vmax=counts.max()),
+                         cmap='viridis', shading='flat', rasterized=True)
+    ax.figure.colorbar(mesh, ax=ax, label='rows per bin' if weights is None else 'weighted rows per bin')
+    return True
+
+
+def binned_means(x, y, bins: int = MEAN_BINS, weights=None) -> pd.DataFrame:
+    """
+    Mean of y and row count per equal-width bin of x (empty bins dropped).
+    With `weights` the means are weighted; `count` stays the number of rows.
+    """
+    x, y, weights = _finite_pairs(x, y, weights)
+    if not len(x):
+        return pd.DataFrame(columns=['x', 'mean', 'count'])
+    edges = np.histogram_bin_edges(x, bins=bins)
+    index = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, len(edges) - 2)
+    count = np.bincount(index, minlength=len(edges) - 1)
+    if weights is None:
+        weight = count
+        total = np.bincount(index, weights=y, minlength=len(edges) - 1)
+    else:
+        weight = np.bincount(index, weights=weights, minlength=len(edges) - 1)
+        total = np.bincount(index, weights=weights * y, minlength=len(edges) - 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    keep = weight > 0
+    return pd.DataFrame({'x': centers[keep], 'mean': total[keep] / weight[keep], 'count': count[keep]})
+
+
+def plot_binned_means(ax, x, y, bins: int = MEAN_BINS, label: str = 'mean per bin', weights=None, **plot_kwargs):
+    means = binned_means(x, y, bins, weights=weights)
+    ax.plot(means['x'], means['mean'], **{'color': 'tab:red', 'marker': 'o', 'markersize': 3,
+                                         'linewidth': 1.5, 'label': label, **plot_kwargs})
+    return means
+
+
+def box_stats(values, label=None, whis: float = 1.5, max_fliers: int = MAX_FLIERS, weights=None) -> dict:
+    """
+    The statistics Axes.bxp draws (quartiles, median, mean, whiskers at `whis` × IQR like
+    plt.boxplot), computed once from the non-missing values. With `weights` (e.g. sampling
+    weights) the quartiles and mean are weighted. At most `max_fliers` of the points beyond
+    the whiskers are kept, split between the lowest and the highest.
+    """
+    v = _as_float(values)
+    keep = np.isfinite(v) if weights is None else np.isfinite(v) & np.isfinite(_as_float(weights))
+    v = v[keep]
+    if not len(v):
+        return {'label': label, 'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'mean': np.nan,
+                'whislo': np.nan, 'whishi': np.nan, 'fliers': np.array([])}
+    if weights is None:
+        q1, med, q3 = np.quantile(v, [0.25, 0.5, 0.75])
+        mean = v.mean()
+    else:
+        from analysis_scripts.sampling import weighted_quantiles
+        w = _as_float(weights)[keep]
+        q1, med, q3 = weighted_quantiles(v, w, [0.25, 0.5, 0.75])
+        mean = np.average(v, weights=w)
+    lo, hi = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+    inside = v[(v >= lo) & (v <= hi)]
+    low, high = v[v < lo], v[v > hi]
+    half = max_fliers // 2
+    if len(low) > half:
+        low = np.partition(low, half - 1)[:half] if half else low[:0]
+    if len(high) > max_fliers - len(low):
+        keep = max_fliers - len(low)
+        high = np.partition(high, len(high) - keep)[len(high) - keep:] if keep else high[:0]
+    return {
+        'label': label,
+        'med': med,
+        'q1': q1,
+        'q3': q3,
+        'mean': mean,
+        'whislo': inside.min() if len(inside) else q1,
+        'whishi': inside.max() if len(inside) else q3,
+        'fliers': np.concatenate([low, high]),
+    }
+
+
+def grouped_box_stats(df: pd.DataFrame, column: str, by: str, weight_col: str | None = None, **kwargs) -> list:
+    """box_stats of `column` for each group of `by`, in group order, weighted by `weight_col` if given."""
+    if weight_col is None:
+        return [box_stats(values, str(name), **kwargs)
+                for name, values in df.groupby(by, observed=True)[column]]
+    return [box_stats(group[column], str(name), weights=group[weight_col], **kwargs)
+            for name, group in df.groupby(by, observed=True)[[column, weight_col]]]
+
+
+def boxplot(ax, stats: list, **bxp_kwargs):
+    """Draws precomputed box_stats with Axes.bxp."""
+    stats = [s for s in stats if np.isfinite(s['med'])]
+    if stats:
+        ax.bxp(stats, **{'flierprops': {'markersize': 3, 'alpha': 0.5}, **bxp_kwargs})
+    return ax
+
+
+def histogram(ax, values, bins: int = 30, weights=None, **stairs_kwargs):
+    """Histogram of the finite values from np.histogram (summing `weights` if given), drawn as filled steps."""
+    v = _as_float(values)
+    keep = np.isfinite(v)
+    if weights is not None:
+        weights = _as_float(weights)
+        keep &= np.isfinite(weights)
+        weights = weights[keep]
+    counts, edges = np.histogram(v[keep], bins=bins, weights=weights)
+    ax.stairs(counts, edges, **{'fill': True, **stairs_kwargs})
+    ax.grid(True, alpha=0.3)
+    return counts, edges
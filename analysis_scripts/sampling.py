@@ -0,0 +1,280 @@
+"""
+Stratified sampling for quick exploratory runs, with weighted estimates.
+
+    sample = stratified_sample(df, fraction=0.1)            # or n_rows=20_000
+    geographic_analysis(sample, weight_col='sample_weight')
+
+Rows are drawn without replacement within every facility_state × DRG_Cd
+stratum, in proportion to the stratum's size (at least `min_per_stratum`
+rows each, so small states and rare DRGs stay represented). Each sampled row
+carries `sample_weight` = stratum rows / sampled rows, so weighted means,
+totals and correlations estimate the full-data values. Confidence intervals
+are approximate: a normal interval using Kish's effective sample size
+(Σw)² / Σw², and Fisher's z-transform for correlations.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.cache import RESULT_CACHE, ResultCache, _shared, cached, code_version
+
+STRATA = ['facility_state', 'DRG_Cd']
+WEIGHT_COL = 'sample_weight'
+Z_95 = 1.959964
+
+
+# ——— Drawing the sample ———
+
+def _allocate(sizes: np.ndarray, fraction: float, min_per_stratum: int) -> np.ndarray:
+    """
+    Rows to draw per stratum: `min_per_stratum` each (or the whole stratum if smaller), then
+    the rest of the round(fraction × total) rows in proportion to the rows each stratum has
+    left, rounded by largest remainder so the total is exact whenever the floors allow it.
+    """
+    floor = np.minimum(sizes, min_per_stratum)
+    remaining = int(round(sizes.sum() * fraction)) - floor.sum()
+    spare = sizes - floor
+    if remaining <= 0 or not spare.sum():
+        return floor
+    exact = spare * (remaining / spare.sum())
+    extra = np.floor(exact).astype('int64')
+    short = remaining - extra.sum()
+    if short > 0:
+        extra[np.argsort(extra - exact, kind='stable')[:short]] += 1
+    return floor + extra
+
+
+def stratified_sample(df: pd.DataFrame,
+                      fraction: float | None = None,
+                      n_rows: int | None = None,
+                      strata: list[str] = STRATA,
+                      seed: int = 0,
+                      min_per_stratum: int = 1) -> pd.DataFrame:
+    """
+    1. Groups the rows into strata (missing values form their own stratum).
+    2. Allocates `fraction` of the rows, or a budget of `n_rows`, proportionally to stratum size.
+    3. Draws that many rows from each stratum at random (reproducible for a given `seed`).
+    Returns the sampled rows in their original order with a `sample_weight` column.
+    """
+    if (fraction is None) == (n_rows is None):
+        raise ValueError("Pass exactly one of fraction or n_rows")
+    if n_rows is not None:
+        fraction = min(n_rows / len(df), 1.0) if len(df) else 1.0
+    if not 0 < fraction <= 1:
+        raise ValueError(f"fraction must be in (0, 1], got {fraction}")
+
+    codes = df.groupby(strata, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    sizes = np.bincount(codes)
+    take = _allocate(sizes, fraction, min_per_stratum)
+
+    # Rank rows within their stratum by a random key; keep the first take[h] of stratum h.
+    keys = np.random.default_rng(seed).random(len(df))
+    order = np.lexsort((keys, codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(df)) - starts[codes[order]]
+    chosen = np.sort(order[rank < take[codes[order]]])
+
+    sample = df.iloc[chosen].copy()
+    sample[WEIGHT_COL] = (sizes / take)[codes[chosen]]
+    print(f"[INFO] Stratified sample: {len(sample):,} of {len(df):,} rows ({len(sample) / max(len(df), 1):.1%}) "
+          f"from {len(sizes):,} {' × '.join(strata)} strata")
+    if n_rows is not None and len(sample) > n_rows:
+        print(f"⚠️ {min_per_stratum} row(s) per stratum exceeds the budget of {n_rows:,} rows")
+    return sample
+
+
+def cached_sample(source_key: str, load, fraction: float | None = None, n_rows: int | None = None,
+                  strata: list[str] = STRATA, seed: int = 0, min_per_stratum: int = 1,
+                  cache: ResultCache | None = None) -> pd.DataFrame:
+    """
+    stratified_sample(load(), ...), stored in the result cache under `source_key` (which should
+    change whenever the data would) and the sampling parameters. A repeat run returns the
+    stored sample without calling `load`, i.e. without reading the full dataset.
+    """
+    store = cache or RESULT_CACHE
+    key = hashlib.blake2b(repr((source_key, fraction, n_rows, list(strata), seed, min_per_stratum,
+                                code_version(stratified_sample), code_version(_allocate))).encode(),
+                          digest_size=20).hexdigest()
+    if store.enabled:
+        found, sample = store.get(key)
+        if found:
+            print(f"[INFO] Loaded cached stratified sample ({len(sample):,} rows)")
+            return _shared(sample)
+    sample = stratified_sample(load(), fraction, n_rows, strata, seed, min_per_stratum)
+    if store.enabled:
+        store.put(key, sample)
+        return _shared(sample)
+    return sample
+
+
+# ——— Weighted estimates ———
+
+def effective_n(weights) -> float:
+    """Kish's effective sample size (Σw)² / Σw²."""
+    w = np.asarray(weights, dtype='float64')
+    return w.sum() ** 2 / (w ** 2).sum() if len(w) else 0.0
+
+
+def weighted_mean_ci(values, weights, z: float = Z_95) -> tuple:
+    """(weighted mean, CI half-width, effective n) of the non-missing values."""
+    x = np.asarray(values, dtype='float64')
+    w = np.asarray(weights, dtype='float64')
+    keep = ~np.isnan(x)
+    x, w = x[keep], w[keep]
+    if not len(x):
+        return np.nan, np.nan, 0.0
+    n_eff = effective_n(w)
+    mean = np.average(x, weights=w)
+    var = np.average((x - mean) ** 2, weights=w)
+    half = z * np.sqrt(var / (n_eff - 1)) if n_eff > 1 else np.nan
+    return float(mean), float(half), float(n_eff)
+
+
+def weighted_group_means(df: pd.DataFrame, by, columns: dict, weight_col: str = WEIGHT_COL,
+                         z: float = Z_95) -> pd.DataFrame:
+    """
+    Weighted mean and CI half-width of each `columns` value (output name → column) per
+    group of `by`, as columns `<name>` and `<name>_ci`.
+    """
+    w = df[weight_col].astype('float64')
+    sums = {}
+    for name, col in columns.items():
+        x = df[col].astype('float64')
+        wm = w.where(x.notna(), 0.0)
+        xz = x.fillna(0.0)
+        sums[f"{name}.w"] = wm
+        sums[f"{name}.ww"] = wm ** 2
+        sums[f"{name}.wx"] = wm * xz
+        sums[f"{name}.wxx"] = wm * xz ** 2
+    groups = pd.DataFrame(sums).groupby([df[c] for c in ([by] if isinstance(by, str) else by)],
+                                        observed=True).sum()
+
+    out = pd.DataFrame(index=groups.index)
+    for name in columns:
+        sw, sww = groups[f"{name}.w"], groups[f"{name}.ww"]
+        mean = groups[f"{name}.wx"] / sw
+        var = (groups[f"{name}.wxx"] / sw - mean ** 2).clip(lower=0)
+        n_eff = sw ** 2 / sww
+        out[name] = mean
+        out[f"{name}_ci"] = z * np.sqrt(var / (n_eff - 1).where(n_eff > 1))
+    return out
+
+
+@cached
+def weighted_correlation(numeric: pd.DataFrame, weights: pd.Series) -> tuple:
+    """
+    Pairwise-complete weighted Pearson correlations of the columns of `numeric`.
+    Returns (corr, n_eff): the correlation matrix and the effective sample size of each pair.
+    """
+    cols = list(numeric.columns)
+    values = numeric.to_numpy(dtype='float64', na_value=np.nan)
+    w = weights.to_numpy(dtype='float64')
+    valid = ~np.isnan(values)
+    corr = np.full((len(cols), len(cols)), np.nan)
+    n_eff = np.zeros((len(cols), len(cols)))
+
+    for i in range(len(cols)):
+        for j in range(i, len(cols)):
+            keep = valid[:, i] & valid[:, j]
+            wk = w[keep]
+            if wk.sum() <= 0:
+                continue
+            xi, xj = values[keep, i], values[keep, j]
+            di = xi - np.average(xi, weights=wk)
+            dj = xj - np.average(xj, weights=wk)
+            denom = np.sqrt((wk * di ** 2).sum() * (wk * dj ** 2).sum())
+            r = (wk * di * dj).sum() / denom if denom > 0 else np.nan
+            corr[i, j] = corr[j, i] = np.clip(r, -1, 1)
+            n_eff[i, j] = n_eff[j, i] = effective_n(wk)
+
+    return (pd.DataFrame(corr, index=cols, columns=cols),
+            pd.DataFrame(n_eff, index=cols, columns=cols))
+
+
+def correlation_ci(r, n_eff, z: float = Z_95) -> tuple:
+    """Approximate (lower, upper) bounds for correlation(s) `r` via Fisher's z-transform."""
+    r = np.clip(np.asarray(r, dtype='float64'), -0.999999, 0.999999)
+    n_eff = np.asarray(n_eff, dtype='float64')
+    se = 1 / np.sqrt(np.where(n_eff > 3, n_eff - 3, np.nan))
+    return np.tanh(np.arctanh(r) - z * se), np.tanh(np.arctanh(r) + z * se)
+
+
+def correlation_p(r, n_eff) -> np.ndarray:
+    """Approximate two-sided p-value(s) for r = 0 via Fisher's z-transform with n_eff."""
+    from scipy import stats
+
+    r = np.clip(np.asarray(r, dtype='float64'), -0.999999, 0.999999)
+    n_eff = np.asarray(n_eff, dtype='float64')
+    z = np.abs(np.arctanh(r)) * np.sqrt(np.where(n_eff > 3, n_eff - 3, np.nan))
+    return 2 * stats.norm.sf(z)
+
+
+def weighted_ranks(values, weights) -> np.ndarray:
+    """Mid-ranks where each row counts `weight` times (ties share the mean of their positions)."""
+    x, w = np.asarray(values, dtype='float64'), np.asarray(weights, dtype='float64')
+    order = np.argsort(x, kind='mergesort')
+    xs, ws = x[order], w[order]
+    first = np.r_[True, xs[1:] != xs[:-1]]
+    group = np.cumsum(first) - 1
+    group_w = np.bincount(group, weights=ws)
+    ranks = np.empty_like(x)
+    ranks[order] = (np.cumsum(group_w) - group_w / 2 + 0.5)[group]
+    return ranks
+
+
+def weighted_quantiles(values, weights, q) -> np.ndarray:
+    """Quantiles `q` of the finite values, each counting `weight` times (lower value at ties)."""
+    x, w = np.asarray(values, dtype='float64'), np.asarray(weights, dtype='float64')
+    keep = np.isfinite(x)
+    x, w = x[keep], w[keep]
+    if not len(x):
+        return np.full(len(np.atleast_1d(q)), np.nan)
+    order = np.argsort(x)
+    share = np.cumsum(w[order]) / w.sum()
+    return x[order][np.minimum(np.searchsorted(share, np.atleast_1d(q)), len(x) - 1)]
+
+
+def weighted_describe(df: pd.DataFrame, weights: pd.Series) -> pd.DataFrame:
+    """describe() of the numeric columns with every row counting `weights` times; one row per column."""
+    rows = {}
+    w_all = weights.to_numpy(dtype='float64')
+    for col in df.columns:
+        x = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        keep = np.isfinite(x)
+        x, w = x[keep], w_all[keep]
+        if not len(x) or w.sum() <= 0:
+            continue
+        mean = np.average(x, weights=w)
+        rows[col] = {
+            'count': len(x),
+            'n_eff': effective_n(w),
+            'mean': mean,
+            'std': np.sqrt(np.average((x - mean) ** 2, weights=w)),
+            'min': x.min(),
+            **dict(zip(['25%', '50%', '75%'], weighted_quantiles(x, w, [0.25, 0.5, 0.75]))),
+            'max': x.max(),
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def weighted_cost_rating_stats(x, y, weights) -> tuple:
+    """
+    Weighted Pearson r & p, Spearman rho & p (Pearson on weighted mid-ranks), and the
+    weighted least-squares slope & intercept; p-values via Fisher's z with n_eff.
+    """
+    x, y, w = (np.asarray(v, dtype='float64') for v in (x, y, weights))
+    n_eff = effective_n(w)
+
+    def corr(a, b):
+        da, db = a - np.average(a, weights=w), b - np.average(b, weights=w)
+        denom = np.sqrt((w * da ** 2).sum() * (w * db ** 2).sum())
+        return float(np.clip((w * da * db).sum() / denom, -1, 1)) if denom > 0 else np.nan
+
+    pearson_r = corr(x, y)
+    spearman_rho = corr(weighted_ranks(x, w), weighted_ranks(y, w))
+    # np.polyfit weights the unsquared residuals, so sqrt(w) gives weighted least squares.
+    m, b = np.polyfit(x, y, 1, w=np.sqrt(w))
+    return (pearson_r, float(correlation_p(pearson_r, n_eff)), spearman_rho,
+            float(correlation_p(spearman_rho, n_eff)), float(m), float(b))
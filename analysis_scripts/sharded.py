@@ -0,0 +1,399 @@
+"""
+Sharded execution of the state-decomposable analyses.
+
+The merged dataset is split once into shards, by facility_state (states balanced
+across shards by row count) or by a hash of the CCN. Each map task loads one
+shard and returns compact partial results (group sums and counts, co-moments,
+histograms); the reduce step combines them into the outputs of the serial path:
+
+    - geographic_analysis: state, city and RUCA mean payment & rating
+    - state_cost_rating_analysis: per-state Pearson r/p, regression line, and
+      Spearman rho/p when sharded by state (ranks don't merge across shards)
+    - outlier_anomaly_detection: the IQR fences and outlier count, with exact
+      quartiles found by histogram refinement instead of sorting the data
+
+The same JobSpec runs serially, in a local process pool, or on a local dask
+cluster (`executor='dask'`, needs `dask.distributed`).
+"""
+
+import os
+import shutil
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.streaming import CoMomentAccumulator, GroupMeanAccumulator, MomentAccumulator
+from utils.schema import iter_csv_chunks, load_csv
+
+DEFAULT_SHARD_DIR = "data/processed/shards"
+
+# Bins per histogram round, and the largest candidate range whose values are
+# shipped back to the driver to pick an order statistic exactly.
+HISTOGRAM_BINS = 4096
+EXACT_LIMIT = 50_000
+
+GROUP_COLS = {'state': 'facility_state', 'city': 'facility_city', 'ruca': 'Rndrng_Prvdr_RUCA_Desc'}
+
+
+@dataclass
+class JobSpec:
+    source: str                                  # merged CSV
+    shard_by: str = "state"                      # "state" or "ccn"
+    n_shards: int | None = None                  # default: one per worker
+    executor: str = "processes"                  # "serial", "processes" or "dask"
+    max_workers: int | None = None
+    shard_dir: str = DEFAULT_SHARD_DIR
+    required: list = field(default_factory=lambda: ["Avg_Submtd_Cvrd_Chrg", "rating"])
+    cost_col: str = "Avg_Tot_Pymt_Amt"
+    rating_col: str = "rating"
+    min_count: int = 20
+    numeric_cols: list | None = None
+    chunksize: int = 200_000
+
+    @property
+    def workers(self):
+        return self.max_workers or os.cpu_count() or 1
+
+
+# ——— Sharding ———
+
+def _ccn_shard(ccn: pd.Series, n_shards: int) -> np.ndarray:
+    codes = ccn.astype(str)
+    return np.fromiter((zlib.crc32(c.encode()) % n_shards for c in codes), dtype=int, count=len(codes))
+
+
+def _balance_states(counts: pd.Series, n_shards: int) -> dict:
+    """Largest state first onto the least-loaded shard."""
+    loads = [0] * n_shards
+    assignment = {}
+    for state, n in counts.sort_values(ascending=False).items():
+        shard = loads.index(min(loads))
+        assignment[state] = shard
+        loads[shard] += n
+    return assignment
+
+
+def write_shards(spec: JobSpec) -> tuple[list[str], list[str]]:
+    """
+    Streams the source CSV into `n_shards` directories of pickled parts, keeping
+    only rows that have every `required` column (as load_data does).
+    Returns the shard directories and the numeric columns of the first chunk.
+    """
+    n_shards = spec.n_shards or spec.workers
+    shutil.rmtree(spec.shard_dir, ignore_errors=True)
+    shard_paths = [os.path.join(spec.shard_dir, f"shard_{i:03d}") for i in range(n_shards)]
+    for path in shard_paths:
+        os.makedirs(path)
+
+    if spec.shard_by == "state":
+        states = load_csv(spec.source, usecols=['facility_state'] + spec.required).dropna(subset=spec.required)
+        assignment = _balance_states(states['facility_state'].astype(str).value_counts(), n_shards)
+    elif spec.shard_by != "ccn":
+        raise ValueError(f"shard_by must be 'state' or 'ccn', not {spec.shard_by!r}")
+
+    numeric_cols = None
+    for part, chunk in enumerate(iter_csv_chunks(spec.source, chunksize=spec.chunksize)):
+        chunk = chunk.dropna(subset=spec.required)
+        if numeric_cols is None:
+            numeric_cols = chunk.select_dtypes(include="number").columns.tolist()
+        if spec.shard_by == "state":
+            shard_of = chunk['facility_state'].astype(str).map(assignment).fillna(0).astype(int).to_numpy()
+        else:
+            shard_of = _ccn_shard(chunk['Rndrng_Prvdr_CCN'], n_shards)
+        for shard, rows in chunk.groupby(shard_of):
+            rows.to_pickle(os.path.join(shard_paths[shard], f"part_{part:05d}.pkl"))
+
+    print(f"[INFO] Wrote {n_shards} shards by {spec.shard_by} to {spec.shard_dir}")
+    return shard_paths, numeric_cols
+
+
+def load_shard(path) -> pd.DataFrame:
+    parts = [pd.read_pickle(os.path.join(path, f)) for f in sorted(os.listdir(path))]
+    return pd.concat(parts) if parts else pd.DataFrame()
+
+
+# ——— Executors ———
+
+@contextmanager
+def _executor(spec: JobSpec):
+    """Yields a `map(func, *iterables) -> list` for the spec's executor."""
+    if spec.executor == "serial":
+        yield lambda func, *args: list(map(func, *args))
+    elif spec.executor == "processes":
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=spec.workers) as pool:
+            yield lambda func, *args: list(pool.map(func, *args))
+    elif spec.executor == "dask":
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError:
+            raise ImportError("executor='dask' needs dask.distributed (pip install 'dask[distributed]')")
+        with LocalCluster(n_workers=spec.workers, threads_per_worker=1, processes=True) as cluster, \
+                Client(cluster) as client:
+            yield lambda func, *args: client.gather(client.map(func, *args, pure=False))
+    else:
+        raise ValueError(f"Unknown executor {spec.executor!r}")
+
+
+# ——— Map side ———
+
+def _map_partials(path, spec: JobSpec) -> dict:
+    """Round 1: group sums/counts, per-state co-moments, column moments."""
+    df = load_shard(path)
+    pair = [spec.cost_col, spec.rating_col]
+
+    groups = {}
+    for name, by in GROUP_COLS.items():
+        groups[name] = GroupMeanAccumulator(by, pair)
+        if not df.empty:
+            groups[name].update(df)
+
+    comoments, spearman = {}, {}
+    for state, group in df.groupby(df['facility_state'].astype(object), observed=True):
+        comoments[state] = CoMomentAccumulator(pair).update(group)
+        if spec.shard_by == "state":
+            # Every row of the state is in this shard, so ranks are exact here.
+            from scipy import stats
+            sub = group[pair].dropna()
+            if len(sub) >= spec.min_count:
+                spearman[state] = tuple(stats.spearmanr(sub[spec.cost_col], sub[spec.rating_col]))
+
+    moments = MomentAccumulator(spec.numeric_cols)
+    if not df.empty:
+        moments.update(df)
+    return {'rows': len(df), 'groups': groups,
+            'comoments': comoments, 'spearman': spearman, 'moments': moments}
+
+
+def _column(df, col, fill):
+    values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+    if fill is not None:
+        values = np.where(np.isnan(values), fill, values)
+    return values[~np.isnan(values)]
+
+
+def _in_range(values, lo, hi, closed):
+    return values[(values >= lo) & ((values <= hi) if closed else (values < hi))]
+
+
+def _map_refine(path, tasks) -> list:
+    """
+    Later rounds: for each (col, fill, lo, hi, closed, exact) task, either the
+    histogram of the column over [lo, hi] or, when `exact`, the values themselves.
+    """
+    df = load_shard(path)
+    results = []
+    for col, fill, lo, hi, closed, exact in tasks:
+        values = _in_range(_column(df, col, fill), lo, hi, closed) if col in df else np.array([])
+        if exact:
+            results.append(values)
+        else:
+            results.append(np.histogram(values, bins=HISTOGRAM_BINS, range=(lo, hi))[0])
+    return results
+
+
+def _map_count_outside(path, cols, fills, lower, upper) -> int:
+    df = load_shard(path)
+    if df.empty:
+        return 0
+    values = df[cols].astype('float64').fillna(pd.Series(fills))
+    return int(((values < pd.Series(lower)) | (values > pd.Series(upper))).any(axis=1).sum())
+
+
+# ——— Reduce side ———
+
+def _order_statistics(run, shard_paths, targets, bounds):
+    """
+    Exact order statistics (0-based ranks) without collecting the data.
+    `targets` maps an id to (col, fill, rank); `bounds[col]` is (min, max).
+    Each round narrows every target to one histogram bin; once a bin holds at
+    most EXACT_LIMIT values they are fetched and sorted.
+    """
+    state = {t: {'lo': bounds[col][0], 'hi': bounds[col][1], 'closed': True, 'below': 0, 'count': None}
+             for t, (col, fill, rank) in targets.items()}
+    result = {t: s['lo'] for t, s in state.items() if s['lo'] == s['hi']}
+    while len(result) < len(targets):
+        pending = [t for t in targets if t not in result]
+        tasks = []
+        for t in pending:
+            col, fill, _ = targets[t]
+            s = state[t]
+            exact = s['count'] is not None and s['count'] <= EXACT_LIMIT
+            tasks.append((col, fill, s['lo'], s['hi'], s['closed'], exact))
+
+        partials = run(_map_refine, shard_paths, [tasks] * len(shard_paths))
+        for i, t in enumerate(pending):
+            col, fill, rank = targets[t]
+            s = state[t]
+            local_rank = rank - s['below']
+            if tasks[i][-1]:
+                values = np.sort(np.concatenate([p[i] for p in partials]))
+                result[t] = values[local_rank]
+                continue
+            counts = np.sum([p[i] for p in partials], axis=0)
+            cumulative = np.cumsum(counts)
+            b = int(np.searchsorted(cumulative, local_rank, side='right'))
+            edges = np.linspace(s['lo'], s['hi'], HISTOGRAM_BINS + 1)
+            s['below'] += int(cumulative[b - 1]) if b else 0
+            s['count'] = int(counts[b])
+            s['closed'] = s['closed'] and b == HISTOGRAM_BINS - 1
+            s['lo'], s['hi'] = edges[b], edges[b + 1]
+            if s['hi'] <= s['lo'] or np.nextafter(s['lo'], np.inf) >= s['hi']:
+                # The bin can't be split any further: every value in it is equal.
+                result[t] = s['lo']
+    return result
+
+
+def _quantile_targets(col, fill, n, q):
+    """Ranks pandas' linear interpolation needs for quantile q of n values."""
+    h = (n - 1) * q
+    lo = int(np.floor(h))
+    return [(col, fill, lo), (col, fill, min(lo + 1, n - 1))], h - lo
+
+
+def _exact_quantiles(run, shard_paths, cols, counts, bounds, qs, fills=None):
+    """Exact per-column quantiles (pandas' default linear interpolation)."""
+    fills = fills or {}
+    targets, weights = {}, {}
+    for col in cols:
+        n = counts[col]
+        for q in qs:
+            pair, frac = _quantile_targets(col, fills.get(col), n, q)
+            targets[(col, q, 0)], targets[(col, q, 1)] = pair
+            weights[(col, q)] = frac
+    values = _order_statistics(run, shard_paths, targets, bounds)
+    return pd.DataFrame({
+        q: {col: values[(col, q, 0)] + weights[(col, q)] * (values[(col, q, 1)] - values[(col, q, 0)])
+            for col in cols}
+        for q in qs
+    })
+
+
+def _merge_partials(partials):
+    total = partials[0]
+    for p in partials[1:]:
+        total['rows'] += p['rows']
+        for name, acc in total['groups'].items():
+            acc.merge(p['groups'][name])
+        for state, acc in p['comoments'].items():
+            if state in total['comoments']:
+                total['comoments'][state].merge(acc)
+            else:
+                total['comoments'][state] = acc
+        total['spearman'].update(p['spearman'])
+        total['moments'].merge(p['moments'])
+    return total
+
+
+def _mean_stats(acc: GroupMeanAccumulator, spec: JobSpec) -> pd.DataFrame:
+    stats = acc.means().rename(columns={spec.cost_col: 'mean_payment', spec.rating_col: 'mean_rating'})
+    return stats[['mean_payment', 'mean_rating']]
+
+
+def _state_correlations(total, spec: JobSpec) -> pd.DataFrame:
+    from scipy import stats
+
+    records = []
+    for state, acc in total['comoments'].items():
+        n = int(acc.n[0, 1])
+        if n < spec.min_count:
+            continue
+        r = float(acc.corr().iloc[0, 1])
+        t = r * np.sqrt((n - 2) / max(1 - r ** 2, np.finfo(float).tiny))
+        slope = acc.c[0, 1] / acc.m2_i[0, 1]
+        rho, rho_p = total['spearman'].get(state, (np.nan, np.nan))
+        records.append({
+            "state": state,
+            "n": n,
+            "pearson_r": r,
+            "pearson_p": 2 * stats.t.sf(abs(t), n - 2),
+            "spearman_rho": rho,
+            "spearman_p": rho_p,
+            "slope": slope,
+            "intercept": acc.mean_j[0, 1] - slope * acc.mean_i[0, 1],
+        })
+    return pd.DataFrame(records).sort_values("pearson_r", ascending=False)
+
+
+def _iqr_fences(run, shard_paths, moments: MomentAccumulator, n_rows: int):
+    """
+    Fences of outlier_anomaly_detection: NaNs are first filled with the column
+    median, then Q1/Q3 are taken over the filled column.
+    """
+    desc = moments.describe()
+    cols = [c for c in desc.index if desc.loc[c, 'count'] > 0]
+    counts = desc['count'].astype(int).to_dict()
+    bounds = {c: (desc.loc[c, 'min'], desc.loc[c, 'max']) for c in cols}
+
+    medians = _exact_quantiles(run, shard_paths, cols, counts, bounds, [0.5])[0.5]
+    filled_counts = {c: n_rows for c in cols}
+    quartiles = _exact_quantiles(run, shard_paths, cols, filled_counts, bounds, [0.25, 0.75],
+                                 fills=medians.to_dict())
+    iqr = quartiles[0.75] - quartiles[0.25]
+    lower = quartiles[0.25] - 1.5 * iqr
+    upper = quartiles[0.75] + 1.5 * iqr
+    n_outliers = sum(run(_map_count_outside, shard_paths, [cols] * len(shard_paths),
+                         [medians.to_dict()] * len(shard_paths),
+                         [lower.to_dict()] * len(shard_paths), [upper.to_dict()] * len(shard_paths)))
+    fences = pd.DataFrame({'median': medians, 'q1': quartiles[0.25], 'q3': quartiles[0.75],
+                           'lower': lower, 'upper': upper})
+    return fences, n_outliers
+
+
+def run_sharded(spec: JobSpec, shard_paths=None) -> dict:
+    """
+    1. Writes the shards (rows missing a `required` column are dropped on the way),
+       unless `shard_paths` from an earlier write_shards call are passed in.
+    2. Maps every shard to partial group sums, co-moments and column moments; reduces them.
+    3. Finds exact IQR fences in a few histogram-refinement rounds and counts outliers.
+    4. Prints the same tables as the serial analyses (without plots).
+    Returns a dict with state_stats, top10_high_cities, top10_low_cities,
+    ruca_stats, state_correlations, iqr_fences and n_iqr_outliers.
+    """
+    if shard_paths is None:
+        shard_paths, numeric_cols = write_shards(spec)
+    else:
+        numeric_cols = load_shard(shard_paths[0]).select_dtypes(include="number").columns.tolist()
+    # Every shard must accumulate the same columns, so they're fixed up front.
+    spec = replace(spec, numeric_cols=spec.numeric_cols or numeric_cols)
+    with _executor(spec) as run:
+        total = _merge_partials(run(_map_partials, shard_paths, [spec] * len(shard_paths)))
+        fences, n_outliers = _iqr_fences(run, shard_paths, total['moments'], total['rows'])
+
+    state_stats = _mean_stats(total['groups']['state'], spec).sort_values('mean_payment', ascending=False)
+    city_stats = _mean_stats(total['groups']['city'], spec).dropna()
+    ruca_stats = _mean_stats(total['groups']['ruca'], spec).sort_values('mean_payment', ascending=False)
+    results = {
+        'state_stats': state_stats,
+        'top10_high_cities': city_stats.nlargest(10, 'mean_payment'),
+        'top10_low_cities': city_stats.nsmallest(10, 'mean_payment'),
+        'ruca_stats': ruca_stats,
+        'state_correlations': _state_correlations(total, spec),
+        'iqr_fences': fences,
+        'n_iqr_outliers': n_outliers,
+    }
+
+    print(f"[INFO] {total['rows']} rows in {len(shard_paths)} shards ({spec.executor})")
+    print("\n=== State-Level Mean Payment & Rating ===")
+    print(state_stats.head(10))
+    print("\n=== Top 10 Highest-Cost Cities ===")
+    print(results['top10_high_cities'])
+    print("\n=== Top 10 Lowest-Cost Cities ===")
+    print(results['top10_low_cities'])
+    print("\n=== Mean Payment & Rating by RUCA Category ===")
+    print(ruca_stats)
+    print("\n=== State‐Level Correlation Metrics ===")
+    if spec.shard_by != "state":
+        print("(Spearman needs whole states per shard; shard by state to compute it)")
+    print(results['state_correlations'][["state", "n", "pearson_r", "pearson_p", "spearman_rho", "spearman_p"]]
+          .to_string(index=False, formatters={
+              "pearson_r": "{:.3f}".format,
+              "pearson_p": "{:.2e}".format,
+              "spearman_rho": "{:.3f}".format,
+              "spearman_p": "{:.2e}".format,
+          }))
+    print(f"\nUnivariate IQR outliers detected: {n_outliers} rows")
+    return results
@@ -0,0 +1,424 @@
+"""
+Mergeable accumulators for univariate, correlation and summary statistics.
+
+Each accumulator is updated chunk by chunk and can be merged with another one
+built over a different part of the data (e.g. in another process), so the
+outputs of univariate_analysis, bivariate_analysis and summary_report can be
+produced for datasets larger than memory. Quartiles come from a t-digest, so
+they are approximate (typically within a fraction of a percent in rank).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import iter_csv_chunks
+
+
+class MomentAccumulator:
+    """Per-column count, mean, M2 (Welford/Chan), min and max, ignoring NaN."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+
+    def update(self, df: pd.DataFrame):
+        x = df[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        present = ~np.isnan(x)
+        n_b = present.sum(axis=0).astype(float)
+        mean_b = _column_means(x, present, n_b)
+        m2_b = np.where(present, x - mean_b, 0.0) ** 2
+        self.min = np.fmin(self.min, np.nanmin(x, axis=0, initial=np.inf))
+        self.max = np.fmax(self.max, np.nanmax(x, axis=0, initial=-np.inf))
+        self._combine(n_b, mean_b, m2_b.sum(axis=0))
+        return self
+
+    def merge(self, other: "MomentAccumulator"):
+        self._combine(other.n, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n = self.n + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n_b / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + m2_b + delta ** 2 * self.n * n_b / n, 0.0)
+        self.n = n
+
+    def describe(self) -> pd.DataFrame:
+        """Like DataFrame.describe().transpose(), minus the quartiles."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.where(self.n > 1, self.m2 / (self.n - 1), np.nan))
+        return pd.DataFrame({
+            'count': self.n,
+            'mean': np.where(self.n > 0, self.mean, np.nan),
+            'std': std,
+            'min': np.where(self.n > 0, self.min, np.nan),
+            'max': np.where(self.n > 0, self.max, np.nan),
+        }, index=self.columns)
+
+
+class QuantileSketch:
+    """
+    Merging t-digest per column: sorted centroids (mean, weight), small near the tails
+    and larger towards the median, at most about `compression` / 2 per column.
+    Quantiles interpolate between centroid centers and the exact min and max.
+    """
+
+    def __init__(self, columns, compression: int = 1000):
+        self.columns = list(columns)
+        self.compression = compression
+        self.means = {c: np.empty(0) for c in self.columns}
+        self.weights = {c: np.empty(0) for c in self.columns}
+
+    def update(self, df: pd.DataFrame):
+        for col in self.columns:
+            x = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            x = x[~np.isnan(x)]
+            self._add(col, x, np.ones(len(x)))
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        for col in self.columns:
+            self._add(col, other.means[col], other.weights[col])
+        return self
+
+    def _add(self, col, means, weights):
+        means = np.concatenate([self.means[col], means])
+        weights = np.concatenate([self.weights[col], weights])
+        if not len(means):
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        # k1 scale function: centroids whose centers fall in the same unit of k are merged.
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        group = np.floor(k - k[0]).astype('int64')
+        total = np.bincount(group, weights=weights)
+        keep = total > 0
+        self.means[col] = (np.bincount(group, weights=weights * means)[keep] / total[keep])
+        self.weights[col] = total[keep]
+
+    def quantiles(self, q, lower, upper) -> np.ndarray:
+        """Quantiles `q` per column (rows) given each column's exact `lower`/`upper` bounds."""
+        result = np.full((len(self.columns), len(q)), np.nan)
+        for i, col in enumerate(self.columns):
+            means, weights = self.means[col], self.weights[col]
+            if not len(means):
+                continue
+            n = weights.sum()
+            centers = np.cumsum(weights) - weights / 2
+            # Rank (as in DataFrame.quantile's linear interpolation) of each quantile.
+            rank = np.asarray(q) * (n - 1) + 0.5
+            result[i] = np.interp(rank, np.concatenate([[0.5], centers, [n - 0.5]]),
+                                  np.concatenate([[lower[i]], means, [upper[i]]]))
+        return result
+
+
+class CoMomentAccumulator:
+    """
+    Pairwise-complete co-moments for a Pearson correlation matrix matching
+    DataFrame.corr(): for every column pair (i, j) it tracks the count, both means
+    and both M2s over rows where i and j are present, plus the co-moment.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.mean_i = np.zeros((p, p))
+        self.mean_j = np.zeros((p, p))
+        self.m2_i = np.zeros((p, p))
+        self.m2_j = np.zeros((p, p))
+        self.c = np.zeros((p, p))
+
+    def update(self, df: pd.DataFrame):
+        x = df[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        present = ~np.isnan(x)
+        mask = present.astype(float)
+        # Centre on the chunk means first so the sums of squares don't lose precision.
+        shift = _column_means(x, present, present.sum(axis=0))
+        x0 = np.where(present, x - shift, 0.0)
+
+        n = mask.T @ mask
+        s = x0.T @ mask                  # s[i, j]: sum of x_i over rows where i and j are present
+        q = (x0 ** 2).T @ mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mi = np.where(n > 0, s / n, 0.0)
+            mj = np.where(n > 0, s.T / n, 0.0)
+        m2_i = q - n * mi ** 2
+        m2_j = q.T - n * mj ** 2
+        c = x0.T @ x0 - n * mi * mj
+        self._combine(n, mi + shift[:, None], mj + shift[None, :], m2_i, m2_j, c)
+        return self
+
+    def merge(self, other: "CoMomentAccumulator"):
+        self._combine(other.n, other.mean_i, other.mean_j, other.m2_i, other.m2_j, other.c)
+        return self
+
+    def _combine(self, n_b, mi_b, mj_b, m2i_b, m2j_b, c_b):
+        n_a = self.n
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = np.where(n > 0, n_a * n_b / n, 0.0)
+            di = mi_b - self.mean_i
+            dj = mj_b - self.mean_j
+            self.mean_i = np.where(n > 0, self.mean_i + di * n_b / n, 0.0)
+            self.mean_j = np.where(n > 0, self.mean_j + dj * n_b / n, 0.0)
+        self.m2_i = self.m2_i + m2i_b + di ** 2 * w
+        self.m2_j = self.m2_j + m2j_b + dj ** 2 * w
+        self.c = self.c + c_b + di * dj * w
+        self.n = n
+
+    def corr(self, min_periods: int = 1) -> pd.DataFrame:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.c / np.sqrt(self.m2_i * self.m2_j)
+        r = np.where(self.n >= max(min_periods, 2), np.clip(r, -1.0, 1.0), np.nan)
+        # Constant columns have no correlation, not even with themselves (as in pandas).
+        np.fill_diagonal(r, np.where(np.isnan(np.diag(r)), np.nan, 1.0))
+        return pd.DataFrame(r, index=self.columns, columns=self.columns)
+
+
+class HeavyHitters:
+    """
+    Misra–Gries summary of value counts with at most `capacity` tracked values.
+    Counts are exact while a column has no more than `capacity` distinct values;
+    beyond that they are lower bounds, off by at most `error`. Merging two
+    summaries keeps the same guarantee.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def update(self, values: pd.Series):
+        for value, count in values.value_counts(dropna=True).items():
+            if count:
+                self.counts[value] = self.counts.get(value, 0) + int(count)
+        self._prune()
+        return self
+
+    def merge(self, other: "HeavyHitters"):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self.error += other.error
+        self._prune()
+        return self
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {v: c - cut for v, c in self.counts.items() if c > cut}
+        self.error += cut
+
+    def top(self, n: int = 20) -> pd.Series:
+        counts = pd.Series(self.counts, dtype='int64')
+        return counts.nlargest(n) if not counts.empty else counts
+
+
+class GroupMeanAccumulator:
+    """Per-group sums and non-null counts, for mergeable grouped means."""
+
+    def __init__(self, by: str, value_cols):
+        self.by = by
+        self.value_cols = list(value_cols)
+        self.sums = pd.DataFrame(columns=self.value_cols, dtype='float64')
+        self.counts = pd.DataFrame(columns=self.value_cols, dtype='float64')
+
+    def update(self, df: pd.DataFrame):
+        grouped = df.groupby(df[self.by].astype(object), observed=True)[self.value_cols]
+        return self._combine(grouped.sum(), grouped.count())
+
+    def merge(self, other: "GroupMeanAccumulator"):
+        return self._combine(other.sums, other.counts)
+
+    def _combine(self, sums, counts):
+        self.sums = self.sums.add(sums.astype('float64'), fill_value=0)
+        self.counts = self.counts.add(counts.astype('float64'), fill_value=0)
+        return self
+
+    def means(self) -> pd.DataFrame:
+        return self.sums / self.counts.where(self.counts > 0)
+
+
+class StreamingStats:
+    """Everything univariate/bivariate/summary outputs need, accumulated chunk by chunk."""
+
+    GROUPS = {'facility_state': ['Avg_Tot_Pymt_Amt', 'rating'],
+              'facility_city': ['Avg_Tot_Pymt_Amt', 'rating']}
+
+    def __init__(self, numeric_cols, categorical_cols, capacity: int = 1000):
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.rows = 0
+        self.moments = MomentAccumulator(self.numeric_cols)
+        self.quantiles = QuantileSketch(self.numeric_cols)
+        self.comoments = CoMomentAccumulator(self.numeric_cols)
+        self.heavy_hitters = {c: HeavyHitters(capacity) for c in self.categorical_cols}
+        self.group_means = {}
+        for by, cols in self.GROUPS.items():
+            self.group_means[by] = GroupMeanAccumulator(by, cols)
+
+    def update(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        self.moments.update(chunk)
+        self.quantiles.update(chunk)
+        self.comoments.update(chunk)
+        for col, hh in self.heavy_hitters.items():
+            hh.update(chunk[col])
+        for by, acc in self.group_means.items():
+            if {by, *acc.value_cols}.issubset(chunk.columns):
+                acc.update(chunk)
+        return self
+
+    def merge(self, other: "StreamingStats"):
+        self.rows += other.rows
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.comoments.merge(other.comoments)
+        for col, hh in self.heavy_hitters.items():
+            hh.merge(other.heavy_hitters[col])
+        for by, acc in self.group_means.items():
+            acc.merge(other.group_means[by])
+        return self
+
+    def describe(self) -> pd.DataFrame:
+        """Like DataFrame.describe().transpose(); the quartiles are t-digest estimates."""
+        desc = self.moments.describe()
+        quartiles = self.quantiles.quantiles([0.25, 0.5, 0.75], desc['min'].to_numpy(), desc['max'].to_numpy())
+        for j, label in enumerate(['25%', '50%', '75%']):
+            desc.insert(4 + j, label, quartiles[:, j])
+        return desc
+
+
+def _column_means(x, present, counts):
+    sums = np.where(present, x, 0.0).sum(axis=0)
+    return np.divide(sums, counts, out=np.zeros(x.shape[1]), where=counts > 0)
+
+
+def infer_columns(chunk: pd.DataFrame, numeric_cols=None, categorical_cols=None):
+    """Same defaults as univariate_analysis, taken from the first chunk."""
+    if numeric_cols is None:
+        numeric_cols = chunk.select_dtypes(include='number').columns.tolist()
+    if categorical_cols is None:
+        categorical_cols = chunk.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+    return numeric_cols, categorical_cols
+
+
+def _chunks(source, chunksize):
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, str):
+        yield from iter_csv_chunks(source, chunksize=chunksize)
+    else:
+        yield from source
+
+
+def accumulate(source, numeric_cols=None, categorical_cols=None,
+               chunksize: int = 100_000, capacity: int = 1000) -> StreamingStats:
+    """
+    Builds StreamingStats from a CSV path, a DataFrame, or any iterable of DataFrame chunks.
+    Columns default to those inferred from the first chunk.
+    """
+    stats = None
+    for chunk in _chunks(source, chunksize):
+        if stats is None:
+            numeric_cols, categorical_cols = infer_columns(chunk, numeric_cols, categorical_cols)
+            stats = StreamingStats(numeric_cols, categorical_cols, capacity)
+        stats.update(chunk)
+    if stats is None:
+        raise ValueError("No rows to accumulate")
+    return stats
+
+
+def _accumulate_partition(args):
+    path, numeric_cols, categorical_cols, chunksize, capacity = args
+    return accumulate(path, numeric_cols, categorical_cols, chunksize, capacity)
+
+
+def accumulate_partitions(paths, numeric_cols=None, categorical_cols=None,
+                          chunksize: int = 100_000, capacity: int = 1000,
+                          max_workers=None) -> StreamingStats:
+    """
+    Accumulates each CSV partition in its own worker process and merges the results.
+    Columns are fixed from the first partition's first chunk so every worker agrees.
+    """
+    paths = list(paths)
+    first = next(iter_csv_chunks(paths[0], chunksize=1000))
+    numeric_cols, categorical_cols = infer_columns(first, numeric_cols, categorical_cols)
+
+    jobs = [(p, numeric_cols, categorical_cols, chunksize, capacity) for p in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(_accumulate_partition, jobs))
+
+    stats = partials[0]
+    for partial in partials[1:]:
+        stats.merge(partial)
+    return stats
+
+
+# ——— Reports matching the in-memory analyses ———
+
+def univariate_report(stats: StreamingStats) -> pd.DataFrame:
+    """Printed output of univariate_analysis (without plots); returns the numeric summary."""
+    print("\n=== Numeric Descriptive Statistics (quartiles approximate) ===")
+    desc = stats.describe()
+    print(desc)
+
+    for col, hh in stats.heavy_hitters.items():
+        counts = hh.top(20)
+        if counts.empty:
+            continue
+        print(f"\n=== Top 20 categories for {col} ===")
+        if hh.error:
+            print(f"(approximate: counts may be low by up to {hh.error})")
+        print(counts.to_string())
+    return desc
+
+
+def correlation_report(stats: StreamingStats) -> pd.DataFrame:
+    """Printed correlation matrix of bivariate_analysis (without plots)."""
+    corr = stats.comoments.corr()
+    print("\n=== Correlation Matrix ===")
+    print(corr, end="\n\n")
+    return corr
+
+
+def summary_report_streaming(stats: StreamingStats) -> None:
+    """Sections 1–3 of summary_report: rating correlations, state and city extremes."""
+    corr = stats.comoments.corr()
+    if "rating" in corr:
+        print("\n=== Top 5 Positive Correlations with 'rating' ===")
+        print(corr["rating"].drop("rating").sort_values(ascending=False).head(5))
+        print("\n=== Top 5 Negative Correlations with 'rating' ===")
+        print(corr["rating"].drop("rating").sort_values().head(5))
+
+    names = {'Avg_Tot_Pymt_Amt': 'mean_payment', 'rating': 'mean_rating'}
+    state_stats = stats.group_means['facility_state'].means().rename(columns=names)
+    if not state_stats.empty:
+        print("\n=== Top 5 States by Mean Payment ===")
+        print(state_stats["mean_payment"].sort_values(ascending=False).head(5))
+        print("\n=== Bottom 5 States by Mean Payment ===")
+        print(state_stats["mean_payment"].sort_values().head(5))
+        print("\n=== Top 5 States by Mean Rating ===")
+        print(state_stats["mean_rating"].sort_values(ascending=False).head(5))
+        print("\n=== Bottom 5 States by Mean Rating ===")
+        print(state_stats["mean_rating"].sort_values().head(5))
+
+    city_stats = stats.group_means['facility_city'].means().rename(columns=names).dropna()
+    if not city_stats.empty:
+        print("\n=== Top 5 Highest‐Cost Cities ===")
+        print(city_stats["mean_payment"].sort_values(ascending=False).head(5))
+        print("\n=== Top 5 Lowest‐Cost Cities ===")
+        print(city_stats["mean_payment"].sort_values().head(5))
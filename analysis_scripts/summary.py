@@ -1,6 +1,8 @@
 import pandas as pd
 
-def summary_report(df: pd.DataFrame) -> None:
+from analysis_scripts.bivariate import correlation_matrix
+
+def summary_report(df: pd.DataFrame, weight_col: str | None = None) -> None:
     """
     Loads merged_data.csv and prints key summary statistics:
       1. Top correlations between cost and quality.
@@ -8,23 +10,29 @@ def summary_report(df: pd.DataFrame) -> None:
       3. Top 5 highest‐ and lowest‐cost cities (by avg payment) with their mean ratings.
       4. Counts of outliers and anomalies from previous flags (if present).
       5. Cluster size distribution from PCA/KMeans (if present).
+
+    With `weight_col` (a stratified sample's `sample_weight`), correlations, means
+    and counts are weighted estimates of the full-data values, and the rating
+    correlations and state means are printed with approximate 95% intervals.
     """
     # 1. Correlations
-    num = df.select_dtypes(include="number")
-    corr = num.corr()
-    if "rating" in corr:
-        print("\n=== Top 5 Positive Correlations with 'rating' ===")
-        print(corr["rating"].drop("rating").sort_values(ascending=False).head(5))
-        print("\n=== Top 5 Negative Correlations with 'rating' ===")
-        print(corr["rating"].drop("rating").sort_values().head(5))
+    num = df.select_dtypes(include="number").drop(columns=[weight_col] if weight_col else [])
+    if weight_col:
+        _weighted_rating_correlations(num, df[weight_col])
+    else:
+        corr = correlation_matrix(num)
+        if "rating" in corr:
+            print("\n=== Top 5 Positive Correlations with 'rating' ===")
+            print(corr["rating"].drop("rating").sort_values(ascending=False).head(5))
+            print("\n=== Top 5 Negative Correlations with 'rating' ===")
+            print(corr["rating"].drop("rating").sort_values().head(5))
 
     # 2. State‐level payment & rating
     if {"facility_state", "Avg_Tot_Pymt_Amt", "rating"}.issubset(df.columns):
-        state_stats = (
-            df.groupby("facility_state")
-              .agg(mean_payment=("Avg_Tot_Pymt_Amt","mean"),
-                   mean_rating=("rating","mean"))
-        )
+        state_stats = _group_means(df, "facility_state", weight_col)
+        if weight_col:
+            print("\n=== State Means (±95% CI half-width) ===")
+            print(state_stats.sort_values("mean_payment", ascending=False).head(5))
         print("\n=== Top 5 States by Mean Payment ===")
         print(state_stats["mean_payment"].sort_values(ascending=False).head(5))
         print("\n=== Bottom 5 States by Mean Payment ===")
@@ -36,24 +44,48 @@ def summary_report(df: pd.DataFrame) -> None:
 
     # 3. City‐level cost & rating
     if {"facility_city", "Avg_Tot_Pymt_Amt", "rating"}.issubset(df.columns):
-        city_stats = (
-            df.groupby("facility_city")
-              .agg(mean_payment=("Avg_Tot_Pymt_Amt","mean"),
-                   mean_rating=("rating","mean"))
-              .dropna()
-        )
+        city_stats = _group_means(df, "facility_city", weight_col).dropna(subset=["mean_payment", "mean_rating"])
         print("\n=== Top 5 Highest‐Cost Cities ===")
         print(city_stats["mean_payment"].sort_values(ascending=False).head(5))
         print("\n=== Top 5 Lowest‐Cost Cities ===")
         print(city_stats["mean_payment"].sort_values().head(5))
 
-    # 4. Outlier/anomaly counts
+    # 4. Outlier/anomaly counts (estimated full-data counts when weighted)
+    w = df[weight_col] if weight_col else pd.Series(1, index=df.index)
+    total = round(w.sum())
     if "outlier_iqr" in df.columns:
-        print(f"\nIQR Outliers: {df['outlier_iqr'].sum()} of {len(df)} rows")
+        print(f"\nIQR Outliers: {round(w[df['outlier_iqr']].sum())} of {total} rows")
     if "anomaly_iforest" in df.columns:
-        print(f"IsolationForest Anomalies: {df['anomaly_iforest'].sum()} of {len(df)} rows")
+        print(f"IsolationForest Anomalies: {round(w[df['anomaly_iforest']].sum())} of {total} rows")
 
     # 5. Cluster distribution
     if "cluster" in df.columns:
         print("\n=== Cluster Size Distribution ===")
-        print(df["cluster"].value_counts().sort_index())
\ No newline at end of file
+        print(w.groupby(df["cluster"]).sum().round().astype(int).rename("count"))
+
+
+def _group_means(df: pd.DataFrame, by: str, weight_col: str | None) -> pd.DataFrame:
+    if weight_col:
+        from analysis_scripts.sampling import weighted_group_means
+        return weighted_group_means(df, by, {"mean_payment": "Avg_Tot_Pymt_Amt", "mean_rating": "rating"},
+                                    weight_col)
+    return (
+        df.groupby(by, observed=True)
+          .agg(mean_payment=("Avg_Tot_Pymt_Amt","mean"),
+               mean_rating=("rating","mean"))
+    )
+
+
+def _weighted_rating_correlations(num: pd.DataFrame, weights: pd.Series) -> None:
+    from analysis_scripts.sampling import correlation_ci, weighted_correlation
+
+    corr, n_eff = weighted_correlation(num, weights)
+    if "rating" not in corr:
+        return
+    lower, upper = correlation_ci(corr["rating"], n_eff["rating"])
+    table = pd.DataFrame({"r": corr["rating"], "ci_lower": lower, "ci_upper": upper,
+                          "n_eff": n_eff["rating"].round()}).drop("rating")
+    print("\n=== Top 5 Positive Correlations with 'rating' (weighted, 95% CI) ===")
+    print(table.sort_values("r", ascending=False).head(5))
+    print("\n=== Top 5 Negative Correlations with 'rating' (weighted, 95% CI) ===")
+    print(table.sort_values("r").head(5))
@@ -1,10 +1,12 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from analysis_scripts.plotting import box_stats, boxplot, histogram
 
 def univariate_analysis(
     df: pd.DataFrame,
     numeric_cols: list[str] | None = None,
-    categorical_cols: list[str] | None = None
+    categorical_cols: list[str] | None = None,
+    weight_col: str | None = None
 ):
     """
     1. Prints descriptive statistics for numeric columns.
@@ -16,47 +18,62 @@ def univariate_analysis(
         numeric_cols: list of column names to treat as numeric;
                       by default, inferred via df.select_dtypes(include='number')
         categorical_cols: list of column names to treat as categorical;
-                          by default, inferred via df.select_dtypes(include=['object','category'])
+                          by default, inferred via df.select_dtypes(include=['object','category','string'])
+        weight_col: optional sampling-weight column (see analysis_scripts.sampling);
+                    the statistics, histograms, boxplots and category counts are then weighted
     """
+    import matplotlib.pyplot as plt
+
     # 1. Infer columns if not provided
     if numeric_cols is None:
-        numeric_cols = df.select_dtypes(include='number').columns.tolist()
+        numeric_cols = [c for c in df.select_dtypes(include='number').columns if c != weight_col]
     if categorical_cols is None:
-        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
     
     # 2. Numeric summaries
-    print("\n=== Numeric Descriptive Statistics ===")
-    desc = df[numeric_cols].describe().transpose()
+    if weight_col:
+        from analysis_scripts.sampling import weighted_describe
+        print("\n=== Numeric Descriptive Statistics (weighted) ===")
+        desc = weighted_describe(df[numeric_cols], df[weight_col])
+    else:
+        print("\n=== Numeric Descriptive Statistics ===")
+        desc = df[numeric_cols].describe().transpose()
     print(desc)
     
-    # 3. Histograms and boxplots for numeric columns
+    # 3. Histograms and boxplots for numeric columns (drawn from np.histogram counts and quantiles)
+    weights = df[weight_col] if weight_col else None
     for col in numeric_cols:
         # Histogram
-        plt.figure(figsize=(6, 4))
-        df[col].hist(bins=30)
+        fig, ax = plt.subplots(figsize=(6, 4))
+        histogram(ax, df[col], bins=30, weights=weights)
         plt.title(f"Histogram of {col}")
         plt.xlabel(col)
-        plt.ylabel("Frequency")
+        plt.ylabel("Frequency (weighted)" if weight_col else "Frequency")
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
         
         # Boxplot
-        plt.figure(figsize=(4, 6))
-        df.boxplot(column=col)
-        plt.title(f"Boxplot of {col}")
+        fig, ax = plt.subplots(figsize=(4, 6))
+        boxplot(ax, [box_stats(df[col], col, weights=weights)])
+        plt.title(f"Boxplot of {col}{' (weighted)' if weight_col else ''}")
         plt.ylabel(col)
         plt.tight_layout()
         plt.show()
+        plt.close(fig)
     
     # 4. Categorical counts and bar charts
     for col in categorical_cols:
-        counts = df[col].value_counts().head(20)
+        if weight_col:
+            counts = df.groupby(col, observed=True)[weight_col].sum().sort_values(ascending=False).head(20)
+        else:
+            counts = df[col].value_counts().head(20)
         if counts.empty:
             continue
-        print(f"\n=== Top 20 categories for {col} ===")
+        print(f"\n=== Top 20 categories for {col}{' (weighted counts)' if weight_col else ''} ===")
         print(counts.to_string())
         
-        plt.figure(figsize=(8, 4))
+        fig = plt.figure(figsize=(8, 4))
         counts.plot(kind="bar")
         plt.title(f"Top 20 Categories: {col}")
         plt.xlabel(col)
@@ -64,5 +81,4 @@ def univariate_analysis(
         plt.xticks(rotation=45, ha="right")
         plt.tight_layout()
         plt.show()
-
-univariate_analysis(df)
\ No newline at end of file
+        plt.close(fig)
@@ -0,0 +1,146 @@
+import heapq
+import json
+import os
+
+import pandas as pd
+
+DEFAULT_INDEX_PATH = "data/processed/value_index.json"
+ALL_STATES = "*"
+
+RECORD_COLS = ['Rndrng_Prvdr_CCN', 'facility_state', 'Avg_Tot_Pymt_Amt', 'rating', 'value_score']
+
+
+def value_scores(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (CCN, DRG) with a value score of rating points per $1,000 of
+    Avg_Tot_Pymt_Amt. Scores are only compared within a DRG, so the DRG's
+    price level cancels out of the ranking.
+
+    The merged dataset repeats each provider × DRG row per payment measure and per
+    Healthgrades hospital in the same city, so a CCN can carry several ratings; they
+    are averaged, as in the SQLite store. Rows without a state can't be ranked in
+    any state group and are left out of the national counts too.
+    """
+    rows = df[['Rndrng_Prvdr_CCN', 'DRG_Cd', 'facility_state', 'Avg_Tot_Pymt_Amt', 'rating']]
+    rows = rows.dropna(subset=['Avg_Tot_Pymt_Amt', 'rating', 'DRG_Cd', 'facility_state'])
+    rows = rows[rows['Avg_Tot_Pymt_Amt'] > 0]
+    rows = rows.groupby(['Rndrng_Prvdr_CCN', 'DRG_Cd'], sort=False, observed=True).agg(
+        facility_state=('facility_state', 'first'),
+        Avg_Tot_Pymt_Amt=('Avg_Tot_Pymt_Amt', 'mean'),
+        rating=('rating', 'mean'),
+    ).reset_index()
+    rows['Rndrng_Prvdr_CCN'] = rows['Rndrng_Prvdr_CCN'].astype(str)
+    rows['DRG_Cd'] = rows['DRG_Cd'].astype(str)
+    rows['value_score'] = rows['rating'] / (rows['Avg_Tot_Pymt_Amt'] / 1000.0)
+    return rows
+
+
+def group_key(drg, state=ALL_STATES):
+    return f"{drg}|{state}"
+
+
+def _select(rows: pd.DataFrame, by, k):
+    """Top-k and bottom-k rows per group via partial selection (nlargest/nsmallest, no full sort)."""
+    grouped = rows.groupby(by, sort=False, observed=True)['value_score']
+    top = grouped.nlargest(k).index.get_level_values(-1)
+    bottom = grouped.nsmallest(k).index.get_level_values(-1)
+    return rows.loc[top], rows.loc[bottom], grouped.size()
+
+
+def _entries(frame: pd.DataFrame):
+    return frame[RECORD_COLS].to_dict('records')
+
+
+def _fill_groups(groups, top, bottom, sizes, key_of):
+    for key, n in sizes.items():
+        groups[key_of(key)] = {'n': int(n), 'top': [], 'bottom': [], 'stale': False}
+    for frame, side in [(top, 'top'), (bottom, 'bottom')]:
+        for key, part in frame.groupby(list(sizes.index.names), sort=False, observed=True):
+            groups[key_of(key if len(key) > 1 else key[0])][side] = _entries(part)
+
+
+def build_value_index(df: pd.DataFrame, k: int = 10) -> dict:
+    """
+    1. Scores every provider × DRG row (see value_scores).
+    2. Selects the top-k/bottom-k per DRG × state in a single grouped pass.
+    3. Derives the national per-DRG lists from the union of the state lists,
+       since a national top-k hospital is necessarily in its state's top-k.
+    Returns a dict keyed by "DRG|state" ("DRG|*" for national).
+    """
+    rows = value_scores(df)
+    groups = {}
+
+    top, bottom, sizes = _select(rows, ['DRG_Cd', 'facility_state'], k)
+    _fill_groups(groups, top, bottom, sizes, lambda key: group_key(*key))
+
+    candidates = pd.concat([top, bottom]).drop_duplicates(['Rndrng_Prvdr_CCN', 'DRG_Cd'])
+    nat_top, nat_bottom, _ = _select(candidates, ['DRG_Cd'], k)
+    nat_sizes = rows.groupby('DRG_Cd', sort=False).size()
+    _fill_groups(groups, nat_top, nat_bottom, nat_sizes, lambda drg: group_key(drg))
+
+    return {'k': k, 'score': 'rating per $1,000 Avg_Tot_Pymt_Amt', 'groups': groups}
+
+
+def lookup_value_index(index: dict, drg, state=None, which: str = 'top') -> pd.DataFrame:
+    """Top or bottom hospitals for a DRG (nationally, or within `state`) in O(1)."""
+    group = index['groups'].get(group_key(str(drg), state or ALL_STATES))
+    if group is None:
+        return pd.DataFrame(columns=RECORD_COLS)
+    if group['stale']:
+        print(f"⚠️ Value index entry for DRG {drg} / {state or 'all states'} is stale; rebuild to refresh it.")
+    return pd.DataFrame(group[which], columns=RECORD_COLS)
+
+
+def _merge_side(entries, new_entries, k, largest):
+    pick = heapq.nlargest if largest else heapq.nsmallest
+    return pick(k, entries + new_entries, key=lambda e: e['value_score'])
+
+
+def update_value_index(index: dict, new_df: pd.DataFrame) -> dict:
+    """
+    Folds new charge rows into the index in place, touching only the groups they belong to.
+
+    A CCN already listed for a group is replaced by its new row. If that row moved
+    towards the middle of the distribution, a hospital outside the stored lists may
+    now belong in them, so the group is flagged stale until the next rebuild.
+    """
+    k = index['k']
+    rows = value_scores(new_df)
+    rows = pd.concat([rows.assign(group_state=rows['facility_state']),
+                      rows.assign(group_state=ALL_STATES)])
+
+    for (drg, state), part in rows.groupby(['DRG_Cd', 'group_state'], sort=False):
+        key = group_key(drg, state)
+        group = index['groups'].setdefault(key, {'n': 0, 'top': [], 'bottom': [], 'stale': False})
+        new_entries = _entries(part)
+        new_ccns = {e['Rndrng_Prvdr_CCN'] for e in new_entries}
+        new_scores = {e['Rndrng_Prvdr_CCN']: e['value_score'] for e in new_entries}
+
+        for e in group['top']:
+            if new_scores.get(e['Rndrng_Prvdr_CCN'], e['value_score']) < e['value_score']:
+                group['stale'] = True
+        for e in group['bottom']:
+            if new_scores.get(e['Rndrng_Prvdr_CCN'], e['value_score']) > e['value_score']:
+                group['stale'] = True
+        listed = {e['Rndrng_Prvdr_CCN'] for e in group['top'] + group['bottom']}
+
+        # Rows for CCNs not seen in the stored lists may be updates of unlisted rows;
+        # counting them as new keeps `n` an upper bound.
+        group['n'] += len(new_ccns - listed)
+        for side, largest in [('top', True), ('bottom', False)]:
+            kept = [e for e in group[side] if e['Rndrng_Prvdr_CCN'] not in new_ccns]
+            group[side] = _merge_side(kept, new_entries, k, largest)
+
+    return index
+
+
+def save_value_index(index: dict, path: str = DEFAULT_INDEX_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(index, f)
+    print(f"[SUCCESS] Value index ({len(index['groups'])} groups) saved to {path}")
+
+
+def load_value_index(path: str = DEFAULT_INDEX_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
@@ -1,50 +1,191 @@
 """
 Central orchestration script to run full pipeline of data analysis and visualization.
+
+    python analyze_visualize.py                # full pipeline
+    python analyze_visualize.py --stats-only   # summary statistics only, no plotting/model imports
+    python analyze_visualize.py --streaming    # univariate/correlation/summary stats in chunks
+    python analyze_visualize.py --sharded --workers 8  # state-decomposable stats as map/reduce over shards
+    python analyze_visualize.py --snapshot 2025Q3          # a recorded release instead of the CSV
+    python analyze_visualize.py --as-of 2025-06-30         # latest release on or before a date
+    python analyze_visualize.py --sample 0.1               # weighted state × DRG stratified sample
 """
 
+import argparse
+
 import pandas as pd
-from analysis_scripts.basic_eda import data_type_checks, identical_rows_analysis, missing_value_analysis
-from analysis_scripts.univariate import univariate_analysis
-from analysis_scripts.bivariate import bivariate_analysis
-from analysis_scripts.cost_vs_rating import cost_rating_correlation
-from analysis_scripts.cost_vs_rating_states import state_cost_rating_analysis
-from analysis_scripts.geographical import geographic_analysis
-from analysis_scripts.outlier import outlier_anomaly_detection
-from analysis_scripts.multivariate_dim_red import multivariate_dimensionality_reduction
-from analysis_scripts.summary import summary_report
 
+from utils.schema import iter_csv_chunks, load_merged_dataset
+
+DATA_PATH = "./data/processed/merged_healthcare_data.csv"
+
+
+def load_data(path=DATA_PATH, snapshot=None, as_of=None):
+    if snapshot or as_of:
+        from utils.snapshots import read_snapshot
+        df = read_snapshot('merged', name=snapshot, as_of=as_of)
+    else:
+        df = load_merged_dataset(path)
+    df = df.dropna(axis=1, how="all")
+    return df.dropna(subset=["Avg_Submtd_Cvrd_Chrg", "rating"])
+
+
+def load_sample(path=DATA_PATH, fraction=None, n_rows=None, seed=0, snapshot=None, as_of=None):
+    """A stratified sample of load_data(...), cached on the source file (or snapshot) and parameters."""
+    import os
+    from analysis_scripts.cache import code_version
+    from analysis_scripts.sampling import cached_sample
+
+    if snapshot or as_of:
+        from utils.snapshots import load_manifest
+        source_key = repr(load_manifest('merged', name=snapshot, as_of=as_of))
+    else:
+        st = os.stat(path)
+        source_key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    source_key += f":{code_version(load_data)}"
+    return cached_sample(source_key, lambda: load_data(path, snapshot, as_of),
+                         fraction=fraction, n_rows=n_rows, seed=seed)
+
+
+def run_stats_only(filtered_df, weight_col=None):
+    from analysis_scripts.summary import summary_report
+
+    summary_report(filtered_df, weight_col=weight_col)
+    return filtered_df
+
+
+def run_streaming(path=DATA_PATH, chunksize=100_000, snapshot=None, as_of=None):
+    from analysis_scripts.streaming import accumulate, correlation_report, summary_report_streaming, univariate_report
+
+    if snapshot or as_of:
+        from utils.snapshots import iter_snapshot_chunks
+        source = iter_snapshot_chunks('merged', name=snapshot, as_of=as_of)
+    else:
+        source = iter_csv_chunks(path, chunksize=chunksize)
+    chunks = (chunk.dropna(subset=["Avg_Submtd_Cvrd_Chrg", "rating"]) for chunk in source)
+    stats = accumulate(chunks)
+    print(f"[INFO] Accumulated {stats.rows} rows")
+    univariate_report(stats)
+    correlation_report(stats)
+    summary_report_streaming(stats)
+    return stats
+
+
+def run_sharded_stats(path=DATA_PATH, workers=None, shard_by="state", executor="processes"):
+    from analysis_scripts.sharded import JobSpec, run_sharded
+
+    return run_sharded(JobSpec(path, shard_by=shard_by, executor=executor, max_workers=workers))
+
+
+def run_pipeline(filtered_df, weight_col=None):
+    """
+    Runs every analysis. With `weight_col` (a stratified sample), the descriptive,
+    correlation, geographic, case-mix, regression and summary results are weighted
+    estimates and the column is left out of the per-column analyses.
+    """
+    from analysis_scripts.basic_eda import data_type_checks, identical_rows_analysis, missing_value_analysis
+    from analysis_scripts.univariate import univariate_analysis
+    from analysis_scripts.bivariate import bivariate_analysis
+    from analysis_scripts.cost_vs_rating import cost_rating_correlation
+    from analysis_scripts.cost_vs_rating_states import state_cost_rating_analysis
+    from analysis_scripts.geographical import geographic_analysis
+    from analysis_scripts.outlier import outlier_anomaly_detection
+    from analysis_scripts.multivariate_dim_red import multivariate_dimensionality_reduction
+    from analysis_scripts.summary import summary_report
+    from analysis_scripts.case_mix import case_mix_normalization
+    from analysis_scripts.fixed_effects import fixed_effects_regression
+
+    # === Basic EDA ===
+
+    filtered_df = data_type_checks(filtered_df)
+    identical_rows_analysis(filtered_df)
+    missing_value_analysis(filtered_df)
+
+    numeric_cols = None
+    if weight_col:
+        numeric_cols = [c for c in filtered_df.select_dtypes(include='number').columns if c != weight_col]
+
+    univariate_analysis(filtered_df, numeric_cols=numeric_cols, weight_col=weight_col)
+    bivariate_analysis(filtered_df, numeric_cols=numeric_cols, weight_col=weight_col)
+
+    # === Cost vs Rating ===
+    cost_rating_correlation(filtered_df, weight_col=weight_col)
+    state_cost_rating_analysis(filtered_df, weight_col=weight_col)
 
+    # === Geographic Patterns ===
+    geographic_analysis(filtered_df, weight_col=weight_col)
 
+    # === Outlier Detection ===
+    filtered_df = outlier_anomaly_detection(filtered_df, numeric_cols=numeric_cols)
 
-# === Load data ===
-df = pd.read_csv("./data/processed/merged_healthcare_data.csv")
-df = df.dropna(axis=1, how="all")
-filtered_df = df.dropna(subset=["Avg_Submtd_Cvrd_Chrg", "rating"])
+    # === PCA & Clustering ===
+    pca_results = multivariate_dimensionality_reduction(
+        filtered_df.drop(columns=[weight_col]) if weight_col else filtered_df)
+    if not pca_results.empty:
+        filtered_df = pd.concat([filtered_df, pca_results], axis=1)
 
-# === Basic EDA ===
+    # === Case-Mix Normalization ===
+    filtered_df, cost_index = case_mix_normalization(filtered_df, weight_col=weight_col)
 
-filtered_df = data_type_checks(filtered_df)
-identical_rows_analysis(filtered_df)
-missing_value_analysis(filtered_df)
+    # === Cost vs Rating within State and DRG ===
+    fixed_effects_regression(filtered_df, weights=weight_col)
 
+    # === Summary Report ===
+    summary_report(filtered_df, weight_col=weight_col)
+    return filtered_df
 
-univariate_analysis(filtered_df)
-bivariate_analysis(filtered_df)
 
-# === Cost vs Rating ===
-cost_rating_correlation(filtered_df)
-state_cost_rating_analysis(filtered_df)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the healthcare cost/quality analysis pipeline.")
+    parser.add_argument("--data", default=DATA_PATH, help="merged dataset CSV")
+    parser.add_argument("--stats-only", action="store_true",
+                        help="only print the summary report (skips plotting and model fitting)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="compute univariate, correlation and summary statistics chunk by chunk "
+                             "without loading the dataset into memory")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk with --streaming (snapshots stream block by block)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="compute the state, city, RUCA, per-state correlation and IQR outlier results "
+                             "as a map/reduce over shards of the dataset")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes with --sharded")
+    parser.add_argument("--shard-by", choices=["state", "ccn"], default="state")
+    parser.add_argument("--executor", choices=["serial", "processes", "dask"], default="processes",
+                        help="where --sharded runs its map tasks (dask: local multi-worker cluster)")
+    parser.add_argument("--snapshot", metavar="NAME", default=None,
+                        help="analyze a recorded snapshot of the merged dataset instead of --data")
+    parser.add_argument("--as-of", metavar="YYYY-MM-DD", default=None,
+                        help="analyze the latest merged snapshot released on or before this date")
+    parser.add_argument("--sample", type=float, metavar="FRACTION", default=None,
+                        help="analyze a stratified sample (by state × DRG) of this fraction of the rows, "
+                             "with weighted estimates; the sample is cached for repeat runs")
+    parser.add_argument("--sample-rows", type=int, metavar="N", default=None,
+                        help="like --sample, with a budget of N rows")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --sample/--sample-rows")
+    args = parser.parse_args(argv)
 
-# === Geographic Patterns ===
-geographic_analysis(filtered_df)
+    sampled = args.sample is not None or args.sample_rows is not None
+    if args.sharded and args.streaming:
+        parser.error("--sharded and --streaming are alternative modes; pick one")
+    if args.sharded and (args.snapshot or args.as_of or sampled):
+        parser.error("--sharded reads the --data CSV in full; it can't be combined with "
+                     "--snapshot, --as-of, --sample or --sample-rows")
+    if args.streaming and sampled:
+        parser.error("--streaming reads every row; it can't be combined with --sample or --sample-rows")
 
-# === Outlier Detection ===
-filtered_df = outlier_anomaly_detection(filtered_df)
+    if args.sharded:
+        return run_sharded_stats(args.data, args.workers, args.shard_by, args.executor)
+    if args.streaming:
+        return run_streaming(args.data, args.chunksize, snapshot=args.snapshot, as_of=args.as_of)
+    weight_col = None
+    if sampled:
+        filtered_df = load_sample(args.data, args.sample, args.sample_rows, args.seed,
+                                  snapshot=args.snapshot, as_of=args.as_of)
+        weight_col = "sample_weight"
+    else:
+        filtered_df = load_data(args.data, snapshot=args.snapshot, as_of=args.as_of)
+    if args.stats_only:
+        return run_stats_only(filtered_df, weight_col)
+    return run_pipeline(filtered_df, weight_col)
 
-# === PCA & Clustering ===
-pca_results = multivariate_dimensionality_reduction(filtered_df)
-if not pca_results.empty:
-    filtered_df = pd.concat([filtered_df, pca_results], axis=1)
 
-# === Summary Report ===
-summary_report(filtered_df)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
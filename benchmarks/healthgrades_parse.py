@@ -0,0 +1,150 @@
+"""
+Pages/sec for the Healthgrades page parsers.
+
+Compares the original full-tree parse (BeautifulSoup + html.parser for every page)
+with the targeted parsers in utils.healthgrades_scraper, serially and through a
+process pool.
+
+Fixtures are saved pages in a directory, named by page type:
+    directory*.html, state_*.html, city_*.html, hospital_*.html
+
+    python -m benchmarks.healthgrades_parse path/to/fixtures [--repeat 5] [--workers 4]
+
+Without a fixture directory, synthetic pages with the same markup are generated
+so the parsers can still be exercised (absolute numbers are then only indicative).
+"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from utils.healthgrades_scraper import (
+    COIN_CLASS,
+    PARSER,
+    parse_city_page,
+    parse_directory_page,
+    parse_hospital_page,
+    parse_state_page,
+)
+
+TARGETED = {
+    "directory": parse_directory_page,
+    "state": parse_state_page,
+    "city": parse_city_page,
+    "hospital": parse_hospital_page,
+}
+
+
+def full_parse(kind, html):
+    """The pre-refactor extraction: a full html.parser tree per page."""
+    soup = BeautifulSoup(html, "html.parser")
+    if kind == "directory":
+        return soup.select("div[data-qa-target='alpha-list'] ul li")
+    if kind == "state":
+        section = soup.select_one("section[data-qa-target='top-cities-list']")
+        return section.select("a.sAL3j1mOy0qvcbNn") if section else []
+    if kind == "city":
+        return soup.find_all("a", attrs={"data-qa-target": "name-link"})
+    coins = soup.find_all("div", class_=COIN_CLASS)
+    return coins[1].get_text(strip=True) if len(coins) > 1 else None
+
+
+def targeted_parse(kind, html):
+    return TARGETED[kind](html)
+
+
+def _parse_one(args):
+    kind, html = args
+    return targeted_parse(kind, html)
+
+
+def load_fixtures(fixture_dir):
+    pages = []
+    for kind in TARGETED:
+        for path in sorted(glob.glob(os.path.join(fixture_dir, f"{kind}*.html"))):
+            with open(path, "rb") as f:
+                pages.append((kind, f.read()))
+    return pages
+
+
+def synthetic_pages(n_hospitals=100, filler_kb=40):
+    """Pages shaped like the live site: the few elements we read buried in a large document."""
+    filler = ("<div class='nav'><ul>" + "<li><a href='#'>link</a></li>" * 40 + "</ul></div>"
+              "<script>var x = {};</script>") * max(1, filler_kb * 1024 // 1200)
+
+    def page(body):
+        return f"<html><head><title>t</title></head><body>{filler}{body}{filler}</body></html>".encode()
+
+    states = "".join(
+        f"<li><a data-qa-target='state-{i}--title' href='/hospital-directory/s{i}'>State {i}</a></li>"
+        for i in range(50))
+    cities = "".join(f"<a class='sAL3j1mOy0qvcbNn' href='c{i}'>City {i}</a>" for i in range(25))
+    hospitals = "".join(f"<a data-qa-target='name-link' href='h{i}'>Hospital {i}</a>" for i in range(15))
+    coins = "".join(f"<div class='{COIN_CLASS}'>{70 + i}%</div>" for i in range(3))
+
+    pages = [("directory", page(f"<div data-qa-target='alpha-list'><ul>{states}</ul></div>"))]
+    pages += [("state", page(f"<section data-qa-target='top-cities-list'>{cities}</section>"))] * 5
+    pages += [("city", page(hospitals))] * 20
+    pages += [("hospital", page(coins))] * n_hospitals
+    return pages
+
+
+def bench(label, pages, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, html in pages:
+            func(kind, html)
+    elapsed = time.perf_counter() - start
+    rate = len(pages) * repeat / elapsed
+    print(f"{label:<38} {rate:10.1f} pages/sec")
+    return rate
+
+
+def bench_pool(pages, repeat, workers):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_parse_one, pages[:workers]))  # warm the workers up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(pool.map(_parse_one, pages, chunksize=8))
+        elapsed = time.perf_counter() - start
+    rate = len(pages) * repeat / elapsed
+    print(f"{f'targeted ({PARSER}), {workers} processes':<38} {rate:10.1f} pages/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="?", help="directory of saved Healthgrades pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.fixtures:
+        pages = load_fixtures(args.fixtures)
+        if not pages:
+            raise SystemExit(f"No *.html fixtures found in {args.fixtures}")
+    else:
+        print("[INFO] No fixture directory given; using synthetic pages")
+        pages = synthetic_pages()
+
+    # Spot-check one page per type: both parsers must extract the same elements.
+    for kind, html in dict(pages).items():
+        expected, actual = full_parse(kind, html), targeted_parse(kind, html)
+        if kind != "hospital":
+            expected, actual = len(expected), len(actual)
+        if expected != actual:
+            raise SystemExit(f"Targeted parser disagrees on a {kind} page: {expected!r} != {actual!r}")
+
+    print(f"{len(pages)} pages, {sum(len(h) for _, h in pages) / 1e6:.1f} MB, repeat={args.repeat}")
+    baseline = bench("full tree (html.parser)", pages, full_parse, args.repeat)
+    serial = bench(f"targeted ({PARSER})", pages, targeted_parse, args.repeat)
+    pooled = bench_pool(pages, args.repeat, args.workers)
+    print(f"speedup: {serial / baseline:.1f}x serial, {pooled / baseline:.1f}x pooled")
+
+
+if __name__ == "__main__":
+    main()
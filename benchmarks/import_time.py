@@ -0,0 +1,72 @@
+"""
+Startup budget for the analysis package.
+
+Times fresh-interpreter imports of the lightweight entry points against the
+eager import set the orchestrator used to load (pandas + matplotlib + scipy +
+scikit-learn). Exits non-zero if an entry point loads a heavy dependency or
+exceeds its share of the eager import time.
+
+    python -m benchmarks.import_time [--runs 5]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("matplotlib", "scipy", "sklearn")
+
+EAGER = ("import pandas, matplotlib.pyplot, scipy.stats, sklearn.decomposition, "
+         "sklearn.cluster, sklearn.impute, sklearn.ensemble")
+
+# Entry point -> maximum fraction of the eager import time.
+BUDGETS = {
+    "import analysis_scripts": 0.5,
+    "from analysis_scripts import summary_report": 0.5,
+    "import analysis_scripts.summary": 0.5,
+    "import analyze_visualize": 0.5,
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(elapsed, ",".join(heavy))
+"""
+
+
+def time_import(stmt, runs):
+    times, heavy = [], ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(stmt=stmt, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        times.append(float(out[0]))
+        heavy = out[1] if len(out) > 1 else ""
+    return statistics.median(times), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    eager, _ = time_import(EAGER, args.runs)
+    print(f"{'eager heavy imports (previous orchestrator)':<48} {eager * 1000:8.1f} ms")
+
+    failed = False
+    for stmt, budget in BUDGETS.items():
+        elapsed, heavy = time_import(stmt, args.runs)
+        ok = elapsed <= budget * eager and not heavy
+        failed |= not ok
+        note = f"loads {heavy}" if heavy else f"{elapsed / eager:.0%} of eager, budget {budget:.0%}"
+        print(f"{stmt:<48} {elapsed * 1000:8.1f} ms  {'OK  ' if ok else 'FAIL'} {note}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
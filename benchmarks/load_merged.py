@@ -0,0 +1,89 @@
+"""
+Load time and resident memory for the merged dataset: the previous untyped
+read + per-column coercion vs. the declared-schema loader (utils.schema).
+
+Each variant runs in a fresh interpreter so peak RSS is not shared.
+
+    python -m benchmarks.load_merged [path] [--runs 3]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PREVIOUS = """
+df = pd.read_csv(path)
+df = df.dropna(axis=1, how="all")
+for col in ['Tot_Dschrgs', 'Avg_Submtd_Cvrd_Chrg', 'Avg_Tot_Pymt_Amt', 'Avg_Mdcr_Pymt_Amt', 'payment',
+            'denominator', 'lower_estimate', 'higher_estimate', 'value_of_care_display_id', 'rating']:
+    if col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+for col in ['start_date', 'end_date']:
+    if col in df.columns:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+"""
+
+SCHEMA = """
+from utils.schema import load_merged_dataset
+df = load_merged_dataset(path)
+df = df.dropna(axis=1, how="all")
+"""
+
+SCHEMA_PYARROW = """
+from utils.schema import load_csv
+df = load_csv(path, engine="pyarrow")
+df = df.dropna(axis=1, how="all")
+"""
+
+PROBE = """
+import json, resource, sys, time
+import pandas as pd
+path = {path!r}
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "rss_before_mb": rss_before / 1024,
+    "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+    "rows": len(df),
+}}))
+"""
+
+
+def run(body, path, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(path=path, body=body)],
+                             capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(results, key=lambda r: r["seconds"])
+    best["seconds"] = statistics.median(r["seconds"] for r in results)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="data/processed/merged_healthcare_data.csv")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    variants = [("previous (untyped + coercion)", PREVIOUS),
+                ("declared schema, pyarrow engine", SCHEMA_PYARROW),
+                ("declared schema, default engine", SCHEMA)]
+    print(f"{'':<34} {'seconds':>8} {'peak RSS MB':>12} {'frame MB':>9}")
+    baseline = None
+    for label, body in variants:
+        r = run(body, args.path, args.runs)
+        baseline = baseline or r
+        print(f"{label:<34} {r['seconds']:8.2f} {r['peak_rss_mb']:12.0f} {r['frame_mb']:9.1f}")
+    print(f"rows: {r['rows']:,}; time {baseline['seconds'] / r['seconds']:.1f}x faster, "
+          f"frame {baseline['frame_mb'] / r['frame_mb']:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
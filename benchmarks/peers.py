@@ -0,0 +1,97 @@
+"""
+Times the KD-tree peer index against brute-force distance scans.
+
+1. Builds the peer index over every hospital in the merged dataset, answers a
+   batched k-NN query for all of them, and checks the neighbors against a
+   brute-force scan of the same embedding.
+2. Repeats the comparison on synthetic hospital feature vectors (--synthetic N,
+   several sizes allowed) to show how both scale past the national hospital count.
+3. Inserts 5% more hospitals into each index, then times queries while they sit
+   in the pending buffer and again after the rebuild.
+4. Re-inserts 5% of the indexed hospitals with perturbed features, which leaves
+   their old tree entries dead until the next rebuild, and times queries again.
+
+    python -m benchmarks.peers [path/to/merged.csv] [--k 20] [--queries 10000] [--synthetic 100000 1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.peers import FEATURES, INFO_COLS, PeerIndex, brute_force_knn, build_peer_index
+from analyze_visualize import DATA_PATH, load_data
+
+
+def synthetic_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n, 3))
+    mixing = rng.normal(size=(3, len(FEATURES)))
+    values = latent @ mixing + 0.3 * rng.normal(size=(n, len(FEATURES)))
+    features = pd.DataFrame(values, columns=FEATURES, index=[f"S{i:07d}" for i in range(n)])
+    for col in INFO_COLS:
+        features[col] = ""
+    return features
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def compare(index: PeerIndex, k: int, n_queries: int, label: str):
+    alive = np.flatnonzero(index.alive)
+    rng = np.random.default_rng(1)
+    own = np.sort(rng.choice(alive, min(n_queries, len(alive)), replace=False))
+    (distances, _), tree_s = timed(index.query_points, index.points[own], k, exclude=own)
+    (brute_d, _), brute_s = timed(brute_force_knn, index.points[alive], index.points[own], k + 1)
+    # The brute-force scan finds each query hospital itself at distance 0.
+    exact = np.allclose(distances, brute_d[:, 1:], atol=1e-6)
+    print(f"{label:<34} {len(alive):>10,} {len(own):>8,} {tree_s:9.3f} s {brute_s:9.3f} s "
+          f"{brute_s / tree_s:7.1f}x  {'exact' if exact else 'MISMATCH'}")
+
+
+def run(index: PeerIndex, k: int, n_queries: int, label: str, features: pd.DataFrame):
+    compare(index, k, n_queries, label)
+    extra = features.sample(max(1, len(features) // 20), random_state=2)
+    extra = extra.set_axis([f"new-{c}" for c in extra.index])
+    # Keep the inserts pending for the first comparison, then rebuild.
+    fraction, index.rebuild_fraction = index.rebuild_fraction, np.inf
+    _, insert_s = timed(index.insert, extra)
+    compare(index, k, n_queries, f"  +{len(extra):,} pending ({insert_s:.3f} s)")
+    _, rebuild_s = timed(index.rebuild)
+    compare(index, k, n_queries, f"  rebuilt ({rebuild_s:.3f} s)")
+
+    replaced = features.sample(max(1, len(features) // 20), random_state=3)
+    noise = np.random.default_rng(3).normal(0, 0.1, (len(replaced), len(FEATURES)))
+    replaced = replaced.assign(**{col: replaced[col] + noise[:, i] for i, col in enumerate(FEATURES)})
+    _, insert_s = timed(index.insert, replaced)
+    compare(index, k, n_queries, f"  {len(replaced):,} replaced ({insert_s:.3f} s)")
+    index.rebuild_fraction = fraction
+    _, rebuild_s = timed(index.rebuild)
+    compare(index, k, n_queries, f"  rebuilt ({rebuild_s:.3f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", nargs="?", default=DATA_PATH)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[100_000], metavar="N")
+    args = parser.parse_args()
+
+    print(f"{'index':<34} {'hospitals':>10} {'queries':>8} {'kd-tree':>11} {'brute':>11} {'speedup':>8}")
+    df = load_data(args.data)
+    index, build_s = timed(build_peer_index, df)
+    run(index, args.k, args.queries, f"merged dataset (build {build_s:.2f} s)", index.features)
+
+    for n in args.synthetic:
+        features = synthetic_features(n)
+        index, build_s = timed(PeerIndex, features)
+        run(index, args.k, args.queries, f"synthetic (build {build_s:.2f} s)", features)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Times the cost vs. rating scatter and a boxplot/histogram pair drawn from every
+point (plt.scatter, df.boxplot, Series.hist) and from the binned summaries in
+analysis_scripts.plotting, rendered with the Agg backend, at growing row counts
+of synthetic data. Reports seconds and output size per figure.
+
+    python -m benchmarks.plotting [--rows 100000 1000000 4000000] [--skip-raw-above 1000000] [--format svg]
+"""
+
+import argparse
+import io
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from analysis_scripts.plotting import box_stats, boxplot, density_scatter, histogram, plot_binned_means  # noqa: E402
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = rng.lognormal(9.8, 0.5, n)
+    rating = np.clip(70 + 0.0002 * (cost - cost.mean()) + rng.normal(0, 8, n), 0, 100)
+    return pd.DataFrame({'Avg_Tot_Pymt_Amt': cost, 'rating': rating})
+
+
+def render(draw, fmt="png") -> tuple:
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(6, 6))
+    draw(fig, ax)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    plt.close(fig)
+    return time.perf_counter() - start, buf.tell()
+
+
+def raw_scatter(df):
+    return lambda fig, ax: ax.scatter(df['Avg_Tot_Pymt_Amt'], df['rating'], alpha=0.5, edgecolor='k', linewidth=0.3)
+
+
+def binned_scatter(df):
+    def draw(fig, ax):
+        if density_scatter(ax, df['Avg_Tot_Pymt_Amt'], df['rating']):
+            plot_binned_means(ax, df['Avg_Tot_Pymt_Amt'], df['rating'])
+    return draw
+
+
+def raw_box_hist(df):
+    def draw(fig, ax):
+        df.boxplot(column='Avg_Tot_Pymt_Amt', ax=ax)
+        df['rating'].hist(bins=30, ax=fig.add_axes([0.6, 0.6, 0.3, 0.3]))
+    return draw
+
+
+def binned_box_hist(df):
+    def draw(fig, ax):
+        boxplot(ax, [box_stats(df['Avg_Tot_Pymt_Amt'], 'Avg_Tot_Pymt_Amt')])
+        histogram(fig.add_axes([0.6, 0.6, 0.3, 0.3]), df['rating'], bins=30)
+    return draw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--skip-raw-above", type=int, default=1_000_000,
+                        help="don't time the every-point figures above this many rows")
+    parser.add_argument("--format", default="png", help="output format passed to savefig (png, svg, pdf)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'figure':<10} {'every point':>18} {'binned':>18}")
+    for n in args.rows:
+        df = synthetic(n)
+        for name, raw, binned in [("scatter", raw_scatter, binned_scatter),
+                                  ("box+hist", raw_box_hist, binned_box_hist)]:
+            b_time, b_size = render(binned(df), args.format)
+            if n <= args.skip_raw_above:
+                r_time, r_size = render(raw(df), args.format)
+                raw_cell = f"{r_time:7.2f} s {r_size / 1e3:6.0f} kB"
+            else:
+                raw_cell = f"{'skipped':>16}"
+            print(f"{n:>10,}  {name:<10} {raw_cell:>18} {b_time:7.2f} s {b_size / 1e3:6.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Wall time of the sharded map/reduce analyses by worker count.
+
+Shards are written once; each run then times only the map and reduce rounds, so
+the numbers show how the per-shard work scales with cores. Results are checked
+against the serial in-memory computation.
+
+    python -m benchmarks.sharded [path/to/merged.csv] [--shard-by state|ccn] [--repeat 3]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from analysis_scripts.geographical import _geographic_stats
+from analysis_scripts.sharded import JobSpec, run_sharded, write_shards
+from analyze_visualize import DATA_PATH, load_data
+
+
+def _quiet(func, *args, **kwargs):
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data", nargs="?", default=DATA_PATH)
+    parser.add_argument("--shard-by", default="state", choices=["state", "ccn"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--shard-dir", default="data/processed/shards_bench")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, *[w for w in (2, 4, 8, 16, 32) if w <= cpus], cpus})
+    n_shards = 4 * cpus
+
+    start = time.perf_counter()
+    df = load_data(args.data)
+    state_stats = _geographic_stats(df)[0]
+    num = df.select_dtypes(include="number").columns
+    filled = df[num].fillna(df[num].median())
+    q1, q3 = filled.quantile(0.25), filled.quantile(0.75)
+    n_outliers = int(((filled < q1 - 1.5 * (q3 - q1)) | (filled > q3 + 1.5 * (q3 - q1))).any(axis=1).sum())
+    print(f"serial in-memory (incl. load):  {time.perf_counter() - start:6.2f} s")
+
+    spec = JobSpec(args.data, shard_by=args.shard_by, n_shards=n_shards, shard_dir=args.shard_dir)
+    start = time.perf_counter()
+    shard_paths, _ = _quiet(write_shards, spec)
+    print(f"write {n_shards} shards by {args.shard_by}:   {time.perf_counter() - start:6.2f} s")
+
+    baseline = None
+    for workers in worker_counts:
+        spec.max_workers = workers
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = _quiet(run_sharded, spec, shard_paths)
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        baseline = baseline or best
+        print(f"map/reduce, {workers:>2} workers:        {best:6.2f} s  ({baseline / best:.1f}x)")
+
+    payment = result['state_stats']['mean_payment']
+    assert np.allclose(payment.loc[state_stats.index], state_stats['mean_payment'])
+    assert result['n_iqr_outliers'] == n_outliers, (result['n_iqr_outliers'], n_outliers)
+    print(f"[INFO] {os.cpu_count()} CPUs; results match the serial path")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,21 +31,26 @@ def parse_medicare_json(filepath):
     with open(filepath, 'r') as f:
         data = json.load(f)
 
+    return clean_medicare_records(medicare_records(data))
+
+def medicare_records(data):
+    """The list of records in a CMS payload (a list, or the API's {"results": [...], ...} wrapper)."""
     if isinstance(data, list):
-        records = data
-    elif isinstance(data, dict):
-        if 'data' in data:
-            records = data['data']
-        else:
-            records = []
-            for value in data.values():
-                if isinstance(value, list):
-                    records.extend(value)
-                elif isinstance(value, dict):
-                    records.append(value)
-    else:
-        records = [data]
+        return data
+    if isinstance(data, dict):
+        for key in ['results', 'data']:
+            if key in data:
+                return data[key]
+        records = []
+        for value in data.values():
+            if isinstance(value, list):
+                records.extend(value)
+            elif isinstance(value, dict):
+                records.append(value)
+        return records
+    return [data]
 
+def clean_medicare_records(records):
     medicare_df = pd.DataFrame(records)
 
     for col in ['payment', 'lower_estimate', 'higher_estimate']:
@@ -1,5 +1,6 @@
 from utils.cms_api import fetch_cms_hospital_data
 from utils.healthgrades_scraper import save_scraped_healthgrades
+from utils.telemetry import Telemetry
 import shutil
 
 def copy_charges_csv(src_path="charges_data.csv", dest_path="data/raw/charges_data.csv"):
@@ -10,7 +11,12 @@ def copy_charges_csv(src_path="charges_data.csv", dest_path="data/raw/charges_da
 
 if __name__ == "__main__":
     print("=== STARTING DATA DOWNLOAD PIPELINE ===")
-    fetch_cms_hospital_data()
-    save_scraped_healthgrades()
-    copy_charges_csv()
+    telemetry = Telemetry("data collection")
+    try:
+        fetch_cms_hospital_data(telemetry=telemetry)
+        save_scraped_healthgrades(telemetry=telemetry)
+        copy_charges_csv()
+    finally:
+        telemetry.print_summary()
+        telemetry.write_summary("data/raw/collection_metrics.json")
     print("=== ALL DATA SOURCES READY ===")
@@ -1,6 +1,15 @@
 import os
 import json
-import pandas as pd
+import argparse
+
+from clean_data import medicare_records, parse_healthgrades_json, parse_medicare_json
+from utils.combine import combine_cms_healthgrades, combine_with_charges
+from utils.schema import DATE_FORMAT, load_csv
+from utils.snapshots import create_snapshot
+from utils.sqlite_store import DEFAULT_DB_PATH, build_sqlite_store
+from analysis_scripts.case_mix import DEFAULT_REFERENCE_PATH, save_drg_reference
+from analysis_scripts.peers import DEFAULT_PEER_INDEX_PATH, build_peer_index
+from analysis_scripts.value_index import DEFAULT_INDEX_PATH, build_value_index, save_value_index
 
 def merge_hospital_data(cms_path, healthgrades_path, output_path="data/processed/combined_hospital_data.csv"):
     print("[INFO] Parsing CMS and Healthgrades datasets...")
@@ -8,53 +17,83 @@ def merge_hospital_data(cms_path, healthgrades_path, output_path="data/processed
     cms_df = parse_medicare_json(cms_path)
     hg_df = parse_healthgrades_json(healthgrades_path)
 
-    hg_df = standardize_state_names(hg_df)
-    cms_df = standardize_state_names(cms_df, state_column='state')
-
-    combined = pd.merge(
-        cms_df,
-        hg_df,
-        how='left',
-        on=['state', 'city']
-    )
+    combined = combine_cms_healthgrades(cms_df, hg_df)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    combined.to_csv(output_path, index=False)
+    combined.to_csv(output_path, index=False, date_format=DATE_FORMAT)
     print(f"[SUCCESS] Combined hospital data saved to {output_path}")
     return combined
 
 def merge_with_charges(combined_df_path, charges_path="data/raw/charges_data.csv", output_path="data/processed/merged_healthcare_data.csv"):
     print("[INFO] Loading combined hospital data and charges...")
 
-    df = pd.read_csv(combined_df_path)
-    charges = pd.read_csv(charges_path, encoding="latin1")
-
-    df = df.rename(columns={
-        'facility_id': 'Rndrng_Prvdr_CCN',
-        'facility_name': 'facility_name_full',
-        'citytown': 'facility_city',
-        'state': 'facility_state',
-        'zip_code': 'facility_zip'
-    })
-
-    df['Rndrng_Prvdr_CCN'] = df['Rndrng_Prvdr_CCN'].astype(str)
-    charges['Rndrng_Prvdr_CCN'] = charges['Rndrng_Prvdr_CCN'].astype(str)
+    df = load_csv(combined_df_path)
+    charges = load_csv(charges_path, encoding="latin1")
 
-    merged = charges.merge(df, on='Rndrng_Prvdr_CCN', how='left', suffixes=('_provider', '_facility'))
-    merged = merged.dropna(axis=1, how='all')
+    merged = combine_with_charges(df, charges)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    merged.to_csv(output_path, index=False)
+    merged.to_csv(output_path, index=False, date_format=DATE_FORMAT)
     print(f"[SUCCESS] Final merged dataset saved to {output_path}")
+    return merged
+
+def write_sqlite_store(combined_df_path, charges_path="data/raw/charges_data.csv", db_path=DEFAULT_DB_PATH):
+    print("[INFO] Building indexed SQLite store...")
+    combined = load_csv(combined_df_path)
+    charges = load_csv(charges_path, encoding="latin1")
+    return build_sqlite_store(combined, charges, db_path=db_path)
+
+
+def snapshot_release(name, released, cms_path, combined_path, merged_path):
+    """Records the raw CMS records and both processed CSVs as snapshot `name` of each dataset."""
+    print(f"[INFO] Recording snapshot {name}...")
+    with open(cms_path) as f:
+        create_snapshot(medicare_records(json.load(f)), 'cms_raw', name, released=released)
+    create_snapshot(combined_path, 'combined', name, released=released)
+    create_snapshot(merged_path, 'merged', name, released=released)
 
 
-def main():
+def main(sqlite_path=None, value_index_path=None, snapshot_name=None, released=None, peer_index_path=None,
+         drg_reference_path=None):
     cms_path = "data/raw/cms_hospital_general.json"
     healthgrades_path = "data/raw/healthgrades_data.json"
     combined_path = "data/processed/combined_hospital_data.csv"
 
+    merged_path = "data/processed/merged_healthcare_data.csv"
+
     merge_hospital_data(cms_path, healthgrades_path, combined_path)
-    merge_with_charges(combined_path)
+    merged = merge_with_charges(combined_path, output_path=merged_path)
+
+    if drg_reference_path:
+        save_drg_reference(merged, drg_reference_path)
+
+    if value_index_path:
+        save_value_index(build_value_index(merged), value_index_path)
+
+    if peer_index_path:
+        build_peer_index(merged.dropna(subset=["rating"])).save(peer_index_path)
+
+    if sqlite_path:
+        write_sqlite_store(combined_path, db_path=sqlite_path)
+
+    if snapshot_name:
+        snapshot_release(snapshot_name, released, cms_path, combined_path, merged_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge CMS, Healthgrades and charges data.")
+    parser.add_argument("--sqlite", nargs="?", const=DEFAULT_DB_PATH, default=None,
+                        help=f"also write the indexed SQLite store (default path: {DEFAULT_DB_PATH})")
+    parser.add_argument("--value-index", nargs="?", const=DEFAULT_INDEX_PATH, default=None,
+                        help=f"also build the top-k value index per DRG and state (default path: {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--drg-reference", nargs="?", const=DEFAULT_REFERENCE_PATH, default=None,
+                        help=f"also store the national per-DRG baselines used for case-mix scoring (default path: {DEFAULT_REFERENCE_PATH})")
+    parser.add_argument("--peer-index", nargs="?", const=DEFAULT_PEER_INDEX_PATH, default=None,
+                        help=f"also build the hospital peer-search index (default path: {DEFAULT_PEER_INDEX_PATH})")
+    parser.add_argument("--snapshot", metavar="NAME", default=None,
+                        help="also record this release in the snapshot store (see utils/snapshots.py)")
+    parser.add_argument("--released", metavar="YYYY-MM-DD", default=None,
+                        help="release date for --snapshot (default: today)")
+    args = parser.parse_args()
+    main(sqlite_path=args.sqlite, value_index_path=args.value_index,
+         snapshot_name=args.snapshot, released=args.released, peer_index_path=args.peer_index,
+         drg_reference_path=args.drg_reference)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_scripts import cache as cache_module
+from analysis_scripts.cache import ResultCache, cached, code_version
+
+
+@pytest.mark.parametrize("copy_on_write", [True, False])
+def test_cached_frames_survive_in_place_edits(monkeypatch, tmp_path, copy_on_write):
+    monkeypatch.setattr(cache_module, "_copy_on_write", lambda: copy_on_write)
+    calls = []
+
+    @cached(cache=ResultCache(disk_dir=str(tmp_path)))
+    def double(df):
+        calls.append(1)
+        return df * 2
+
+    df = pd.DataFrame({'a': [1.0, 2.0]})
+    first = double(df)
+    first.iloc[0, 0] = -1.0
+    first['a'] += 100
+    second = double(df)
+    assert len(calls) == 1
+    assert second['a'].tolist() == [2.0, 4.0]
+
+
+def test_cached_arrays_are_read_only(tmp_path):
+    @cached(cache=ResultCache(disk_dir=None))
+    def ones(n):
+        return np.ones(n)
+
+    ones(3)
+    with pytest.raises(ValueError):
+        ones(3)[0] = 5.0
+
+
+def module_functions(helper_body):
+    """`outer` calling `helper` in a fresh module namespace, as an edit to the module would produce."""
+    namespace = {'__name__': 'fake_module'}
+    exec(f"def helper(x):\n    return {helper_body}\n\ndef outer(x):\n    return helper(x) + 1\n", namespace)
+    return namespace
+
+
+def test_code_version_covers_same_module_helpers():
+    before, after = module_functions("x * 2"), module_functions("x * 3")
+    assert code_version(before['outer']) != code_version(after['outer'])
+    assert code_version(before['outer']) == code_version(module_functions("x * 2")['outer'])
+
+
+def test_code_version_covers_declared_dependencies():
+    before, after = module_functions("x * 2"), module_functions("x * 3")
+
+    def caller(x):
+        return x
+
+    assert code_version(caller, [before['helper']]) != code_version(caller, [after['helper']])
+    assert code_version(caller, [before['helper']]) != code_version(caller)
+    # A cached function's declared dependencies carry over to its callers.
+    wrapped = cached(depends=["analysis_scripts.sampling.effective_n"])(caller)
+    assert code_version(wrapped) == code_version(caller, ["analysis_scripts.sampling.effective_n"])
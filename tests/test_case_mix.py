@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.case_mix import (
+    build_drg_reference,
+    case_mix_normalization,
+    load_or_build_drg_reference,
+    save_drg_reference,
+)
+
+
+def charges(scale=1.0, n=30):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': [f"{i:06d}" for i in range(n)] * 2,
+        'DRG_Cd': ['189'] * n + ['291'] * n,
+        'Tot_Dschrgs': rng.integers(11, 200, 2 * n),
+        'Avg_Tot_Pymt_Amt': scale * rng.lognormal(9, 0.3, 2 * n),
+    })
+
+
+def test_scoring_a_subset_keeps_the_stored_reference(tmp_path):
+    path = str(tmp_path / "drg_reference.csv")
+    full = charges()
+    stored = save_drg_reference(full, path)
+    before = open(path).read()
+
+    # A new batch (or snapshot) is scored against the national baselines, not its own.
+    batch = full.iloc[:10].assign(Avg_Tot_Pymt_Amt=lambda d: 2 * d['Avg_Tot_Pymt_Amt'])
+    scored, _ = case_mix_normalization(batch, reference_path=path)
+    assert open(path).read() == before
+    assert np.allclose(scored['expected_payment'], batch['DRG_Cd'].map(stored['expected_payment']))
+
+    # Only an explicit rebuild replaces them.
+    rebuilt = load_or_build_drg_reference(batch, path, rebuild=True)
+    assert open(path).read() != before
+    pd.testing.assert_series_equal(load_or_build_drg_reference(None, path)['expected_payment'],
+                                   rebuilt['expected_payment'], check_index_type=False)
+
+
+def test_reference_without_a_stored_one_is_not_written(tmp_path):
+    path = str(tmp_path / "drg_reference.csv")
+    sample = charges().iloc[::2].assign(sample_weight=2.0)
+    reference = load_or_build_drg_reference(sample, path, weight_col='sample_weight')
+    assert not os.path.exists(path)
+    assert (reference['total_discharges'] == 2 * sample.groupby('DRG_Cd')['Tot_Dschrgs'].sum()).all()
+
+
+def test_weighted_cutoffs_match_repeated_rows():
+    rows = charges()
+    weights = np.tile([1, 3], len(rows) // 2)
+    weighted = build_drg_reference(rows.assign(w=weights), weight_col='w')
+    repeated = rows.loc[rows.index.repeat(weights)]
+    repeated = repeated.assign(Rndrng_Prvdr_CCN=np.arange(len(repeated)).astype(str))
+    expected = repeated.groupby('DRG_Cd')['Avg_Tot_Pymt_Amt'].quantile([1 / 3, 2 / 3], interpolation='lower').unstack()
+    assert np.allclose(weighted['tier_low_max'], expected[1 / 3])
+    assert np.allclose(weighted['tier_medium_max'], expected[2 / 3])
+    assert np.allclose(weighted['expected_payment'], build_drg_reference(repeated)['expected_payment'])
@@ -0,0 +1,104 @@
+import json
+import sqlite3
+
+import pandas as pd
+
+from clean_data import clean_medicare_records, parse_healthgrades_json
+from utils.combine import combine_cms_healthgrades, combine_with_charges
+from analysis_scripts.value_index import build_value_index, load_value_index, save_value_index
+from utils.cms_sync import sync_cms_data
+from utils.schema import DATE_FORMAT, load_csv
+from utils.sqlite_store import build_sqlite_store
+
+HEALTHGRADES = {"AL": {"cities": {"DOTHAN": {"hospitals": [{"name": "Southeast Health", "rating": "80%"}]}}},
+                "AK": {"cities": {"NOME": {"hospitals": [{"name": "Norton Sound", "rating": "65%"}]}}}}
+
+
+def record(ccn, state, city, measure, payment, start="07/01/2020"):
+    return {
+        'facility_id': ccn, 'facility_name': f"Hospital {ccn}", 'citytown': city, 'city': city,
+        'state': state, 'zip_code': '36301', 'payment_measure_id': measure,
+        'payment_measure_name': measure.replace('_', ' '), 'payment_category': 'No different',
+        'denominator': '120', 'payment': payment, 'lower_estimate': 'Not Available',
+        'higher_estimate': '$30,000', 'start_date': start, 'end_date': '06/30/2023',
+    }
+
+
+RECORDS = [
+    record('010001', 'AL', 'DOTHAN', 'PAYM_30_AMI', '$25,000'),
+    record('010001', 'AL', 'DOTHAN', 'PAYM_30_HF', '$18,000'),
+    record('020002', 'AK', 'NOME', 'PAYM_30_AMI', '$27,500'),
+]
+
+
+def build_release(tmp_path):
+    """The files integrate_data writes, plus a store from build_sqlite_store, without the Healthgrades file."""
+    hg_path = tmp_path / "healthgrades.json"
+    hg_path.write_text(json.dumps(HEALTHGRADES))
+    paths = {'combined_path': str(tmp_path / "combined.csv"), 'merged_path': str(tmp_path / "merged.csv"),
+             'charges_path': str(tmp_path / "charges.csv"), 'db_path': str(tmp_path / "store.db"),
+             'healthgrades_path': str(tmp_path / "missing.json"), 'report_dir': str(tmp_path / "reports"),
+             'value_index_path': str(tmp_path / "value_index.json")}
+
+    combined = combine_cms_healthgrades(clean_medicare_records(RECORDS), parse_healthgrades_json(hg_path))
+    combined.to_csv(paths['combined_path'], index=False, date_format=DATE_FORMAT)
+    charges = pd.DataFrame({'Rndrng_Prvdr_CCN': ['010001', '020002'], 'DRG_Cd': ['189', '189'],
+                            'Tot_Dschrgs': [12, 30], 'Avg_Tot_Pymt_Amt': [9000.0, 8000.0]})
+    charges.to_csv(paths['charges_path'], index=False)
+    combine_with_charges(load_csv(paths['combined_path']), load_csv(paths['charges_path'])) \
+        .to_csv(paths['merged_path'], index=False, date_format=DATE_FORMAT)
+    build_sqlite_store(load_csv(paths['combined_path']), load_csv(paths['charges_path']), paths['db_path'])
+    return paths
+
+
+def test_first_sync_of_unhashed_store_finds_no_changes(tmp_path):
+    paths = build_release(tmp_path)
+    report = sync_cms_data(records=RECORDS, **paths)
+    assert report['counts'] == {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 3}
+    assert report['hashes_backfilled'] == 3
+    with sqlite3.connect(paths['db_path']) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM measures WHERE content_hash IS NULL").fetchone() == (0,)
+
+    # Hashes are stored now; an edited record is detected from its hash alone.
+    edited = RECORDS[:2] + [record('020002', 'AK', 'NOME', 'PAYM_30_AMI', '$28,000')]
+    report = sync_cms_data(records=edited, **paths)
+    assert report['counts'] == {'added': 0, 'changed': 1, 'removed': 0, 'unchanged': 2}
+    assert report['hashes_backfilled'] == 0
+
+
+def test_sync_without_healthgrades_file_keeps_ratings(tmp_path):
+    paths = build_release(tmp_path)
+    edited = [record('010001', 'AL', 'DOTHAN', 'PAYM_30_AMI', '$26,000')] + RECORDS[1:]
+    report = sync_cms_data(records=edited, **paths)
+    assert report['affected_ccns'] == ['010001']
+
+    combined = load_csv(paths['combined_path'])
+    ratings = combined.groupby('facility_id')['rating'].apply(list).to_dict()
+    assert ratings == {'010001': [80.0, 80.0], '020002': [65.0]}
+    assert combined.loc[combined['payment_measure_id'] == 'PAYM_30_AMI', 'payment'].tolist() == [27500.0, 26000.0]
+
+    merged = load_csv(paths['merged_path'])
+    assert sorted(merged['Rndrng_Prvdr_CCN'].unique()) == ['010001', '020002']
+    assert merged['rating'].notna().all()
+
+
+def test_unparseable_dates_are_invalid_not_added(tmp_path):
+    paths = build_release(tmp_path)
+    broken = RECORDS + [record('010001', 'AL', 'DOTHAN', 'PAYM_90_HIP_KNEE', '$20,000', start='2020-07-01')]
+    for _ in range(2):
+        report = sync_cms_data(records=broken, **paths)
+        assert report['invalid_records'] == 1
+        assert report['counts']['added'] == 0
+
+
+def test_sync_updates_stored_value_index(tmp_path):
+    paths = build_release(tmp_path)
+    index = build_value_index(load_csv(paths['merged_path']), k=1)
+    index['groups']['189|*']['top'][0]['value_score'] = 0.0
+    save_value_index(index, paths['value_index_path'])
+
+    edited = [record('010001', 'AL', 'DOTHAN', 'PAYM_30_AMI', '$26,000')] + RECORDS[1:]
+    report = sync_cms_data(records=edited, **paths)
+    assert report['value_index'] == {'path': paths['value_index_path'], 'stale_groups': 0}
+    # The rebuilt rows of 010001 replaced its entry in the stored index.
+    assert load_value_index(paths['value_index_path'])['groups']['189|*']['top'][0]['value_score'] > 0
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_scripts.fixed_effects import absorb_ols, drop_singletons, fixed_effect_rank, group_codes
+
+Y, X = "Avg_Tot_Pymt_Amt", ["rating"]
+
+
+def disconnected_rows(n=400, seed=0):
+    """Two blocks of states that share no DRG, plus one singleton DRG."""
+    rng = np.random.default_rng(seed)
+    block = rng.integers(0, 2, n)
+    state = 3 * block + rng.integers(0, 3, n)
+    drg = 10 * block + rng.integers(0, 8, n)
+    ccn = 100 * state + rng.integers(0, 15, n)
+    rating = rng.uniform(40, 95, n)
+    payment = 9000 + 50 * drg + 200 * state + 20 * rating + rng.normal(0, 500, n)
+    df = pd.DataFrame({Y: payment, 'rating': rating, 'facility_state': state, 'DRG_Cd': drg,
+                       'Rndrng_Prvdr_CCN': ccn})
+    singleton = pd.DataFrame({Y: [20_000.0], 'rating': [70.0], 'facility_state': [0], 'DRG_Cd': [99],
+                              'Rndrng_Prvdr_CCN': [0]})
+    return pd.concat([df, singleton], ignore_index=True)
+
+
+def test_rank_counts_connected_components():
+    df = disconnected_rows()
+    codes = [group_codes(df, c) for c in ['facility_state', 'DRG_Cd']]
+    # 6 states + 17 DRGs, 2 components (the singleton DRG hangs off block 0).
+    assert fixed_effect_rank(codes) == 6 + 17 - 2
+
+
+@pytest.mark.parametrize("cluster", [None, "Rndrng_Prvdr_CCN"])
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_matches_dummy_model_without_singletons(cluster):
+    smf = pytest.importorskip("statsmodels.formula.api")
+    df = disconnected_rows()
+    table, info = absorb_ols(df, Y, X, cluster=cluster)
+    assert info['n_singletons'] == 1
+
+    rows = df.iloc[:-1].astype({'facility_state': str, 'DRG_Cd': str})
+    model = smf.ols(f"{Y} ~ rating + C(facility_state) + C(DRG_Cd)", rows)
+    if cluster:
+        fit = model.fit(cov_type="cluster", cov_kwds={"groups": rows[cluster].factorize()[0]})
+        # statsmodels' CR1 factor counts every dummy column, redundant ones included.
+        n = len(rows)
+        expected_se = fit.bse[X] * np.sqrt((n - len(fit.params)) / fit.df_resid)
+    else:
+        fit = model.fit()
+        expected_se = fit.bse[X]
+    assert info['df_resid'] == fit.df_resid
+    assert np.allclose(table['coef'], fit.params[X], rtol=1e-8)
+    assert np.allclose(table['std_err'], expected_se, rtol=1e-6)
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_fixed_effect_nested_in_clusters_is_not_counted():
+    smf = pytest.importorskip("statsmodels.formula.api")
+    df = disconnected_rows().iloc[:-1]
+    table, info = absorb_ols(df, Y, X, absorb=['DRG_Cd', 'Rndrng_Prvdr_CCN'], cluster='Rndrng_Prvdr_CCN')
+
+    rows = drop_singletons(df, ['DRG_Cd', 'Rndrng_Prvdr_CCN'])[0].astype({'DRG_Cd': str, 'Rndrng_Prvdr_CCN': str})
+    fit = smf.ols(f"{Y} ~ rating + C(DRG_Cd) + C(Rndrng_Prvdr_CCN)", rows).fit(
+        cov_type="cluster", cov_kwds={"groups": rows['Rndrng_Prvdr_CCN'].factorize()[0]})
+    # Each CCN is its own cluster, so only the intercept, rating and DRG levels count in K.
+    n, k = len(rows), 1 + len(X) + rows['DRG_Cd'].nunique() - 1
+    assert info['df_resid'] == fit.df_resid
+    assert np.allclose(table['std_err'], fit.bse[X] * np.sqrt((n - len(fit.params)) / (n - k)), rtol=1e-6)
+
+
+def test_no_residual_degrees_of_freedom_raises():
+    df = disconnected_rows().drop_duplicates(['Rndrng_Prvdr_CCN', 'DRG_Cd'])
+    with pytest.raises(ValueError, match="degrees of freedom"):
+        absorb_ols(df, Y, X, absorb=[('Rndrng_Prvdr_CCN', 'DRG_Cd')], cluster='Rndrng_Prvdr_CCN')
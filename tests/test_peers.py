@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.peers import FEATURES, INFO_COLS, PeerIndex, brute_force_knn, build_peer_index, find_peers
+
+
+def features(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n, 3)) @ rng.normal(size=(3, len(FEATURES)))
+    frame = pd.DataFrame(values, columns=FEATURES, index=[f"{i:06d}" for i in range(n)])
+    for col in INFO_COLS:
+        frame[col] = ""
+    return frame
+
+
+def merged_rows(n=30):
+    rng = np.random.default_rng(1)
+    ccns = [10001 + i for i in range(n)]   # CCNs read back as integers
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': ccns * 2,
+        'DRG_Cd': ['189'] * n + ['291'] * n,
+        'Tot_Dschrgs': rng.integers(11, 200, 2 * n),
+        'Avg_Tot_Pymt_Amt': rng.lognormal(9, 0.3, 2 * n),
+        'Avg_Mdcr_Pymt_Amt': rng.lognormal(8.8, 0.3, 2 * n),
+        'Avg_Submtd_Cvrd_Chrg': rng.lognormal(10, 0.3, 2 * n),
+        'Rndrng_Prvdr_RUCA': rng.integers(1, 10, 2 * n).astype(float),
+        'Rndrng_Prvdr_Org_Name': [f"Hospital {i}" for i in range(n)] * 2,
+        'facility_state': 'AL',
+        'facility_city': 'DOTHAN',
+        'rating': rng.uniform(1, 5, 2 * n),
+    })
+
+
+def test_replaced_hospitals_match_brute_force():
+    base = features()
+    index = PeerIndex(base, rebuild_fraction=np.inf)
+    # Move the 200 hospitals nearest to one of them elsewhere, leaving a cluster of dead tree
+    # entries, so queries around it come back short and have to be repeated.
+    _, cluster = brute_force_knn(index.points, index.points[:1], 200)
+    replaced = base.iloc[cluster[0]].copy()
+    replaced[FEATURES] = base[FEATURES].sample(200, random_state=2).to_numpy()
+    index.insert(replaced)
+    assert index.n_pending == 200 and int(index.alive.sum()) == len(base)
+
+    alive = np.flatnonzero(index.alive)
+    distances, positions = index.query_points(index.points[alive], 10, exclude=alive)
+    assert index.alive[positions].all()
+    expected, _ = brute_force_knn(index.points[alive], index.points[alive], 11)
+    assert np.allclose(distances, expected[:, 1:], atol=1e-6)
+
+
+def test_find_peers_normalizes_ccns():
+    index = build_peer_index(merged_rows())
+    assert '010001' in index.position
+    peers = find_peers(index, "010001", k=5)
+    assert len(peers) == 5 and (peers['ccn'] == '010001').all()
+    assert find_peers(index, 10001, k=5)['peer_ccn'].equals(peers['peer_ccn'])
@@ -0,0 +1,72 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.cost_vs_rating import cost_rating_correlation
+from analysis_scripts.plotting import binned_means, box_stats, density_scatter, grouped_box_stats
+
+
+def pairs(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 100, n)
+    return x, 0.02 * x + rng.normal(0, 1, n), rng.integers(1, 5, n)
+
+
+def test_weighted_binned_means_match_repeated_rows():
+    x, y, w = pairs()
+    weighted = binned_means(x, y, bins=10, weights=w)
+    repeated = binned_means(np.repeat(x, w), np.repeat(y, w), bins=10)
+    assert np.allclose(weighted['mean'], repeated['mean'])
+    assert weighted['count'].sum() == len(x)
+
+
+def test_weighted_density_scatter_sums_weights():
+    x, y, w = pairs()
+    fig, ax = plt.subplots()
+    assert density_scatter(ax, x, y, bins=5, max_points=100, weights=w)
+    assert np.isclose(ax.collections[0].get_array().sum(), w.sum())
+    plt.close(fig)
+
+
+def test_cost_rating_plot_closes_its_figure():
+    x, y, w = pairs()
+    df = pd.DataFrame({'Avg_Tot_Pymt_Amt': x, 'rating': y, 'weight': w})
+    before = len(plt.get_fignums())
+    cost_rating_correlation(df, weight_col='weight')
+    assert len(plt.get_fignums()) == before
+
+
+def test_weighted_box_stats_match_repeated_rows():
+    x, _, w = pairs()
+    weighted = box_stats(x, weights=w)
+    repeated = np.repeat(x, w)
+    assert np.allclose([weighted['q1'], weighted['med'], weighted['q3']],
+                       np.quantile(repeated, [0.25, 0.5, 0.75], method='inverted_cdf'))
+    assert np.isclose(weighted['mean'], repeated.mean())
+
+
+def test_grouped_box_stats_use_the_weight_column():
+    x, _, w = pairs()
+    df = pd.DataFrame({'value': x, 'group': np.where(x < 50, 'low', 'high'), 'weight': w})
+    stats = grouped_box_stats(df, 'value', 'group', weight_col='weight')
+    for s in stats:
+        rows = df[df['group'] == s['label']]
+        assert np.isclose(s['mean'], np.average(rows['value'], weights=rows['weight']))
+
+
+def test_pca_scatter_is_binned_for_large_data(monkeypatch):
+    from matplotlib.collections import QuadMesh
+
+    from analysis_scripts.multivariate_dim_red import multivariate_dimensionality_reduction
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(25_000, 3)), columns=['a', 'b', 'c'])
+    shown = []
+    monkeypatch.setattr(plt, "show", lambda: shown.append(plt.gcf()))
+    before = len(plt.get_fignums())
+    multivariate_dimensionality_reduction(df)
+    assert len(plt.get_fignums()) == before
+    assert len(shown) == 3
+    for fig in shown[1:]:
+        assert any(isinstance(c, QuadMesh) for c in fig.axes[0].collections)
+        assert all(len(c.get_offsets()) <= 3 for c in fig.axes[0].collections if not isinstance(c, QuadMesh))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from analysis_scripts import cache as cache_module
+from analysis_scripts.cache import ResultCache
+from analysis_scripts.sampling import (
+    cached_sample,
+    stratified_sample,
+    weighted_cost_rating_stats,
+    weighted_describe,
+    weighted_ranks,
+)
+
+
+def pairs(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.integers(0, 50, n).astype(float)
+    return x, 0.3 * x + rng.normal(0, 5, n), rng.integers(1, 4, n)
+
+
+def test_weighted_stats_match_repeated_rows():
+    x, y, w = pairs()
+    pearson_r, _, spearman_rho, _, slope, intercept = weighted_cost_rating_stats(x, y, w)
+    xr, yr = np.repeat(x, w), np.repeat(y, w)
+    assert np.isclose(pearson_r, stats.pearsonr(xr, yr)[0])
+    assert np.isclose(spearman_rho, stats.spearmanr(xr, yr)[0])
+    assert np.allclose([slope, intercept], np.polyfit(xr, yr, 1))
+
+
+def test_unit_weights_reduce_to_unweighted():
+    x, y, _ = pairs()
+    pearson_r, _, spearman_rho, _, slope, _ = weighted_cost_rating_stats(x, y, np.ones(len(x)))
+    assert np.isclose(pearson_r, stats.pearsonr(x, y)[0])
+    assert np.isclose(spearman_rho, stats.spearmanr(x, y)[0])
+    assert np.allclose(weighted_ranks(x, np.ones(len(x))), stats.rankdata(x))
+
+
+def test_weighted_describe_matches_repeated_rows():
+    x, _, w = pairs(n=301)
+    desc = weighted_describe(pd.DataFrame({'x': x}), pd.Series(w)).loc['x']
+    repeated = pd.Series(np.repeat(x, w))
+    assert desc['count'] == len(x)
+    assert np.isclose(desc['mean'], repeated.mean())
+    assert desc['50%'] == repeated.quantile(0.5, interpolation='lower')
+
+
+def test_sample_weights_sum_to_stratum_sizes():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'facility_state': rng.choice(['AL', 'AK', 'NY'], 5000, p=[0.7, 0.2, 0.1]),
+                       'DRG_Cd': rng.choice(['189', '291'], 5000)})
+    sample = stratified_sample(df, fraction=0.1, seed=1)
+    totals = sample.groupby(['facility_state', 'DRG_Cd'])['sample_weight'].sum()
+    assert np.allclose(totals, df.groupby(['facility_state', 'DRG_Cd']).size())
+
+
+@pytest.mark.parametrize("copy_on_write", [True, False])
+def test_cached_sample_survives_in_place_edits(monkeypatch, tmp_path, copy_on_write):
+    monkeypatch.setattr(cache_module, "_copy_on_write", lambda: copy_on_write)
+    df = pd.DataFrame({'facility_state': ['AL', 'AK'] * 50, 'DRG_Cd': '189', 'x': np.arange(100.0)})
+    cache = ResultCache(disk_dir=str(tmp_path))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return df
+
+    first = cached_sample("source", load, fraction=0.5, cache=cache)
+    expected = first['x'].tolist()
+    first.iloc[0, first.columns.get_loc('x')] = -1.0
+    first['x'] += 100
+    second = cached_sample("source", load, fraction=0.5, cache=cache)
+    assert len(loads) == 1
+    assert second['x'].tolist() == expected
+    second['x'] += 100
+    assert cached_sample("source", load, fraction=0.5, cache=cache)['x'].tolist() == expected
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from utils.schema import HAVE_PYARROW, iter_csv_chunks, load_csv
+
+CSV = """Rndrng_Prvdr_CCN,Rndrng_Prvdr_Zip5,DRG_Cd,Rndrng_Prvdr_State_FIPS,Tot_Dschrgs,rating,start_date,notes
+010001,03601,001,01,12,70,07/01/2020,
+010002,03602,189,02,,Not Available,07/01/2021,
+"""
+
+ENGINES = ["c", "pyarrow"] if HAVE_PYARROW else ["c"]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "leading_zeros.csv"
+    path.write_text(CSV)
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_text_columns_keep_leading_zeros(csv_path, engine):
+    df = load_csv(csv_path, engine=engine)
+    assert list(df['Rndrng_Prvdr_CCN']) == ['010001', '010002']
+    assert list(df['Rndrng_Prvdr_Zip5']) == ['03601', '03602']
+    assert list(df['DRG_Cd'].cat.categories) == ['001', '189']
+    assert list(df['Rndrng_Prvdr_State_FIPS'].cat.categories) == ['01', '02']
+    assert df['rating'].isna().tolist() == [False, True]
+    assert df['start_date'].dt.year.tolist() == [2020, 2021]
+
+
+def test_loaders_agree_on_dtypes_and_values(csv_path):
+    frames = [load_csv(csv_path, engine=engine) for engine in ENGINES]
+    frames.append(next(iter_csv_chunks(csv_path)))
+    for other in frames[1:]:
+        pd.testing.assert_frame_equal(frames[0], other)
+    # Smaller chunks carry only their own categories, but of the same (text) type.
+    for chunk in iter_csv_chunks(csv_path, chunksize=1):
+        assert chunk['DRG_Cd'].cat.categories.dtype == frames[0]['DRG_Cd'].cat.categories.dtype
+
+
+def test_usecols_and_encoding(tmp_path):
+    path = tmp_path / "latin1.csv"
+    path.write_bytes("Rndrng_Prvdr_CCN,Rndrng_Prvdr_Org_Name,Tot_Dschrgs\n050001,Señora,3\n".encode("latin1"))
+    df = load_csv(str(path), usecols=['Rndrng_Prvdr_CCN', 'Rndrng_Prvdr_Org_Name'], encoding="latin1")
+    assert list(df.columns) == ['Rndrng_Prvdr_CCN', 'Rndrng_Prvdr_Org_Name']
+    assert df.iloc[0].tolist() == ['050001', 'Señora']
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_scripts.sharded import JobSpec, run_sharded, write_shards
+
+
+@pytest.fixture(scope="module")
+def merged_csv(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n = 3000
+    states = rng.choice(['AL', 'AK', 'AZ', 'CA', 'NY'], n)
+    df = pd.DataFrame({
+        'Rndrng_Prvdr_CCN': [f"{i:06d}" for i in rng.integers(10000, 10400, n)],
+        'facility_state': states,
+        'facility_city': rng.choice(['A', 'B', 'C', 'D'], n),
+        'Rndrng_Prvdr_RUCA_Desc': rng.choice(['Metropolitan', 'Rural'], n),
+        'Avg_Submtd_Cvrd_Chrg': rng.lognormal(10, 0.5, n),
+        'Avg_Tot_Pymt_Amt': rng.lognormal(9, 0.4, n),
+        'rating': rng.uniform(40, 95, n),
+    })
+    path = tmp_path_factory.mktemp("sharded") / "merged.csv"
+    df.to_csv(path, index=False)
+    return str(path), df
+
+
+def spec(path, tmp_path, **kwargs):
+    return JobSpec(source=path, shard_dir=str(tmp_path / "shards"), max_workers=2, chunksize=500, **kwargs)
+
+
+def test_write_shards_returns_paths_and_numeric_columns(merged_csv, tmp_path):
+    shard_paths, numeric_cols = write_shards(spec(merged_csv[0], tmp_path))
+    assert len(shard_paths) == 2
+    assert numeric_cols == ['Avg_Submtd_Cvrd_Chrg', 'Avg_Tot_Pymt_Amt', 'rating']
+
+
+@pytest.mark.parametrize("executor", ["serial", "processes", "dask"])
+def test_executors_match_pandas(merged_csv, tmp_path, executor):
+    if executor == "dask":
+        pytest.importorskip("dask.distributed")
+    path, df = merged_csv
+    results = run_sharded(spec(path, tmp_path, executor=executor))
+    expected = df.groupby('facility_state')[['Avg_Tot_Pymt_Amt', 'rating']].mean()
+    state_stats = results['state_stats'].sort_index()
+    assert np.allclose(state_stats['mean_payment'], expected['Avg_Tot_Pymt_Amt'])
+    assert np.allclose(state_stats['mean_rating'], expected['rating'])
+    q1, q3 = df['Avg_Tot_Pymt_Amt'].quantile([0.25, 0.75])
+    assert np.isclose(results['iqr_fences'].loc['Avg_Tot_Pymt_Amt', 'q1'], q1)
+    assert np.isclose(results['iqr_fences'].loc['Avg_Tot_Pymt_Amt', 'q3'], q3)
+
+
+@pytest.mark.parametrize("flags", [
+    ["--sharded", "--snapshot", "2025Q3"],
+    ["--sharded", "--as-of", "2025-06-30"],
+    ["--sharded", "--sample", "0.1"],
+    ["--streaming", "--sample-rows", "1000"],
+    ["--sharded", "--streaming"],
+])
+def test_unsupported_mode_combinations_are_rejected(flags, capsys):
+    from analyze_visualize import main
+
+    with pytest.raises(SystemExit) as exc:
+        main(flags)
+    assert exc.value.code == 2
+    err = capsys.readouterr().err
+    assert "can't be combined" in err or "pick one" in err
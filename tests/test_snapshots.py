@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_data import medicare_records
+from utils import snapshots
+from utils.snapshots import create_snapshot, diff_snapshots, read_snapshot
+
+
+def cms_payload(n=5):
+    results = [{'facility_id': f"{i:06d}", 'payment_measure_id': 'PAYM_30_AMI',
+                'start_date': '07/01/2020', 'end_date': '06/30/2023', 'payment': str(20000 + i)}
+               for i in range(n)]
+    return {'results': results, 'count': n, 'schema': {'fields': []}, 'query': {'limit': n}}
+
+
+def merged(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': [f"{i:06d}" for i in range(n)],
+        'DRG_Cd': pd.Categorical(rng.choice(['189', '291'], n)),
+        'Avg_Tot_Pymt_Amt': rng.lognormal(9, 0.3, n),
+        'start_date': pd.to_datetime('2020-07-01'),
+        'lower_estimate': np.nan,
+        'notes': np.nan,
+    })
+
+
+def test_raw_cms_payload_is_snapshotted_as_records(tmp_path):
+    payload = cms_payload()
+    with pytest.raises(TypeError):
+        create_snapshot(payload, 'cms_raw', 'whole', root=str(tmp_path))
+
+    create_snapshot(medicare_records(payload), 'cms_raw', 'r1', root=str(tmp_path))
+    assert read_snapshot('cms_raw', 'r1', root=str(tmp_path)) == payload['results']
+
+
+def test_csv_round_trip_keeps_types(tmp_path):
+    df = merged()
+    path = tmp_path / "merged.csv"
+    df.to_csv(path, index=False, date_format="%m/%d/%Y")
+    create_snapshot(str(path), 'merged', 'r1', root=str(tmp_path))
+
+    back = read_snapshot('merged', 'r1', root=str(tmp_path))
+    for col in ['lower_estimate', 'notes']:
+        assert back[col].dtype == 'float64' and back[col].isna().all()
+    assert back['Rndrng_Prvdr_CCN'].iloc[0] == '000000'
+    assert pd.api.types.is_datetime64_any_dtype(back['start_date'])
+    assert np.allclose(back['Avg_Tot_Pymt_Amt'], df.sort_values(['Rndrng_Prvdr_CCN', 'DRG_Cd'])['Avg_Tot_Pymt_Amt'])
+
+
+def test_diff_reads_only_changed_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, 'MIN_BLOCK_ROWS', 8)
+    monkeypatch.setattr(snapshots, 'AVG_BLOCK_ROWS', 32)
+    old = merged()
+    new = old.copy()
+    new.loc[10, 'Avg_Tot_Pymt_Amt'] += 1.0
+    new = pd.concat([new.drop(index=20), merged(1, seed=1).assign(Rndrng_Prvdr_CCN='999999')])
+    create_snapshot(old, 'merged', 'old', root=str(tmp_path))
+    create_snapshot(new, 'merged', 'new', root=str(tmp_path))
+
+    result = diff_snapshots('merged', 'old', 'new', root=str(tmp_path))
+    assert result['changed']['Rndrng_Prvdr_CCN'].tolist() == ['000010']
+    assert result['removed']['Rndrng_Prvdr_CCN'].tolist() == ['000020']
+    assert result['added']['Rndrng_Prvdr_CCN'].tolist() == ['999999']
+    assert result['shared_blocks'] > 10 * result['read_blocks']
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pandas as pd
+
+from utils.sqlite_store import build_sqlite_store, normalize_ccn
+
+
+def combined_frame():
+    return pd.DataFrame({
+        'facility_id': ['010001', '10001', '020002'],
+        'facility_name': ['A', 'A', 'B'],
+        'state': ['AL', 'AL', 'AK'],
+        'city': ['DOTHAN', 'DOTHAN', 'NOME'],
+        'zip_code': ['36301', '36301', '99762'],
+        'payment_measure_id': ['PAYM_30_AMI', 'PAYM_30_HF', 'PAYM_30_AMI'],
+        'start_date': ['07/01/2020', '07/01/2020', '07/01/2020'],
+        'end_date': ['06/30/2023', '06/30/2023', '06/30/2023'],
+        'payment': ['25000', '18000', '27000'],
+        'rating': [80.0, 60.0, None],
+    })
+
+
+def charges_frame():
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': [10001, 20002],
+        'DRG_Cd': ['189', '189'],
+        'Tot_Dschrgs': [12, 30],
+        'Avg_Tot_Pymt_Amt': [9000.0, 8000.0],
+    })
+
+
+def test_normalize_ccn_restores_leading_zeros():
+    assert list(normalize_ccn(pd.Series([10001, '10001.0', ' 020002', '450001']))) == \
+        ['010001', '010001', '020002', '450001']
+
+
+def test_build_sqlite_store_keys_and_ratings(tmp_path):
+    db_path = str(tmp_path / "store.db")
+    counts = build_sqlite_store(combined_frame(), charges_frame(), db_path)
+    assert counts == {'hospitals': 2, 'measures': 3, 'charges': 2}
+
+    with sqlite3.connect(db_path) as conn:
+        hospitals = dict(conn.execute("SELECT ccn, rating FROM hospitals").fetchall())
+        charge_ccns = {row[0] for row in conn.execute("SELECT ccn FROM charges")}
+        dates = set(conn.execute("SELECT start_date, end_date FROM measures").fetchall())
+    # Both spellings of the same CCN collapse to one hospital with the mean rating.
+    assert hospitals == {'010001': 70.0, '020002': None}
+    assert charge_ccns == {'010001', '020002'}
+    assert dates == {('2020-07-01', '2023-06-30')}
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.streaming import accumulate
+
+
+def merged(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Avg_Tot_Pymt_Amt': rng.lognormal(9, 0.5, n),
+        'Avg_Submtd_Cvrd_Chrg': rng.lognormal(10, 0.7, n),
+        'rating': rng.uniform(40, 95, n),
+        'facility_state': rng.choice(['AL', 'AK', 'AZ', 'CA'], n),
+        'facility_city': rng.choice(['A', 'B', 'C'], n),
+    })
+    df['Avg_Tot_Pymt_Amt'] += 2_000 * (df['rating'] > 70)
+    df.loc[rng.choice(n, n // 20, replace=False), 'rating'] = np.nan
+    return df
+
+
+def split_and_merge(df):
+    """Two halves accumulated in chunks separately, then merged, as accumulate_partitions does."""
+    half = len(df) // 2
+    left = accumulate(df.iloc[:half], chunksize=3_000)
+    right = accumulate(df.iloc[half:], chunksize=4_000)
+    return left.merge(right)
+
+
+def test_merged_moments_and_correlations_match_pandas():
+    df = merged()
+    numeric = df.select_dtypes('number')
+    stats = split_and_merge(df)
+
+    desc = stats.describe()
+    expected = numeric.describe().transpose()
+    assert list(desc.columns) == list(expected.columns)
+    for col in ['count', 'mean', 'std', 'min', 'max']:
+        assert np.allclose(desc[col], expected[col], rtol=1e-10)
+    assert np.allclose(stats.comoments.corr(), numeric.corr(), atol=1e-12)
+
+
+def test_merged_quartiles_are_close_in_rank():
+    df = merged()
+    desc = split_and_merge(df).describe()
+    for col in desc.index:
+        values = np.sort(df[col].dropna().to_numpy())
+        for label, q in [('25%', 0.25), ('50%', 0.5), ('75%', 0.75)]:
+            rank = np.searchsorted(values, desc.loc[col, label]) / len(values)
+            assert abs(rank - q) < 0.005, (col, label, rank)
+
+
+def test_merged_group_means_and_counts_match_pandas():
+    df = merged()
+    stats = split_and_merge(df)
+    expected = df.groupby('facility_state')[['Avg_Tot_Pymt_Amt', 'rating']].mean()
+    means = stats.group_means['facility_state'].means().loc[expected.index]
+    assert np.allclose(means, expected, rtol=1e-12)
+    assert stats.heavy_hitters['facility_city'].top(3).to_dict() == df['facility_city'].value_counts().to_dict()
@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from utils import telemetry as telemetry_module
+from utils.telemetry import LatencyHistogram, Telemetry, get_with_retry
+
+
+class Response:
+    def __init__(self, status_code=200, content=b"ok", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class Session:
+    """Hands out the queued responses (or raises the queued exceptions) in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(telemetry_module.time, "sleep", delays.append)
+    return delays
+
+
+def stage_summary(telemetry, stage="http"):
+    return telemetry.summary()['stages'][stage]
+
+
+def test_retried_connection_error_counts_once_as_a_retry(sleeps):
+    telemetry = Telemetry("test", progress=False)
+    session = Session(requests.ConnectionError(), Response())
+    assert get_with_retry("u", telemetry, session=session, backoff=0.5).status_code == 200
+
+    s = stage_summary(telemetry)
+    assert s['requests'] == 2
+    assert s['retries'] == {'ConnectionError': 1}
+    assert s['errors'] == {}
+    assert sleeps == [0.5]
+
+
+def test_final_failure_counts_as_an_error(sleeps):
+    telemetry = Telemetry("test", progress=False)
+    session = Session(*[requests.Timeout() for _ in range(3)])
+    with pytest.raises(requests.Timeout):
+        get_with_retry("u", telemetry, session=session, retries=2, backoff=1.0)
+
+    s = stage_summary(telemetry)
+    assert s['retries'] == {'Timeout': 2}
+    assert s['errors'] == {'Timeout': 1}
+    assert sleeps == [1.0, 2.0]
+
+
+def test_retry_after_is_honoured_and_final_status_is_an_error(sleeps):
+    telemetry = Telemetry("test", progress=False)
+    session = Session(Response(429, headers={"Retry-After": "7"}), Response(503), Response(503))
+    response = get_with_retry("u", telemetry, session=session, retries=2, backoff=1.0)
+
+    assert response.status_code == 503
+    s = stage_summary(telemetry)
+    assert s['retries'] == {'HTTP 429': 1, 'HTTP 503': 1}
+    assert s['errors'] == {'HTTP 503': 1}
+    # Retry-After for the 429, then exponential backoff for the second attempt.
+    assert sleeps == [7.0, 2.0]
+
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram()
+    for seconds in [0.0005, 0.0015, 0.003, 0.003, 100.0]:
+        histogram.add(seconds)
+    summary = histogram.summary()
+    assert summary['buckets'] == {'0-1ms': 1, '1-2ms': 1, '2-4ms': 2, '32768-infms': 1}
+    assert summary['count'] == 5 and summary['max_s'] == 100.0
+    assert summary['p50_s'] == 0.004
+    assert summary['p99_s'] == 100.0
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from analysis_scripts.value_index import build_value_index, lookup_value_index, update_value_index, value_scores
+
+
+def merged_rows():
+    # 010001 matched two Healthgrades hospitals in its city; 030003 has no state.
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': ['010001', '010001', '010001', '020002', '030003'],
+        'DRG_Cd': ['189', '189', '189', '189', '189'],
+        'facility_state': ['AL', 'AL', 'AL', 'AL', None],
+        'Avg_Tot_Pymt_Amt': [10_000.0, 10_000.0, 10_000.0, 8_000.0, 5_000.0],
+        'rating': [90.0, 60.0, 90.0, 40.0, 99.0],
+    })
+
+
+def test_duplicate_ratings_are_averaged_per_ccn_and_drg():
+    scores = value_scores(merged_rows()).set_index('Rndrng_Prvdr_CCN')
+    assert scores.loc['010001', 'rating'] == 80.0
+    assert scores.loc['010001', 'value_score'] == 8.0
+    assert '030003' not in scores.index
+
+
+def test_national_count_matches_rankable_rows():
+    index = build_value_index(merged_rows(), k=5)
+    assert index['groups']['189|*']['n'] == index['groups']['189|AL']['n'] == 2
+    assert lookup_value_index(index, '189')['Rndrng_Prvdr_CCN'].tolist() == ['010001', '020002']
+
+
+def ranked_rows():
+    return pd.DataFrame({
+        'Rndrng_Prvdr_CCN': [f"0{i}0001" for i in range(1, 6)],
+        'DRG_Cd': '189',
+        'facility_state': 'AL',
+        'Avg_Tot_Pymt_Amt': 10_000.0,
+        'rating': [50.0, 60.0, 70.0, 80.0, 90.0],
+    })
+
+
+def test_update_moves_an_improved_hospital_into_the_top_k():
+    index = build_value_index(ranked_rows(), k=2)
+    update_value_index(index, ranked_rows().iloc[[2]].assign(rating=95.0))
+    group = index['groups']['189|AL']
+    assert [e['Rndrng_Prvdr_CCN'] for e in group['top']] == ['030001', '050001']
+    assert [e['Rndrng_Prvdr_CCN'] for e in group['bottom']] == ['010001', '020001']
+    assert not group['stale']
+    # 030001 wasn't listed, so it may be new to the group: `n` stays an upper bound.
+    assert group['n'] == 6
+
+
+def test_update_marks_a_worsened_listed_hospital_stale():
+    index = build_value_index(ranked_rows(), k=2)
+    update_value_index(index, ranked_rows().iloc[[4]].assign(rating=75.0))
+    assert index['groups']['189|AL']['stale'] and index['groups']['189|*']['stale']
+
+
+def test_update_counts_new_hospitals():
+    index = build_value_index(ranked_rows(), k=2)
+    new = pd.DataFrame({'Rndrng_Prvdr_CCN': ['060001'], 'DRG_Cd': ['189'], 'facility_state': ['AL'],
+                        'Avg_Tot_Pymt_Amt': [10_000.0], 'rating': [65.0]})
+    update_value_index(index, new)
+    assert index['groups']['189|AL']['n'] == index['groups']['189|*']['n'] == 6
+    assert lookup_value_index(index, '189', 'AL')['Rndrng_Prvdr_CCN'].tolist() == ['050001', '040001']
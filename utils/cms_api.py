@@ -1,20 +1,49 @@
-import requests
 import json
 import os
 
-def fetch_cms_hospital_data(output_path="data/raw/cms_hospital_general.json"):
-    DATASET_ID = "c7us-v4mf"
-    DATA_URL = f"https://data.cms.gov/provider-data/api/1/datastore/query/{DATASET_ID}/0"
+from utils.telemetry import Telemetry, get_with_retry
 
+DATASET_ID = "c7us-v4mf"
+DATA_URL = f"https://data.cms.gov/provider-data/api/1/datastore/query/{DATASET_ID}/0"
+METADATA_URL = f"https://data.cms.gov/provider-data/api/1/metastore/schemas/dataset/items/{DATASET_ID}"
+
+def fetch_cms_hospital_data(output_path="data/raw/cms_hospital_general.json", telemetry=None):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    telemetry = telemetry or Telemetry("cms")
 
     print("[INFO] Fetching CMS Hospital General Information dataset...")
-    response = requests.get(DATA_URL)
+    response = get_with_retry(DATA_URL, telemetry, stage="cms_data")
 
     if response.status_code == 200:
         data = response.json()
+        telemetry.count("cms_data", "records", len(data.get("results", [])))
         with open(output_path, "w") as f:
             json.dump(data, f, indent=2)
         print(f"[SUCCESS] Data saved to {output_path}")
     else:
         raise RuntimeError(f"Failed to fetch CMS data. Status: {response.status_code}")
+
+def fetch_cms_dataset_modified(telemetry=None):
+    """Returns the dataset's `modified` stamp from the CMS metastore (None if unavailable)."""
+    response = get_with_retry(METADATA_URL, telemetry, stage="cms_metadata")
+    if response.status_code != 200:
+        return None
+    return response.json().get("modified")
+
+def iter_cms_records(page_size=2000, telemetry=None):
+    """Yields raw (unparsed) records from every page of the CMS datastore query."""
+    telemetry = telemetry or Telemetry("cms")
+    offset = 0
+    while True:
+        response = get_with_retry(DATA_URL, telemetry, stage="cms_page",
+                                  params={"limit": page_size, "offset": offset, "count": "true"})
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch CMS data at offset {offset}. Status: {response.status_code}")
+        payload = response.json()
+        records = payload.get("results", [])
+        telemetry.count("cms_page", "records", len(records))
+        yield from records
+
+        offset += len(records)
+        if not records or offset >= payload.get("count", offset):
+            break
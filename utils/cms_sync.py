@@ -0,0 +1,320 @@
+"""
+Incremental sync of the CMS payment/value-of-care measures into the processed store.
+
+Each CMS record is keyed by (facility_id, payment_measure_id, start_date, end_date)
+and fingerprinted with a hash of its raw JSON. Only new or changed records are
+parsed and upserted, and only the combined/merged CSV rows that depend on them
+are rebuilt, and the rebuilt rows are folded into the stored value index. Every
+run writes a changeset report.
+
+Rows loaded by build_sqlite_store have no hash yet; the first sync compares their
+parsed content instead and backfills the hash of the ones that are unchanged.
+Records whose key doesn't parse (no facility, measure or valid dates) can't be
+stored, so they are counted as invalid rather than reported as added every run.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from contextlib import closing
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from analysis_scripts.value_index import DEFAULT_INDEX_PATH as DEFAULT_VALUE_INDEX_PATH
+from analysis_scripts.value_index import load_value_index, save_value_index, update_value_index
+from clean_data import clean_medicare_records, parse_healthgrades_json
+from utils.combine import combine_cms_healthgrades, combine_with_charges
+from utils.schema import DATE_FORMAT, load_csv
+from utils.cms_api import fetch_cms_dataset_modified, iter_cms_records
+from utils.telemetry import Telemetry
+from utils.sqlite_store import (
+    DEFAULT_DB_PATH,
+    MEASURE_KEY,
+    connect,
+    delete_measures,
+    ensure_schema,
+    last_dataset_modified,
+    measure_hashes,
+    measures_frame,
+    normalize_ccn,
+    record_sync_run,
+    set_measure_hashes,
+    unhashed_measures,
+    upsert_measures,
+)
+
+REPORT_DIR = "data/processed/sync_reports"
+
+# Columns of the combined CSV that come from the Healthgrades merge.
+HEALTHGRADES_COLUMNS = ['state', 'city', 'name', 'rating']
+
+
+def record_hash(record: dict) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def record_keys(records: list[dict]) -> pd.DataFrame:
+    """Key columns and content hash for raw records, without parsing the payload fields."""
+    keys = pd.DataFrame.from_records(
+        records, columns=['facility_id', 'payment_measure_id', 'start_date', 'end_date'])
+    keys = keys.rename(columns={'facility_id': 'ccn'})
+    keys['ccn'] = normalize_ccn(keys['ccn']).where(keys['ccn'].notna())
+    for col in ['start_date', 'end_date']:
+        keys[col] = _iso_dates(keys[col])
+    keys['content_hash'] = [record_hash(r) for r in records]
+    return keys
+
+
+def _iso_dates(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, format="%m/%d/%Y", errors='coerce').dt.strftime("%Y-%m-%d")
+
+
+def diff_records(fetched: pd.DataFrame, stored: pd.DataFrame) -> pd.DataFrame:
+    """
+    Labels every key as added, changed, removed or unchanged, or as unhashed when
+    the stored row has no content hash to compare against.
+    """
+    # A release can list the same key twice; the last occurrence wins, as in the upsert.
+    fetched = fetched.rename_axis('position').reset_index().drop_duplicates(MEASURE_KEY, keep='last')
+    diff = fetched.merge(stored, on=MEASURE_KEY, how='outer',
+                         suffixes=('', '_stored'), indicator=True)
+    diff['status'] = 'unchanged'
+    diff.loc[diff['_merge'] == 'left_only', 'status'] = 'added'
+    diff.loc[diff['_merge'] == 'right_only', 'status'] = 'removed'
+    both = diff['_merge'] == 'both'
+    unhashed = both & diff['content_hash_stored'].isna()
+    changed = both & ~unhashed & (diff['content_hash'] != diff['content_hash_stored'])
+    diff.loc[changed, 'status'] = 'changed'
+    diff.loc[unhashed, 'status'] = 'unhashed'
+    return diff.drop(columns='_merge')
+
+
+def _text(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.notna(), '').astype(str)
+
+
+def _same_content(fetched: pd.DataFrame, stored: pd.DataFrame) -> pd.Series:
+    """
+    Whether each parsed fetched measure row equals its stored row, by key.
+    Numbers compare with a float tolerance and missing equals missing.
+    """
+    both = fetched.merge(stored, on=MEASURE_KEY, how='left', suffixes=('', '_stored'))
+    same = pd.Series(True, index=both.index)
+    for col in fetched.columns.difference(MEASURE_KEY):
+        if col + '_stored' not in both:
+            continue
+        new, old = both[col], both[col + '_stored']
+        if col in ('denominator', 'payment', 'lower_estimate', 'higher_estimate'):
+            new, old = pd.to_numeric(new, errors='coerce'), pd.to_numeric(old, errors='coerce')
+            same &= np.isclose(new.to_numpy(float), old.to_numpy(float), equal_nan=True)
+        else:
+            same &= (_text(new) == _text(old)).to_numpy()
+    return pd.Series(same.to_numpy(), index=pd.MultiIndex.from_frame(both[MEASURE_KEY]))
+
+
+def resolve_unhashed(conn, diff: pd.DataFrame, raw: list[dict]) -> pd.DataFrame:
+    """
+    Parses the fetched records of the unhashed keys and compares them with the stored
+    rows. Equal ones become unchanged, the rest changed. Returns the keys and hashes
+    to backfill for the unchanged ones.
+    """
+    unhashed = diff[diff['status'] == 'unhashed']
+    if unhashed.empty:
+        return unhashed[MEASURE_KEY + ['content_hash']]
+
+    fetched = measures_frame(clean_medicare_records([raw[i] for i in unhashed['position'].astype(int)]))
+    same = _same_content(fetched, unhashed_measures(conn))
+    keys = pd.MultiIndex.from_frame(unhashed[MEASURE_KEY])
+    unchanged = same.reindex(keys).fillna(False).astype(bool).to_numpy()
+
+    diff.loc[unhashed.index, 'status'] = np.where(unchanged, 'unchanged', 'changed')
+    return unhashed.loc[unchanged, MEASURE_KEY + ['content_hash']]
+
+
+def _healthgrades_frame(healthgrades_path, combined):
+    """
+    The parsed Healthgrades data, or, if the raw file is gone, the Healthgrades rows
+    already merged into the combined CSV. The merge is by state and city, so this
+    keeps the ratings of every city the CSV covers.
+    """
+    if os.path.exists(healthgrades_path):
+        return parse_healthgrades_json(healthgrades_path)
+    print(f"⚠️ {healthgrades_path} not found; reusing the ratings already in the combined data")
+    if not set(HEALTHGRADES_COLUMNS) <= set(combined.columns):
+        return pd.DataFrame(columns=HEALTHGRADES_COLUMNS)
+    hg = combined[HEALTHGRADES_COLUMNS].dropna(subset=['name'])
+    return hg.astype({'state': str, 'city': str}).drop_duplicates()
+
+
+def _refresh_combined(combined_path, healthgrades_path, delta_df, stale_keys):
+    """Replaces the combined CSV rows for changed/removed keys with freshly merged ones."""
+    if not os.path.exists(combined_path):
+        print(f"[WARN] {combined_path} not found; skipping combined refresh")
+        return None, 0
+
+    combined = load_csv(combined_path)
+    row_keys = pd.DataFrame({
+        'ccn': normalize_ccn(combined['facility_id']),
+        'payment_measure_id': combined['payment_measure_id'],
+        'start_date': _iso_dates(combined['start_date']),
+        'end_date': _iso_dates(combined['end_date']),
+    })
+    stale = pd.MultiIndex.from_frame(row_keys).isin(pd.MultiIndex.from_frame(stale_keys[MEASURE_KEY]))
+    kept = combined[~stale]
+
+    if not delta_df.empty:
+        fresh = combine_cms_healthgrades(delta_df, _healthgrades_frame(healthgrades_path, combined))
+    else:
+        fresh = delta_df
+    combined = pd.concat([kept, fresh], ignore_index=True)
+    combined['facility_id'] = normalize_ccn(combined['facility_id']).where(combined['facility_id'].notna())
+    combined.to_csv(combined_path, index=False, date_format=DATE_FORMAT)
+    return combined, int(stale.sum())
+
+
+def _refresh_merged(merged_path, charges_path, combined, affected_ccns):
+    """
+    Rebuilds the merged provider × DRG rows for the affected CCNs only.
+    Returns (rows replaced, the rebuilt rows or None).
+    """
+    if combined is None or not os.path.exists(merged_path) or not os.path.exists(charges_path):
+        print("[WARN] merged dataset or charges not found; skipping merged refresh")
+        return 0, None
+
+    merged = load_csv(merged_path)
+    charges = load_csv(charges_path, encoding="latin1")
+
+    stale = normalize_ccn(merged['Rndrng_Prvdr_CCN']).isin(affected_ccns)
+    charges = charges[normalize_ccn(charges['Rndrng_Prvdr_CCN']).isin(affected_ccns)]
+    combined = combined[normalize_ccn(combined['facility_id']).isin(affected_ccns)]
+
+    fresh = combine_with_charges(combined, charges)
+    merged = pd.concat([merged[~stale], fresh], ignore_index=True)
+    # Files written before load_csv kept leading zeros hold 5-digit CCNs; store one form.
+    merged['Rndrng_Prvdr_CCN'] = normalize_ccn(merged['Rndrng_Prvdr_CCN'])
+    merged.to_csv(merged_path, index=False, date_format=DATE_FORMAT)
+    return int(stale.sum()), fresh
+
+
+def _update_value_index(path, fresh) -> int | None:
+    """Folds the rebuilt merged rows into the stored value index; returns its stale group count."""
+    if fresh is None or fresh.empty or not path or not os.path.exists(path):
+        return None
+    index = update_value_index(load_value_index(path), fresh)
+    save_value_index(index, path)
+    return sum(group['stale'] for group in index['groups'].values())
+
+
+def write_changeset_report(report, report_dir=REPORT_DIR):
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = report['synced_at'][:26].replace(':', '').replace('-', '').replace('.', '_')
+    path = os.path.join(report_dir, f"changeset_{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[SUCCESS] Changeset report saved to {path}")
+    return path
+
+
+def sync_cms_data(
+    db_path=DEFAULT_DB_PATH,
+    combined_path="data/processed/combined_hospital_data.csv",
+    merged_path="data/processed/merged_healthcare_data.csv",
+    healthgrades_path="data/raw/healthgrades_data.json",
+    charges_path="data/raw/charges_data.csv",
+    report_dir=REPORT_DIR,
+    force=False,
+    records=None,
+    value_index_path=DEFAULT_VALUE_INDEX_PATH,
+):
+    """
+    1. Skips the run if the CMS metastore reports the same `modified` stamp as the last sync.
+    2. Fetches the raw records (or uses `records`, which must be a complete release) and hashes them;
+       records without a usable key are counted as invalid.
+    3. Diffs the hashes against the store (comparing parsed content where no hash is stored yet);
+       parses and upserts only added/changed records.
+    4. Deletes removed keys and rebuilds the combined/merged rows of the affected CCNs.
+    5. Folds the rebuilt rows into the value index at `value_index_path`, if one is stored.
+    6. Writes and returns a changeset report, including the fetch metrics.
+    """
+    synced_at = datetime.now(timezone.utc).isoformat()
+    telemetry = Telemetry("cms sync")
+
+    with closing(connect(db_path)) as conn:
+        ensure_schema(conn)
+
+        dataset_modified = fetch_cms_dataset_modified(telemetry) if records is None else None
+        if not force and dataset_modified and dataset_modified == last_dataset_modified(conn):
+            print(f"[INFO] CMS dataset unchanged since {dataset_modified}; nothing to sync")
+            report = {'synced_at': synced_at, 'dataset_modified': dataset_modified, 'skipped': True,
+                      'telemetry': telemetry.summary()}
+            write_changeset_report(report, report_dir)
+            return report
+
+        print("[INFO] Fetching CMS records for delta sync...")
+        raw = list(iter_cms_records(telemetry=telemetry)) if records is None else list(records)
+        keys = record_keys(raw)
+        invalid = keys[MEASURE_KEY].isna().any(axis=1)
+        if invalid.any():
+            print(f"⚠️ {int(invalid.sum())} records have no facility, measure or parseable dates; skipped")
+        diff = diff_records(keys[~invalid], measure_hashes(conn))
+        backfill = resolve_unhashed(conn, diff, raw)
+
+        delta = diff[diff['status'].isin(['added', 'changed'])]
+        removed = diff[diff['status'] == 'removed']
+        counts = diff['status'].value_counts().reindex(
+            ['added', 'changed', 'removed', 'unchanged'], fill_value=0).astype(int).to_dict()
+        print(f"[INFO] Delta: {counts}")
+
+        # Only the delta is run through the money/number parsing.
+        positions = delta['position'].astype(int).tolist()
+        delta_df = clean_medicare_records([raw[i] for i in positions])
+        hashes = pd.Series(delta['content_hash'].values, index=delta_df.index)
+
+        with conn:
+            set_measure_hashes(conn, backfill)
+            if not delta_df.empty:
+                upsert_measures(conn, delta_df, hashes)
+            delete_measures(conn, removed)
+            record_sync_run(conn, synced_at, dataset_modified, counts)
+
+    stale_keys = diff[diff['status'] != 'unchanged']
+    affected_ccns = sorted(stale_keys['ccn'].unique())
+
+    combined_rows = merged_rows = 0
+    fresh = None
+    if affected_ccns:
+        combined, combined_rows = _refresh_combined(combined_path, healthgrades_path, delta_df, stale_keys)
+        merged_rows, fresh = _refresh_merged(merged_path, charges_path, combined, affected_ccns)
+    stale_groups = _update_value_index(value_index_path, fresh)
+
+    report = {
+        'synced_at': synced_at,
+        'dataset_modified': dataset_modified,
+        'skipped': False,
+        'counts': counts,
+        'invalid_records': int(invalid.sum()),
+        'hashes_backfilled': len(backfill),
+        'affected_ccns': affected_ccns,
+        'invalidated_rows': {'combined': combined_rows, 'merged': merged_rows},
+        'value_index': None if stale_groups is None else {'path': value_index_path, 'stale_groups': stale_groups},
+        'changes': {
+            status: stale_keys.loc[stale_keys['status'] == status, MEASURE_KEY].to_dict('records')
+            for status in ['added', 'changed', 'removed']
+        },
+        'telemetry': telemetry.summary(),
+    }
+    write_changeset_report(report, report_dir)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync CMS payment measures.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite store to sync into")
+    parser.add_argument("--force", action="store_true", help="sync even if the dataset stamp is unchanged")
+    parser.add_argument("--value-index", default=DEFAULT_VALUE_INDEX_PATH,
+                        help="value index to update with the rebuilt rows, if it exists")
+    args = parser.parse_args()
+    sync_cms_data(db_path=args.db, force=args.force, value_index_path=args.value_index)
@@ -0,0 +1,38 @@
+"""
+The joins that build the processed datasets: CMS measures with Healthgrades ratings
+(the combined CSV), then with the provider × DRG charges (the merged CSV). Shared
+by the full rebuild in integrate_data.py and the incremental CMS sync.
+"""
+
+import pandas as pd
+
+from clean_data import standardize_state_names
+from utils.sqlite_store import normalize_ccn
+
+
+def combine_cms_healthgrades(cms_df, hg_df):
+    hg_df = standardize_state_names(hg_df)
+    cms_df = standardize_state_names(cms_df, state_column='state')
+
+    return pd.merge(
+        cms_df,
+        hg_df,
+        how='left',
+        on=['state', 'city']
+    )
+
+
+def combine_with_charges(df, charges):
+    df = df.rename(columns={
+        'facility_id': 'Rndrng_Prvdr_CCN',
+        'facility_name': 'facility_name_full',
+        'citytown': 'facility_city',
+        'state': 'facility_state',
+        'zip_code': 'facility_zip'
+    })
+
+    df['Rndrng_Prvdr_CCN'] = normalize_ccn(df['Rndrng_Prvdr_CCN'])
+    charges['Rndrng_Prvdr_CCN'] = normalize_ccn(charges['Rndrng_Prvdr_CCN'])
+
+    merged = charges.merge(df, on='Rndrng_Prvdr_CCN', how='left', suffixes=('_provider', '_facility'))
+    return merged.dropna(axis=1, how='all')
@@ -1,90 +1,175 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ProcessPoolExecutor
 import json
 import os
 import time
 
+from utils.telemetry import Telemetry, get_with_retry
+
 BASE_URL = "https://www.healthgrades.com"
 DIRECTORY_URL = f"{BASE_URL}/hospital-directory"
 
-def scrape_healthgrades(limit=None):
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+COIN_CLASS = "hospital-patient-experience-coin-circle hospital-patient-experience-coin-circle-non-sponsored"
+
+# Each page type only builds a tree for the elements we actually read.
+DIRECTORY_ONLY = SoupStrainer("div", attrs={"data-qa-target": "alpha-list"})
+STATE_ONLY = SoupStrainer("section", attrs={"data-qa-target": "top-cities-list"})
+CITY_ONLY = SoupStrainer("a", attrs={"data-qa-target": "name-link"})
+HOSPITAL_ONLY = SoupStrainer("div", class_=COIN_CLASS)
+
+
+def _soup(html, parse_only):
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+def _contains(html, marker):
+    return (marker.encode() if isinstance(html, bytes) else marker) in html
+
+
+def parse_directory_page(html):
+    """Returns (state_name, relative_url) pairs from the hospital directory."""
+    soup = _soup(html, DIRECTORY_ONLY)
+    return [
+        (link.text.strip(), link.get("href"))
+        for block in soup.select("div[data-qa-target='alpha-list'] ul li")
+        for link in block.select("a[data-qa-target$='--title']")
+    ]
+
+
+def parse_state_page(html):
+    """Returns (city_name, relative_url) pairs from a state's top-cities list."""
+    if not _contains(html, "top-cities-list"):
+        return []
+    city_section = _soup(html, STATE_ONLY).select_one("section[data-qa-target='top-cities-list']")
+    if not city_section:
+        return []
+    return [(link.text.strip(), link.get("href")) for link in city_section.select("a.sAL3j1mOy0qvcbNn")]
+
+
+def parse_city_page(html):
+    """Returns (hospital_name, relative_url) pairs from a city page."""
+    if not _contains(html, "name-link"):
+        return []
+    return [(link.text.strip(), link.get("href")) for link in _soup(html, CITY_ONLY).find_all("a")]
+
+
+def parse_hospital_page(html):
+    """Returns the patient-experience rating text (second coin), or None if it isn't on the page."""
+    if not _contains(html, "hospital-patient-experience-coin-circle"):
+        return None
+    coin_elements = _soup(html, HOSPITAL_ONLY).find_all("div", class_=COIN_CLASS)
+    return coin_elements[1].get_text(strip=True) if len(coin_elements) > 1 else None
+
+
+def _safe_parse_hospital(html):
+    """(rating, failure) for the crawl's metrics; failure is None, "missing coin elements" or an exception type."""
+    try:
+        rating = parse_hospital_page(html)
+    except Exception as exc:
+        return None, type(exc).__name__
+    return rating, None if rating is not None else "missing coin elements"
+
+
+def _fetch(url, telemetry, stage):
+    """GET with retries; returns the page body, or None (error recorded) if it can't be used."""
+    try:
+        response = get_with_retry(url, telemetry, stage=stage)
+    except Exception:
+        return None
+    return response.content if response.status_code == 200 else None
+
+
+def scrape_healthgrades(limit=None, max_workers=None, telemetry=None):
+    """
+    Crawls directory → state → city → hospital pages. Fetching stays serial in
+    this process; hospital pages are handed to a process pool for parsing so
+    the next request goes out while earlier pages are still being parsed.
+    Directory, state and city pages are parsed inline: their links are needed
+    before the next request, so a pool round trip would only add pickling/IPC.
+    Requests, bytes, latencies, retries and failures per page type are recorded
+    in `telemetry` (HTTP errors and timeouts as errors, pages without the
+    expected elements as counters).
+    """
+    telemetry = telemetry or Telemetry("healthgrades")
     schema = {}
     total_hospitals = 0
+    pending = []
 
-    def get_state_blocks():
-        response = requests.get(DIRECTORY_URL)
-        soup = BeautifulSoup(response.content, "html.parser")
-        return soup.select("div[data-qa-target='alpha-list'] ul li")
-
-    state_blocks = get_state_blocks()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
 
-    for block in state_blocks:
-        state_links = block.select("a[data-qa-target$='--title']")
-        for state_link in state_links:
-            state_name = state_link.text.strip()
-            relative_state_url = state_link.get("href")
+        def parse(func, content, stage):
+            try:
+                return func(content)
+            except Exception as exc:
+                telemetry.error(stage, f"parse: {type(exc).__name__}")
+                return []
+
+        content = _fetch(DIRECTORY_URL, telemetry, "directory")
+        if content is None:
+            raise RuntimeError("Failed to fetch the Healthgrades hospital directory")
+        state_links = parse(parse_directory_page, content, "directory")
+        if not state_links:
+            telemetry.count("directory", "no state links")
+
+        for state_name, relative_state_url in state_links:
+            if limit and total_hospitals >= limit:
+                break
             state_url = f"{BASE_URL}{relative_state_url}"
             schema[state_name] = {}
 
-            try:
-                state_response = requests.get(state_url)
-                state_soup = BeautifulSoup(state_response.content, "html.parser")
-                city_section = state_soup.select_one("section[data-qa-target='top-cities-list']")
-
-                if city_section:
-                    city_links = city_section.select("a.sAL3j1mOy0qvcbNn")
-                    for city_link in city_links:
-                        city_name = city_link.text.strip()
-                        relative_city_url = city_link.get("href")
-                        city_url = f"{BASE_URL}/hospital-directory/{relative_city_url}"
-                        schema[state_name][city_name] = {}
-
-                        try:
-                            city_response = requests.get(city_url)
-                            city_soup = BeautifulSoup(city_response.content, "html.parser")
-                            hospital_links = city_soup.find_all(
-                                "a", attrs={"data-qa-target": "name-link"})
-
-                            for hospital_link in hospital_links:
-                                if limit and total_hospitals >= limit:
-                                    return schema
-
-                                hospital_name = hospital_link.text.strip()
-                                hospital_href = hospital_link.get("href")
-                                hospital_url = f"{BASE_URL}/{hospital_href}"
-
-                                try:
-                                    hosp_resp = requests.get(hospital_url)
-                                    hosp_soup = BeautifulSoup(hosp_resp.content, "html.parser")
-                                    coin_elements = hosp_soup.find_all(
-                                        "div",
-                                        class_="hospital-patient-experience-coin-circle hospital-patient-experience-coin-circle-non-sponsored"
-                                    )
-                                    rating = coin_elements[1].get_text(strip=True) if len(coin_elements) > 1 else None
-                                except Exception:
-                                    rating = None
-
-                                schema[state_name][city_name][hospital_name] = {
-                                    "name": hospital_name,
-                                    "rating": rating
-                                }
-
-                                total_hospitals += 1
-                                time.sleep(0.5)
-
-                        except Exception:
-                            continue
-                        time.sleep(1)
-
-            except Exception:
-                continue
-        time.sleep(1)
+            content = _fetch(state_url, telemetry, "state")
+            city_links = parse(parse_state_page, content, "state") if content is not None else []
+            if content is not None and not city_links:
+                telemetry.count("state", "no city list")
+
+            for city_name, relative_city_url in city_links:
+                if limit and total_hospitals >= limit:
+                    break
+                city_url = f"{BASE_URL}/hospital-directory/{relative_city_url}"
+                schema[state_name][city_name] = {}
+
+                content = _fetch(city_url, telemetry, "city")
+                hospital_links = parse(parse_city_page, content, "city") if content is not None else []
+                if content is not None and not hospital_links:
+                    telemetry.count("city", "no hospital links")
+
+                for hospital_name, hospital_href in hospital_links:
+                    if limit and total_hospitals >= limit:
+                        break
+
+                    hospital_url = f"{BASE_URL}/{hospital_href}"
+                    content = _fetch(hospital_url, telemetry, "hospital")
+                    future = pool.submit(_safe_parse_hospital, content) if content is not None else None
+
+                    pending.append((state_name, city_name, hospital_name, future))
+                    total_hospitals += 1
+                    time.sleep(0.5)
+
+                time.sleep(1)
+            time.sleep(1)
+
+        for state_name, city_name, hospital_name, future in pending:
+            rating, failure = future.result() if future is not None else (None, None)
+            if failure:
+                telemetry.count("hospital", failure)
+            elif future is not None:
+                telemetry.count("hospital", "rated")
+            schema[state_name][city_name][hospital_name] = {
+                "name": hospital_name,
+                "rating": rating
+            }
 
     return schema
 
-def save_scraped_healthgrades(output_path="data/raw/healthgrades_data.json", limit=None):
+def save_scraped_healthgrades(output_path="data/raw/healthgrades_data.json", limit=None, telemetry=None):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    data = scrape_healthgrades(limit=limit)
+    data = scrape_healthgrades(limit=limit, telemetry=telemetry)
     with open(output_path, "w") as f:
         json.dump(data, f, indent=2)
     print(f"[SUCCESS] Scraped data saved to {output_path}")
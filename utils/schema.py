@@ -0,0 +1,224 @@
+"""
+Declared column types for the raw charges, combined and merged datasets.
+
+Every loader reads through `load_csv`, so columns come back typed once: CCNs and
+ZIPs as strings (keeping leading zeros), low-cardinality labels as categoricals,
+counts/ratings downcast, and dates parsed with an explicit format. Columns not
+listed here are left to pandas' inference.
+
+The default reader is pandas' C engine. The multithreaded pyarrow reader is about
+twice as fast but roughly doubles peak memory (the Arrow table and the frame
+coexist during conversion), so it is opt-in: `load_csv(..., engine="pyarrow")` or
+ANALYSIS_CSV_ENGINE=pyarrow. Text columns are read as text by both engines.
+pandas' pyarrow engine infers a type per column before applying `dtype=`, which
+turns "010001" into 10001, so the pyarrow path calls pyarrow.csv with those
+columns pinned to strings.
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+CSV_ENGINE = os.environ.get("ANALYSIS_CSV_ENGINE", "c") if HAVE_PYARROW else "c"
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# Dtype per column; "date" columns are parsed with DATE_FORMAT.
+COLUMN_TYPES = {
+    # Medicare inpatient charges (provider × DRG)
+    'Rndrng_Prvdr_CCN': 'string',
+    'Rndrng_Prvdr_Org_Name': 'string',
+    'Rndrng_Prvdr_St': 'string',
+    'Rndrng_Prvdr_City': 'category',
+    'Rndrng_Prvdr_State_Abrvtn': 'category',
+    'Rndrng_Prvdr_State_FIPS': 'category',
+    'Rndrng_Prvdr_Zip5': 'string',
+    'Rndrng_Prvdr_RUCA': 'float32',
+    'Rndrng_Prvdr_RUCA_Desc': 'category',
+    'DRG_Cd': 'category',
+    'DRG_Desc': 'category',
+    'Tot_Dschrgs': 'Int32',
+    'Avg_Submtd_Cvrd_Chrg': 'float64',
+    'Avg_Tot_Pymt_Amt': 'float64',
+    'Avg_Mdcr_Pymt_Amt': 'float64',
+
+    # CMS payment & value of care (combined_hospital_data uses the unrenamed names)
+    'facility_id': 'string',
+    'facility_name': 'string',
+    'facility_name_full': 'string',
+    'address': 'string',
+    'citytown': 'category',
+    'facility_city': 'category',
+    'state': 'category',
+    'facility_state': 'category',
+    'zip_code': 'string',
+    'facility_zip': 'string',
+    'countyparish': 'category',
+    'telephone_number': 'string',
+    'payment_measure_id': 'category',
+    'payment_measure_name': 'category',
+    'payment_category': 'category',
+    'denominator': 'Int32',
+    'payment': 'float64',
+    'lower_estimate': 'float64',
+    'higher_estimate': 'float64',
+    'payment_footnote': 'category',
+    'value_of_care_display_id': 'category',
+    'value_of_care_display_name': 'category',
+    'value_of_care_category': 'category',
+    'value_of_care_footnote': 'category',
+    'start_date': 'date',
+    'end_date': 'date',
+
+    # Healthgrades
+    'city': 'category',
+    'name': 'string',
+    'rating': 'float32',
+}
+
+# Placeholders the CMS feeds use for suppressed values; read as missing.
+NA_VALUES = ["Not Available", "Not Applicable", "N/A", "NA", ""]
+
+# pandas' default NA strings, which the pyarrow path has to pass explicitly.
+DEFAULT_NA_VALUES = ["#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                     "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null", ""]
+TEXT_TYPES = {'string', 'category', 'date'}
+
+# Keyword arguments _read_pyarrow understands; anything else goes to pandas' C engine.
+PYARROW_KWARGS = {'encoding'}
+
+NUMERIC_TYPES = {'float32', 'float64', 'Int32', 'Int64'}
+
+
+def _read_dtype(dtype, coerce_numeric=False):
+    if dtype == 'date' or (coerce_numeric and dtype in NUMERIC_TYPES):
+        return 'string'
+    return dtype
+
+
+def _to_dtype(series: pd.Series, dtype: str) -> pd.Series:
+    if dtype == 'date':
+        return pd.to_datetime(series, format=DATE_FORMAT, errors='coerce')
+    if dtype in NUMERIC_TYPES:
+        numeric = pd.to_numeric(series, errors='coerce')
+        if dtype.startswith('Int'):
+            # Fractional values can't go into an integer column; keep them as floats.
+            non_integral = numeric.notna() & (numeric % 1 != 0)
+            if non_integral.any():
+                return numeric.astype('float64')
+        return numeric.astype(dtype)
+    if dtype == 'string':
+        if pd.api.types.is_float_dtype(series):
+            # e.g. CCNs already parsed as 10001.0 by an untyped read
+            series = series.astype('Int64')
+        return series.astype('string')
+    return series.astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame, types: dict = COLUMN_TYPES) -> pd.DataFrame:
+    """Converts the declared columns of an already-loaded frame in place and returns it."""
+    for col, dtype in types.items():
+        if col in df.columns and not _has_dtype(df[col], dtype):
+            df[col] = _to_dtype(df[col], dtype)
+    return df
+
+
+def _has_dtype(series: pd.Series, dtype: str) -> bool:
+    if dtype == 'date':
+        return pd.api.types.is_datetime64_any_dtype(series)
+    if dtype == 'category':
+        return isinstance(series.dtype, pd.CategoricalDtype)
+    if dtype == 'string':
+        # pandas' default "str" dtype (NaN-backed) is not the declared nullable "string"
+        return series.dtype == pd.StringDtype()
+    return str(series.dtype) == dtype
+
+
+def _read_pyarrow(path, columns, types, encoding="utf8") -> pd.DataFrame:
+    """
+    Multithreaded read with pyarrow.csv. Declared text columns are pinned to strings;
+    numeric columns are inferred and coerced by apply_schema, so text in a numeric
+    column becomes NaN without a second read.
+    """
+    import pyarrow as pa
+    from pyarrow import csv
+
+    text = {c: pa.string() for c in columns if types.get(c) in TEXT_TYPES}
+    table = csv.read_csv(
+        path,
+        read_options=csv.ReadOptions(encoding=encoding),
+        convert_options=csv.ConvertOptions(
+            column_types=text,
+            include_columns=columns,
+            null_values=sorted(set(NA_VALUES + DEFAULT_NA_VALUES)),
+            strings_can_be_null=True,
+        ),
+    )
+    # All-empty columns come back as pyarrow's null type; pandas reads them as float NaN.
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas()
+
+
+def load_csv(path, types: dict = COLUMN_TYPES, usecols=None, engine=None, **kwargs) -> pd.DataFrame:
+    """
+    Reads a CSV with the declared dtypes (C engine unless `engine` or CSV_ENGINE is
+    "pyarrow") and parses dates with DATE_FORMAT. Text columns keep their leading zeros on either
+    engine. If a numeric column holds text other than NA_VALUES, it is coerced to NaN.
+    """
+    header = pd.read_csv(path, nrows=0, **kwargs).columns
+    columns = [c for c in header if usecols is None or c in usecols]
+    if (engine or CSV_ENGINE) == "pyarrow" and set(kwargs) <= PYARROW_KWARGS:
+        return apply_schema(_read_pyarrow(path, columns, types, **kwargs), types)
+
+    read = dict(usecols=usecols, engine="c", na_values=NA_VALUES, keep_default_na=True, **kwargs)
+
+    try:
+        dtype = {c: _read_dtype(types[c]) for c in columns if c in types}
+        df = pd.read_csv(path, dtype=dtype, **read)
+    except (ValueError, TypeError):
+        dtype = {c: _read_dtype(types[c], coerce_numeric=True) for c in columns if c in types}
+        df = pd.read_csv(path, dtype=dtype, **read)
+    return apply_schema(df, types)
+
+
+def iter_csv_chunks(path, chunksize=100_000, types: dict = COLUMN_TYPES, usecols=None, **kwargs):
+    """
+    Yields typed chunks of a CSV too large to load at once. Numerics are read as
+    text and coerced, since a bad value in a late chunk can't trigger a re-read.
+    Categorical columns carry only the categories seen in their own chunk.
+    """
+    header = pd.read_csv(path, nrows=0, **kwargs).columns
+    columns = [c for c in header if usecols is None or c in usecols]
+    dtype = {c: _read_dtype(types[c], coerce_numeric=True) for c in columns if c in types}
+    for chunk in pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize,
+                             na_values=NA_VALUES, **kwargs):
+        yield apply_schema(chunk, types)
+
+
+def load_merged_dataset(path="data/processed/merged_healthcare_data.csv", usecols=None) -> pd.DataFrame:
+    return load_csv(path, usecols=usecols)
+
+
+def schema_report(df: pd.DataFrame, types: dict = COLUMN_TYPES) -> pd.DataFrame:
+    """One row per declared column present in `df`: expected vs. actual dtype, nulls and memory."""
+    rows = []
+    for col in df.columns:
+        if col not in types:
+            continue
+        rows.append({
+            'column': col,
+            'expected': types[col],
+            'actual': str(df[col].dtype),
+            'ok': _has_dtype(df[col], types[col]),
+            'n_missing': int(df[col].isna().sum()),
+            'memory_kb': df[col].memory_usage(deep=True, index=False) / 1024,
+        })
+    return pd.DataFrame(rows)
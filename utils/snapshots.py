@@ -0,0 +1,284 @@
+"""
+Versioned snapshots of the raw and processed datasets.
+
+A snapshot is a manifest listing the row blocks of one dataset release. Rows are
+serialized as JSON lines, sorted by the dataset key, and cut into blocks at
+content-defined boundaries (a row whose hash hits the boundary pattern ends a
+block). Because the cut points depend only on nearby rows, an edited, added or
+removed row only changes the block it falls in. Blocks are stored gzipped under
+the sha256 of their content, so a block shared by many releases is stored once.
+
+    data/snapshots/objects/ab/abcd....jsonl.gz
+    data/snapshots/manifests/<dataset>/<name>.json
+
+    python -m utils.snapshots list merged
+    python -m utils.snapshots diff merged 2025Q2 2025Q3
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from collections import Counter
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from utils.schema import DATE_FORMAT, apply_schema, load_csv
+
+SNAPSHOT_DIR = "data/snapshots"
+
+# Rows per block on average, and hard bounds so pathological data can't produce
+# a block per row or one giant block.
+AVG_BLOCK_ROWS = 512
+MIN_BLOCK_ROWS = 64
+MAX_BLOCK_ROWS = 4 * AVG_BLOCK_ROWS
+
+DATASET_KEYS = {
+    'cms_raw': ['facility_id', 'payment_measure_id', 'start_date', 'end_date'],
+    'combined': ['facility_id', 'payment_measure_id', 'start_date', 'end_date', 'name'],
+    'merged': ['Rndrng_Prvdr_CCN', 'DRG_Cd', 'payment_measure_id', 'start_date', 'end_date', 'name'],
+}
+
+
+# ——— Rows and blocks ———
+
+def _frame_lines(df: pd.DataFrame, key) -> list[str]:
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime(DATE_FORMAT)
+    if key:
+        df = df.sort_values([c for c in key if c in df.columns], kind='stable', na_position='last')
+    text = df.to_json(orient='records', lines=True, double_precision=15, force_ascii=False)
+    return text.splitlines()
+
+
+def _record_lines(records: list[dict], key) -> list[str]:
+    if key:
+        records = sorted(records, key=lambda r: tuple(str(r.get(c, "")) for c in key))
+    return [json.dumps(r, sort_keys=True, ensure_ascii=False) for r in records]
+
+
+def _is_boundary(line: str) -> bool:
+    return zlib.crc32(line.encode("utf-8")) % AVG_BLOCK_ROWS == 0
+
+
+def split_blocks(lines):
+    """Cuts row lines into blocks after each boundary row (within the size bounds)."""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) >= MAX_BLOCK_ROWS or (len(block) >= MIN_BLOCK_ROWS and _is_boundary(line)):
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _object_path(digest, root):
+    return os.path.join(root, "objects", digest[:2], f"{digest}.jsonl.gz")
+
+
+def _write_block(block, root) -> tuple[str, bool]:
+    data = ("\n".join(block) + "\n").encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest, root)
+    if os.path.exists(path):
+        return digest, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(data, mtime=0))
+    os.replace(tmp, path)
+    return digest, True
+
+
+def read_block(digest, root=SNAPSHOT_DIR) -> list[str]:
+    with gzip.open(_object_path(digest, root), "rt", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+# ——— Manifests ———
+
+def _manifest_path(dataset, name, root):
+    return os.path.join(root, "manifests", dataset, f"{name}.json")
+
+
+def create_snapshot(source, dataset: str, name: str, released=None, key=None,
+                    root: str = SNAPSHOT_DIR) -> dict:
+    """
+    Records a release of `dataset` as snapshot `name`.
+    `source` is a DataFrame, a CSV path (read through the schema) or a list of
+    JSON records. `released` is the release date (defaults to today); `key`
+    defaults to DATASET_KEYS[dataset] and is used to order rows and pair them in diffs.
+    Returns the manifest.
+    """
+    if os.path.exists(_manifest_path(dataset, name, root)):
+        raise ValueError(f"Snapshot {dataset}/{name} already exists")
+    key = key if key is not None else DATASET_KEYS.get(dataset, [])
+
+    if isinstance(source, str):
+        source = load_csv(source)
+    if isinstance(source, pd.DataFrame):
+        fmt, columns = 'frame', list(source.columns)
+        key = [c for c in key if c in columns]
+        lines = _frame_lines(source, key)
+    else:
+        if isinstance(source, dict):
+            raise TypeError(f"Snapshot {dataset}/{name}: expected a list of records, got a payload "
+                            f"with keys {sorted(source)[:5]}; unwrap its records first")
+        fmt, columns = 'records', None
+        lines = _record_lines(source, key)
+
+    blocks, new_blocks = [], 0
+    for block in split_blocks(lines):
+        digest, written = _write_block(block, root)
+        blocks.append({'sha256': digest, 'rows': len(block)})
+        new_blocks += written
+
+    manifest = {
+        'dataset': dataset,
+        'name': name,
+        'released': str(released or date.today().isoformat()),
+        'created': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'format': fmt,
+        'columns': columns,
+        'key': key,
+        'rows': len(lines),
+        'blocks': blocks,
+    }
+    path = _manifest_path(dataset, name, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"[SUCCESS] Snapshot {dataset}/{name}: {len(lines)} rows in {len(blocks)} blocks "
+          f"({new_blocks} new, {len(blocks) - new_blocks} already stored)")
+    return manifest
+
+
+def list_snapshots(dataset: str, root: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """Snapshots of `dataset`, oldest release first."""
+    directory = os.path.join(root, "manifests", dataset)
+    rows = []
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        with open(os.path.join(directory, filename)) as f:
+            m = json.load(f)
+        rows.append({'name': m['name'], 'released': m['released'], 'created': m['created'],
+                     'rows': m['rows'], 'blocks': len(m['blocks'])})
+    columns = ['name', 'released', 'created', 'rows', 'blocks']
+    return pd.DataFrame(rows, columns=columns).sort_values(['released', 'created'], ignore_index=True)
+
+
+def load_manifest(dataset: str, name=None, as_of=None, root: str = SNAPSHOT_DIR) -> dict:
+    """The manifest called `name`, or else the latest one released on or before `as_of` (default: latest)."""
+    if name is None:
+        snapshots = list_snapshots(dataset, root)
+        if as_of is not None:
+            snapshots = snapshots[snapshots['released'] <= str(as_of)]
+        if snapshots.empty:
+            raise FileNotFoundError(f"No {dataset} snapshot released on or before {as_of or 'today'}")
+        name = snapshots['name'].iloc[-1]
+    path = _manifest_path(dataset, name, root)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No snapshot {dataset}/{name} in {root}")
+    with open(path) as f:
+        return json.load(f)
+
+
+# ——— Reading and diffing ———
+
+def _to_rows(manifest, records):
+    if manifest['format'] == 'records':
+        return records
+    df = pd.DataFrame.from_records(records, columns=manifest['columns'])
+    # All-missing columns come back as None objects; pandas reads them from CSV as float NaN.
+    for col in df.columns:
+        if df[col].dtype == object and df[col].isna().all():
+            df[col] = df[col].astype('float64')
+    return apply_schema(df)
+
+
+def iter_snapshot_chunks(dataset: str, name=None, as_of=None, root: str = SNAPSHOT_DIR):
+    """Yields a snapshot block by block (typed DataFrames, or lists of records for raw JSON)."""
+    manifest = load_manifest(dataset, name, as_of, root)
+    for block in manifest['blocks']:
+        yield _to_rows(manifest, [json.loads(line) for line in read_block(block['sha256'], root)])
+
+
+def read_snapshot(dataset: str, name=None, as_of=None, root: str = SNAPSHOT_DIR):
+    """A whole snapshot as a typed DataFrame (or list of records for raw JSON)."""
+    manifest = load_manifest(dataset, name, as_of, root)
+    records = [json.loads(line) for block in manifest['blocks'] for line in read_block(block['sha256'], root)]
+    return _to_rows(manifest, records)
+
+
+def _key_of(manifest, row):
+    return tuple(str(row.get(c)) for c in manifest['key'])
+
+
+def diff_snapshots(dataset: str, old: str, new: str, root: str = SNAPSHOT_DIR) -> dict:
+    """
+    Rows added, removed and changed between two snapshots of `dataset`.
+
+    1. Blocks present in both manifests are skipped without being read.
+    2. Only the remaining blocks are decompressed; rows found on both sides of
+       them (e.g. moved by a neighbouring edit) cancel out.
+    3. Left-over rows are paired by the dataset key: a key on both sides is a
+       change (the new version is reported), otherwise an addition or removal.
+    Returns {'added', 'removed', 'changed'} plus block counts.
+    """
+    old_m = load_manifest(dataset, old, root=root)
+    new_m = load_manifest(dataset, new, root=root)
+    old_blocks = Counter(b['sha256'] for b in old_m['blocks'])
+    new_blocks = Counter(b['sha256'] for b in new_m['blocks'])
+    shared = old_blocks & new_blocks
+
+    def lines_of(blocks):
+        return Counter(line for digest, count in blocks.items()
+                       for line in read_block(digest, root) * count)
+
+    old_lines = lines_of(old_blocks - shared)
+    new_lines = lines_of(new_blocks - shared)
+    removed = [json.loads(line) for line in (old_lines - new_lines).elements()]
+    added = [json.loads(line) for line in (new_lines - old_lines).elements()]
+
+    removed_keys = {_key_of(old_m, r) for r in removed} if old_m['key'] else set()
+    changed_keys = {k for k in (_key_of(new_m, r) for r in added) if k in removed_keys}
+
+    return {
+        'added': _to_rows(new_m, [r for r in added if _key_of(new_m, r) not in changed_keys]),
+        'removed': _to_rows(old_m, [r for r in removed if _key_of(old_m, r) not in changed_keys]),
+        'changed': _to_rows(new_m, [r for r in added if _key_of(new_m, r) in changed_keys]),
+        'shared_blocks': sum(shared.values()),
+        'read_blocks': sum((old_blocks - shared).values()) + sum((new_blocks - shared).values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or diff dataset snapshots.")
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list", help="list the snapshots of a dataset")
+    ls.add_argument("dataset")
+    diff = sub.add_parser("diff", help="rows added, removed and changed between two snapshots")
+    diff.add_argument("dataset")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        print(list_snapshots(args.dataset, args.root).to_string(index=False))
+        return
+
+    result = diff_snapshots(args.dataset, args.old, args.new, args.root)
+    print(f"[INFO] {result['shared_blocks']} blocks shared, {result['read_blocks']} read")
+    for kind in ['added', 'removed', 'changed']:
+        print(f"{kind}: {len(result[kind])} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+DEFAULT_DB_PATH = "data/processed/healthcare.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hospitals (
+    ccn            TEXT PRIMARY KEY,
+    name           TEXT,
+    address        TEXT,
+    city           TEXT,
+    state          TEXT,
+    zip_code       TEXT,
+    county         TEXT,
+    telephone      TEXT,
+    ruca           REAL,
+    ruca_desc      TEXT,
+    rating         REAL
+);
+
+CREATE TABLE IF NOT EXISTS measures (
+    ccn                        TEXT NOT NULL,
+    payment_measure_id         TEXT NOT NULL,
+    start_date                 TEXT NOT NULL,
+    end_date                   TEXT NOT NULL,
+    payment_measure_name       TEXT,
+    payment_category           TEXT,
+    denominator                REAL,
+    payment                    REAL,
+    lower_estimate             REAL,
+    higher_estimate            REAL,
+    value_of_care_display_id   TEXT,
+    value_of_care_display_name TEXT,
+    value_of_care_category     TEXT,
+    content_hash               TEXT,
+    PRIMARY KEY (ccn, payment_measure_id, start_date, end_date)
+);
+
+CREATE TABLE IF NOT EXISTS charges (
+    ccn                  TEXT NOT NULL,
+    drg_cd               TEXT NOT NULL,
+    drg_desc             TEXT,
+    tot_dschrgs          INTEGER,
+    avg_submtd_cvrd_chrg REAL,
+    avg_tot_pymt_amt     REAL,
+    avg_mdcr_pymt_amt    REAL,
+    PRIMARY KEY (ccn, drg_cd)
+);
+
+CREATE TABLE IF NOT EXISTS sync_runs (
+    run_id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    synced_at        TEXT NOT NULL,
+    dataset_modified TEXT,
+    added            INTEGER,
+    changed          INTEGER,
+    removed          INTEGER,
+    unchanged        INTEGER
+);
+"""
+
+# Created after the bulk load so inserts don't pay for index maintenance.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_hospitals_state ON hospitals (state);
+CREATE INDEX IF NOT EXISTS idx_hospitals_city ON hospitals (state, city);
+CREATE INDEX IF NOT EXISTS idx_measures_ccn ON measures (ccn);
+CREATE INDEX IF NOT EXISTS idx_measures_period ON measures (start_date, end_date);
+CREATE INDEX IF NOT EXISTS idx_measures_measure ON measures (payment_measure_id, start_date);
+CREATE INDEX IF NOT EXISTS idx_charges_drg ON charges (drg_cd);
+CREATE INDEX IF NOT EXISTS idx_charges_ccn ON charges (ccn);
+"""
+
+HOSPITAL_COLUMNS = {
+    'facility_id': 'ccn',
+    'facility_name': 'name',
+    'address': 'address',
+    'citytown': 'city',
+    'state': 'state',
+    'zip_code': 'zip_code',
+    'countyparish': 'county',
+    'telephone_number': 'telephone',
+}
+
+MEASURE_COLUMNS = {
+    'facility_id': 'ccn',
+    'payment_measure_id': 'payment_measure_id',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'payment_measure_name': 'payment_measure_name',
+    'payment_category': 'payment_category',
+    'denominator': 'denominator',
+    'payment': 'payment',
+    'lower_estimate': 'lower_estimate',
+    'higher_estimate': 'higher_estimate',
+    'value_of_care_display_id': 'value_of_care_display_id',
+    'value_of_care_display_name': 'value_of_care_display_name',
+    'value_of_care_category': 'value_of_care_category',
+}
+
+CHARGE_COLUMNS = {
+    'Rndrng_Prvdr_CCN': 'ccn',
+    'DRG_Cd': 'drg_cd',
+    'DRG_Desc': 'drg_desc',
+    'Tot_Dschrgs': 'tot_dschrgs',
+    'Avg_Submtd_Cvrd_Chrg': 'avg_submtd_cvrd_chrg',
+    'Avg_Tot_Pymt_Amt': 'avg_tot_pymt_amt',
+    'Avg_Mdcr_Pymt_Amt': 'avg_mdcr_pymt_amt',
+}
+
+
+def normalize_ccn(values: pd.Series) -> pd.Series:
+    """CCNs lose their leading zeros when a CSV is read back as int; restore the 6-char form."""
+    return (
+        values.astype(str)
+        .str.strip()
+        .str.replace(r'\.0$', '', regex=True)
+        .str.zfill(6)
+    )
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def ensure_schema(conn):
+    """Creates missing tables/indexes and adds columns introduced after a store was first built."""
+    conn.executescript(SCHEMA)
+    measure_cols = {row[1] for row in conn.execute("PRAGMA table_info(measures)")}
+    if 'content_hash' not in measure_cols:
+        conn.execute("ALTER TABLE measures ADD COLUMN content_hash TEXT")
+    conn.executescript(INDEXES)
+
+
+def _to_iso_dates(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, format="%m/%d/%Y", errors='coerce').dt.strftime("%Y-%m-%d")
+
+
+def _records(df: pd.DataFrame):
+    # sqlite3 can't bind numpy scalars or NaN-as-missing, so hand it plain Python objects.
+    clean = df.astype(object).where(df.notna(), None)
+    return list(clean.itertuples(index=False, name=None))
+
+
+def _bulk_insert(conn, table, df):
+    if df.empty:
+        return 0
+    cols = ", ".join(df.columns)
+    marks = ", ".join("?" for _ in df.columns)
+    conn.executemany(f"INSERT OR REPLACE INTO {table} ({cols}) VALUES ({marks})", _records(df))
+    return len(df)
+
+
+def _upsert(conn, table, df, key_cols):
+    if df.empty:
+        return 0
+    cols = ", ".join(df.columns)
+    marks = ", ".join("?" for _ in df.columns)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in df.columns if c not in key_cols)
+    conn.executemany(
+        f"INSERT INTO {table} ({cols}) VALUES ({marks}) "
+        f"ON CONFLICT ({', '.join(key_cols)}) DO UPDATE SET {updates}",
+        _records(df),
+    )
+    return len(df)
+
+
+def hospitals_frame(combined_df: pd.DataFrame, charges_df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """One row per CCN: CMS facility details, mean Healthgrades rating and the RUCA class from charges."""
+    cols = [c for c in HOSPITAL_COLUMNS if c in combined_df.columns]
+    hospitals = combined_df[cols].rename(columns=HOSPITAL_COLUMNS)
+    hospitals['ccn'] = normalize_ccn(hospitals['ccn'])
+    if 'zip_code' in hospitals:
+        hospitals['zip_code'] = hospitals['zip_code'].astype(str).str.zfill(5)
+    hospitals = hospitals.drop_duplicates('ccn').set_index('ccn')
+
+    # The Healthgrades merge is by state/city, so a facility can carry several ratings.
+    if 'rating' in combined_df.columns:
+        ratings = pd.to_numeric(combined_df['rating'], errors='coerce')
+        hospitals['rating'] = ratings.groupby(normalize_ccn(combined_df['facility_id'])).mean()
+
+    if charges_df is not None and 'Rndrng_Prvdr_RUCA_Desc' in charges_df.columns:
+        ruca = charges_df[['Rndrng_Prvdr_CCN', 'Rndrng_Prvdr_RUCA', 'Rndrng_Prvdr_RUCA_Desc']].copy()
+        ruca['ccn'] = normalize_ccn(ruca['Rndrng_Prvdr_CCN'])
+        ruca = ruca.drop_duplicates('ccn').set_index('ccn')
+        hospitals['ruca'] = ruca['Rndrng_Prvdr_RUCA']
+        hospitals['ruca_desc'] = ruca['Rndrng_Prvdr_RUCA_Desc']
+
+    return hospitals.reset_index()
+
+
+def measures_frame(combined_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (CCN, payment measure, reporting period)."""
+    cols = [c for c in MEASURE_COLUMNS if c in combined_df.columns]
+    measures = combined_df[cols].rename(columns=MEASURE_COLUMNS)
+    measures['ccn'] = normalize_ccn(measures['ccn'])
+    for col in ['start_date', 'end_date']:
+        measures[col] = _to_iso_dates(measures[col])
+    for col in ['denominator', 'payment', 'lower_estimate', 'higher_estimate']:
+        if col in measures:
+            measures[col] = pd.to_numeric(measures[col], errors='coerce')
+    measures = measures.dropna(subset=['payment_measure_id', 'start_date', 'end_date'])
+    return measures.drop_duplicates(['ccn', 'payment_measure_id', 'start_date', 'end_date'])
+
+
+def charges_frame(charges_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (CCN, DRG)."""
+    cols = [c for c in CHARGE_COLUMNS if c in charges_df.columns]
+    charges = charges_df[cols].rename(columns=CHARGE_COLUMNS)
+    charges['ccn'] = normalize_ccn(charges['ccn'])
+    charges['drg_cd'] = charges['drg_cd'].astype(str)
+    return charges.drop_duplicates(['ccn', 'drg_cd'], keep='last')
+
+
+def build_sqlite_store(combined_df, charges_df, db_path=DEFAULT_DB_PATH, replace=True):
+    """
+    Normalizes the combined CMS/Healthgrades data and the DRG charges into
+    hospitals, measures and charges tables and bulk-loads them in one transaction.
+    Returns the number of rows written per table.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    if replace and os.path.exists(db_path):
+        os.remove(db_path)
+
+    hospitals = hospitals_frame(combined_df, charges_df)
+    measures = measures_frame(combined_df)
+    charges = charges_frame(charges_df)
+
+    with closing(connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        with conn:
+            counts = {
+                'hospitals': _bulk_insert(conn, 'hospitals', hospitals),
+                'measures': _bulk_insert(conn, 'measures', measures),
+                'charges': _bulk_insert(conn, 'charges', charges),
+            }
+        conn.executescript(INDEXES)
+        conn.execute("ANALYZE")
+
+    print(f"[SUCCESS] SQLite store written to {db_path}: "
+          + ", ".join(f"{n} {t}" for t, n in counts.items()))
+    return counts
+
+
+# ——— Incremental updates (see utils.cms_sync) ———
+
+MEASURE_KEY = ['ccn', 'payment_measure_id', 'start_date', 'end_date']
+
+
+def measure_hashes(conn) -> pd.DataFrame:
+    """Stored content hash per (CCN, measure, period); NULL for rows loaded before syncing existed."""
+    return pd.read_sql_query(
+        f"SELECT {', '.join(MEASURE_KEY)}, content_hash FROM measures", conn)
+
+
+def unhashed_measures(conn) -> pd.DataFrame:
+    """Full rows of the measures stored without a content hash (e.g. by build_sqlite_store)."""
+    return pd.read_sql_query("SELECT * FROM measures WHERE content_hash IS NULL", conn)
+
+
+def set_measure_hashes(conn, keyed_hashes: pd.DataFrame) -> int:
+    """Backfills content_hash for existing rows; `keyed_hashes` has MEASURE_KEY + content_hash."""
+    if keyed_hashes.empty:
+        return 0
+    conn.executemany(
+        "UPDATE measures SET content_hash = ? "
+        "WHERE ccn = ? AND payment_measure_id = ? AND start_date = ? AND end_date = ?",
+        _records(keyed_hashes[['content_hash'] + MEASURE_KEY]),
+    )
+    return len(keyed_hashes)
+
+
+def upsert_measures(conn, combined_df: pd.DataFrame, hashes: pd.Series | None = None) -> int:
+    """Inserts or updates measure rows (and their facility details) without touching other rows."""
+    measures = measures_frame(combined_df)
+    if hashes is not None:
+        measures['content_hash'] = hashes.reindex(measures.index)
+    # Keep any rating/RUCA already stored; only facility details come from the CMS feed.
+    hospitals = hospitals_frame(combined_df.drop(columns=['rating'], errors='ignore'))
+    _upsert(conn, 'hospitals', hospitals, ['ccn'])
+    return _upsert(conn, 'measures', measures, MEASURE_KEY)
+
+
+def delete_measures(conn, keys: pd.DataFrame) -> int:
+    """Deletes measure rows by (CCN, measure, period) key."""
+    if keys.empty:
+        return 0
+    conn.executemany(
+        "DELETE FROM measures WHERE ccn = ? AND payment_measure_id = ? AND start_date = ? AND end_date = ?",
+        _records(keys[MEASURE_KEY]),
+    )
+    return len(keys)
+
+
+def record_sync_run(conn, synced_at, dataset_modified, counts):
+    conn.execute(
+        "INSERT INTO sync_runs (synced_at, dataset_modified, added, changed, removed, unchanged) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (synced_at, dataset_modified, counts['added'], counts['changed'],
+         counts['removed'], counts['unchanged']),
+    )
+
+
+def last_dataset_modified(conn):
+    row = conn.execute(
+        "SELECT dataset_modified FROM sync_runs ORDER BY run_id DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+
+# ——— Point lookups ———
+
+def hospital_charges(conn, ccn) -> pd.DataFrame:
+    """All DRG charges for one CCN."""
+    ccn = normalize_ccn(pd.Series([ccn])).iloc[0]
+    return pd.read_sql_query(
+        "SELECT * FROM charges WHERE ccn = ? ORDER BY drg_cd", conn, params=(ccn,))
+
+
+def state_measures(conn, state, start_date=None, end_date=None) -> pd.DataFrame:
+    """Payment/value-of-care measures for one state, optionally limited to a reporting window."""
+    sql = ("SELECT h.name, h.city, m.* FROM measures m "
+           "JOIN hospitals h ON h.ccn = m.ccn WHERE h.state = ?")
+    params = [state]
+    if start_date is not None:
+        sql += " AND m.start_date >= ?"
+        params.append(str(start_date))
+    if end_date is not None:
+        sql += " AND m.end_date <= ?"
+        params.append(str(end_date))
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+# ——— Grouped aggregates pushed down into SQL ———
+
+def _grouped_payment_rating(conn, group_expr, alias):
+    return pd.read_sql_query(
+        f"""
+        SELECT {group_expr} AS {alias},
+               AVG(c.avg_tot_pymt_amt) AS mean_payment,
+               AVG(h.rating) AS mean_rating
+        FROM charges c
+        JOIN hospitals h ON h.ccn = c.ccn
+        WHERE {group_expr} IS NOT NULL
+        GROUP BY {group_expr}
+        """,
+        conn,
+    ).set_index(alias)
+
+
+def state_stats_sql(conn) -> pd.DataFrame:
+    """Mean payment & rating per state, sorted by mean payment."""
+    stats = _grouped_payment_rating(conn, "h.state", "facility_state")
+    return stats.sort_values('mean_payment', ascending=False)
+
+
+def city_extremes_sql(conn, n=10):
+    """Top-n highest and lowest mean-payment cities (cities without a rating are dropped)."""
+    stats = _grouped_payment_rating(conn, "h.city", "facility_city").dropna()
+    return stats.nlargest(n, 'mean_payment'), stats.nsmallest(n, 'mean_payment')
+
+
+def ruca_stats_sql(conn) -> pd.DataFrame:
+    """Mean payment & rating per RUCA category, sorted by mean payment."""
+    stats = _grouped_payment_rating(conn, "h.ruca_desc", "Rndrng_Prvdr_RUCA_Desc")
+    return stats.sort_values('mean_payment', ascending=False)
@@ -0,0 +1,250 @@
+"""
+In-process metrics for the data-collection layer (CMS API, Healthgrades crawl).
+
+A Telemetry object keeps, per stage (e.g. "cms_page", "state", "hospital"):
+request counts, bytes received, a log-bucketed latency histogram, errors and
+retries by type, and free-form counters such as "missing coin elements". It
+prints a one-line progress report every few seconds while a run is going and
+produces a JSON-serializable summary at the end; nothing leaves the process.
+
+    telemetry = Telemetry("collection")
+    response = get_with_retry(url, telemetry, stage="hospital")
+    ...
+    telemetry.write_summary("data/raw/collection_metrics.json")
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import requests
+
+# Latency buckets: [0, 1 ms), [1, 2 ms), [2, 4 ms), ... up to [32.8 s, ∞).
+LATENCY_BUCKETS = 17
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LatencyHistogram:
+    """Counts of latencies in power-of-two millisecond buckets, plus exact count/sum/min/max."""
+
+    def __init__(self):
+        self.buckets = [0] * LATENCY_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        ms = seconds * 1000
+        index = 0 if ms < 1 else min(int(math.log2(ms)) + 1, LATENCY_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    @staticmethod
+    def bucket_label(index: int) -> str:
+        lower = 0 if index == 0 else 2 ** (index - 1)
+        upper = "inf" if index == LATENCY_BUCKETS - 1 else 2 ** index
+        return f"{lower}-{upper}ms"
+
+    def quantile(self, q: float) -> float | None:
+        """Upper edge (seconds) of the bucket holding the q-th latency; the max for the last bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return self.max if index == LATENCY_BUCKETS - 1 else min(2 ** index / 1000, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_s': self.total / self.count if self.count else None,
+            'min_s': self.min if self.count else None,
+            'max_s': self.max if self.count else None,
+            'p50_s': self.quantile(0.5),
+            'p90_s': self.quantile(0.9),
+            'p99_s': self.quantile(0.99),
+            'buckets': {self.bucket_label(i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class StageMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+        self.errors = Counter()
+        self.retries = Counter()
+        self.counters = Counter()
+        self.first = None
+        self.last = None
+
+    def summary(self) -> dict:
+        elapsed = (self.last - self.first) if self.first is not None else 0.0
+        return {
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'pages_per_sec': self.requests / elapsed if elapsed > 0 else None,
+            'errors': dict(self.errors),
+            'retries': dict(self.retries),
+            'counters': dict(self.counters),
+            'latency': self.latency.summary(),
+        }
+
+
+class Telemetry:
+    """Per-stage collection metrics with periodic progress output."""
+
+    def __init__(self, name: str, progress: bool = True, interval: float = 5.0, stream=None):
+        self.name = name
+        self.progress = progress
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.stages = {}
+        self.started = time.time()
+        self._last_progress = time.monotonic()
+
+    def stage(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics()
+        return self.stages[name]
+
+    # ——— Recording ———
+
+    @contextmanager
+    def request(self, stage: str, retryable: tuple = ()):
+        """
+        Times one request. The body may set `span['bytes']`; an exception escaping
+        it is counted as an error of its type and re-raised, unless it is an instance
+        of `retryable` (the caller retries it and records a retry instead).
+        """
+        metrics = self.stage(stage)
+        span = {'bytes': 0}
+        start = time.monotonic()
+        metrics.first = metrics.first if metrics.first is not None else start
+        try:
+            yield span
+        except Exception as exc:
+            if not isinstance(exc, retryable):
+                metrics.errors[type(exc).__name__] += 1
+            raise
+        finally:
+            end = time.monotonic()
+            metrics.requests += 1
+            metrics.bytes += span['bytes']
+            metrics.latency.add(end - start)
+            metrics.last = end
+            self._maybe_report()
+
+    def error(self, stage: str, kind: str):
+        self.stage(stage).errors[kind] += 1
+        self._maybe_report()
+
+    def retry(self, stage: str, kind: str):
+        self.stage(stage).retries[kind] += 1
+
+    def count(self, stage: str, name: str, n: int = 1):
+        self.stage(stage).counters[name] += n
+
+    # ——— Reporting ———
+
+    def _maybe_report(self):
+        if self.progress and time.monotonic() - self._last_progress >= self.interval:
+            self.report_progress()
+
+    def progress_line(self) -> str:
+        elapsed = time.time() - self.started
+        parts = []
+        for name, m in self.stages.items():
+            rate = m.summary()['pages_per_sec']
+            p50 = m.latency.quantile(0.5)
+            part = f"{name}: {m.requests} req, {m.bytes / 1e6:.1f} MB"
+            if rate:
+                part += f", {rate:.1f}/s"
+            if p50 is not None:
+                part += f", p50 ≤{p50 * 1000:.0f}ms"
+            if m.errors:
+                part += f", {sum(m.errors.values())} err"
+            if m.retries:
+                part += f", {sum(m.retries.values())} retry"
+            parts.append(part)
+        return f"[PROGRESS] {self.name} {int(elapsed // 60):02d}:{int(elapsed % 60):02d} | " + " | ".join(parts)
+
+    def report_progress(self):
+        self._last_progress = time.monotonic()
+        end = "\r" if getattr(self.stream, "isatty", lambda: False)() else "\n"
+        print(self.progress_line(), end=end, file=self.stream, flush=True)
+
+    def summary(self) -> dict:
+        finished = time.time()
+        return {
+            'name': self.name,
+            'started': self.started,
+            'finished': finished,
+            'elapsed_s': finished - self.started,
+            'stages': {name: m.summary() for name, m in self.stages.items()},
+        }
+
+    def print_summary(self):
+        print(f"\n=== {self.name} metrics ===")
+        for name, s in self.summary()['stages'].items():
+            latency = s['latency']
+            rate = f"{s['pages_per_sec']:.2f}/s" if s['pages_per_sec'] else "-"
+            p90 = f"{latency['p90_s'] * 1000:.0f}ms" if latency['p90_s'] is not None else "-"
+            print(f"{name:<14} {s['requests']:>6} req  {s['bytes'] / 1e6:8.1f} MB  {rate:>9}  p90 ≤{p90}")
+            for label, key in [("errors", 'errors'), ("retries", 'retries'), ("counts", 'counters')]:
+                if s[key]:
+                    print(f"{'':<14} {label}: {s[key]}")
+
+    def write_summary(self, path: str) -> dict:
+        summary = self.summary()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[SUCCESS] Collection metrics saved to {path}")
+        return summary
+
+
+def get_with_retry(url, telemetry: Telemetry | None = None, stage: str = "http", retries: int = 3,
+                   backoff: float = 1.0, timeout: float = 30, session=None, **kwargs) -> requests.Response:
+    """
+    GET with exponential backoff on connection errors, timeouts and 429/5xx responses
+    (honouring Retry-After). Every attempt is recorded under `stage`; a failed attempt
+    counts as a retry if another follows, as an error otherwise. Returns the last
+    response, whatever its status; raises the last exception if every attempt failed.
+    """
+    telemetry = telemetry or Telemetry(stage, progress=False)
+    get = session.get if session is not None else requests.get
+
+    for attempt in range(retries + 1):
+        retryable = (requests.ConnectionError, requests.Timeout) if attempt < retries else ()
+        try:
+            with telemetry.request(stage, retryable) as span:
+                response = get(url, timeout=timeout, **kwargs)
+                span['bytes'] = len(response.content)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            if attempt == retries:
+                raise
+            telemetry.retry(stage, type(exc).__name__)
+            time.sleep(backoff * 2 ** attempt)
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            telemetry.retry(stage, f"HTTP {response.status_code}")
+            retry_after = response.headers.get("Retry-After", "")
+            time.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt)
+            continue
+        if response.status_code != 200:
+            telemetry.error(stage, f"HTTP {response.status_code}")
+        return response